@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Async Client - Chiamate chat native asyncio per LlmProvider.
+
+Invece dei client sincroni di llmclient usa httpx.AsyncClient, con un pool
+di connessioni limitato per provider (pool_size connessioni, le richieste
+in più attendono una connessione libera senza occupare thread). Parla
+direttamente con gli endpoint di provider_endpoints: OpenAI-compatibile per
+groq, mistral, cerebras e openrouter, generateContent per Gemini e
+l'inference API per HuggingFace. Richiede solo httpx, non requests.
+Ogni chiamata ha un timeout complessivo e può essere cancellata: la chiave
+del pool viene comunque rilasciata e una cancellazione non conta come
+errore del modello. Metadati, chiavi, quote e circuit breaker sono gli
+stessi del percorso sincrono (vedi LlmProvider.aget_client e achat).
+Da riga di comando invia lo stesso prompt più volte in parallelo.
+"""
+
+__date__ = "2026-10-16"
+__version__ = "1.0.0"
+__author__ = "Gemini CLI"
+
+import sys
+import time
+import asyncio
+import argparse
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+import provider_endpoints
+from provider_endpoints import OPENAI_COMPATIBLE_ENDPOINTS, POOL_SIZE
+from quota_ledger import estimate_tokens
+
+
+DEFAULT_TIMEOUT = 60.0
+
+
+class LlmCallError(RuntimeError):
+    """Risposta HTTP di errore di un provider (espone status_code e response)."""
+
+    def __init__(self, provider: str, status_code: int, message: str, response=None):
+        self.provider = provider
+        self.status_code = status_code
+        self.response = response
+        super().__init__(f"{provider}: HTTP {status_code}: {message}")
+
+
+def normalize_messages(messages) -> list:
+    """Un prompt stringa diventa un solo messaggio utente."""
+    if isinstance(messages, str):
+        return [{"role": "user", "content": messages}]
+    return list(messages)
+
+
+def build_chat_request(provider: str, model_id: str, api_key: str, messages: list,
+                       max_tokens: int = None) -> tuple:
+    """
+    URL, header e payload di una richiesta chat non in streaming.
+
+    Returns:
+        tuple: (url, headers, payload).
+    """
+    if provider == "gemini":
+        model_url = model_id if model_id.startswith("models/") else f"models/{model_id}"
+        url = f"{provider_endpoints.GEMINI_BASE_URL}/{model_url}:generateContent?key={api_key}"
+        headers = {"Content-Type": "application/json"}
+        # Gemini chiama "model" l'assistente e non ha il ruolo system
+        contents = [{"role": "model" if m["role"] == "assistant" else "user",
+                     "parts": [{"text": m["content"]}]} for m in messages]
+        payload = {"contents": contents}
+        if max_tokens is not None:
+            payload["generationConfig"] = {"maxOutputTokens": max_tokens}
+    elif provider == "huggingface":
+        url = f"{provider_endpoints.HF_INFERENCE_URL}/{model_id}"
+        headers = {"Authorization": f"Bearer {api_key}"}
+        payload = {"inputs": "\n".join(m["content"] for m in messages)}
+        if max_tokens is not None:
+            payload["parameters"] = {"max_new_tokens": max_tokens}
+    elif provider in OPENAI_COMPATIBLE_ENDPOINTS:
+        url = OPENAI_COMPATIBLE_ENDPOINTS[provider]
+        headers = {"Authorization": f"Bearer {api_key}",
+                   "Content-Type": "application/json"}
+        payload = {"model": model_id, "messages": messages}
+        if max_tokens is not None:
+            payload["max_tokens"] = max_tokens
+    else:
+        raise ValueError(f"Provider non supportato in modalità async: {provider}")
+    request = (url, headers, payload)
+    return request
+
+
+def parse_chat_response(provider: str, data) -> str:
+    """Testo generato dal corpo JSON di una risposta chat."""
+    text = ""
+    if provider == "gemini":
+        candidates = data.get("candidates") or [{}]
+        parts = candidates[0].get("content", {}).get("parts") or [{}]
+        text = "".join(part.get("text", "") for part in parts)
+    elif provider == "huggingface":
+        if isinstance(data, list) and data:
+            data = data[0]
+        if isinstance(data, dict):
+            text = data.get("generated_text", "")
+    else:
+        choices = data.get("choices") or [{}]
+        text = choices[0].get("message", {}).get("content") or ""
+    return text
+
+
+def error_message(response) -> str:
+    """Messaggio di errore del provider, se il corpo lo contiene."""
+    try:
+        error = response.json().get("error")
+    except (ValueError, AttributeError):
+        return response.text[:200]
+    if isinstance(error, dict):
+        return str(error.get("message", error))
+    return str(error)
+
+
+class AsyncTransport:
+    """
+    Un httpx.AsyncClient per provider, con al massimo pool_size connessioni.
+    Va usato da un solo event loop.
+    """
+
+    def __init__(self, pool_size: int = POOL_SIZE):
+        if httpx is None:
+            raise RuntimeError("httpx non installato (pip install httpx): API async non disponibile")
+        self.pool_size = pool_size
+        self.clients = {}
+
+    def _client(self, provider: str):
+        client = self.clients.get(provider)
+        if client is None:
+            limits = httpx.Limits(max_connections=self.pool_size,
+                                  max_keepalive_connections=self.pool_size)
+            # Nessun timeout sull'attesa di una connessione: vale quello della chiamata
+            timeout = httpx.Timeout(DEFAULT_TIMEOUT, pool=None)
+            client = httpx.AsyncClient(limits=limits, timeout=timeout)
+            self.clients[provider] = client
+        return client
+
+    async def chat(self, provider: str, model_id: str, api_key: str, messages: list,
+                   max_tokens: int = None) -> tuple:
+        """
+        Esegue una richiesta chat.
+
+        Returns:
+            tuple: (testo, header della risposta).
+        Raises:
+            LlmCallError: se il provider risponde con un codice di errore.
+        """
+        url, headers, payload = build_chat_request(provider, model_id, api_key, messages, max_tokens)
+        response = await self._client(provider).post(url, headers=headers, json=payload)
+        if response.status_code != 200:
+            raise LlmCallError(provider, response.status_code, error_message(response), response)
+        text = parse_chat_response(provider, response.json())
+        result = (text, response.headers)
+        return result
+
+    async def aclose(self):
+        """Chiude i pool di connessioni."""
+        clients = list(self.clients.values())
+        self.clients.clear()
+        for client in clients:
+            await client.aclose()
+
+
+class AsyncLlmClient:
+    """
+    Client async per un modello: ogni chiamata usa una chiave del pool,
+    rispetta le quote e aggiorna router e circuit breaker come i client
+    sincroni di get_client().
+    """
+
+    def __init__(self, selection, pool, transport: AsyncTransport, on_result=None):
+        self.selection = selection
+        self.pool = pool
+        self.transport = transport
+        self.on_result = on_result
+
+    async def chat(self, messages, max_tokens: int = None,
+                   timeout: float = DEFAULT_TIMEOUT) -> str:
+        """
+        Invia i messaggi (o un prompt stringa) e restituisce il testo generato.
+
+        Raises:
+            LlmCallError, asyncio.TimeoutError, QuotaExhausted.
+        """
+        messages = normalize_messages(messages)
+        prompt = "".join(str(m.get("content", "")) for m in messages)
+        member = await self.pool.acquire_async(estimate_tokens(prompt, max_tokens))
+        started = time.perf_counter()
+        try:
+            text, headers = await asyncio.wait_for(
+                self.transport.chat(self.selection.client, self.selection.model,
+                                    member.key, messages, max_tokens),
+                timeout)
+        except asyncio.CancelledError:
+            # Annullata dal chiamante: non è un errore del modello
+            self.pool.release(member)
+            raise
+        except Exception as e:
+            self.pool.release(member, e)
+            self._record(started, e)
+            raise
+        self.pool.release(member, headers=headers)
+        self._record(started, None)
+        return text
+
+    def _record(self, started: float, error):
+        if self.on_result is not None:
+            self.on_result(time.perf_counter() - started, error is None, error)
+
+
+async def run_parallel(provider, selection, prompt: str, count: int, timeout: float) -> list:
+    """Invia count volte il prompt in parallelo e restituisce (esito, secondi)."""
+    client = await provider.aget_client(selection)
+    if client is None:
+        return []
+
+    async def one():
+        started = time.perf_counter()
+        try:
+            await client.chat(prompt, timeout=timeout)
+            ok = True
+        except Exception:
+            ok = False
+        return ok, time.perf_counter() - started
+
+    try:
+        results = await asyncio.gather(*(one() for _ in range(count)))
+    finally:
+        await provider.aclose()
+    return results
+
+
+def do_main(provider_name: str, model: str, prompt: str, count: int, timeout: float) -> bool:
+    """Misura count chiamate parallele su un solo event loop."""
+    from llm_provider import llm_provider
+
+    selection = llm_provider.select(provider_name, model)
+    if selection is None:
+        print(f"Modello {provider_name}/{model} non trovato nel catalogo.")
+        return False
+    started = time.perf_counter()
+    results = asyncio.run(run_parallel(llm_provider, selection, prompt, count, timeout))
+    elapsed = time.perf_counter() - started
+    if not results:
+        print(f"Nessun client disponibile per {provider_name}.")
+        return False
+    ok = sum(1 for success, _ in results if success)
+    latencies = sorted(seconds for _, seconds in results)
+    print(f"{ok}/{count} riuscite in {elapsed:.2f}s, "
+          f"latenza mediana {latencies[len(latencies) // 2]:.2f}s")
+    return ok > 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Invia chiamate chat parallele con l'API async di LlmProvider.")
+    parser.add_argument("provider", help="Provider del catalogo (es. groq)")
+    parser.add_argument("model", help="Modello del catalogo")
+    parser.add_argument("--prompt", default="Rispondi solo: ok", help="Prompt da inviare")
+    parser.add_argument("--count", type=int, default=10, help="Chiamate parallele (default: 10)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help=f"Timeout per chiamata in secondi (default: {DEFAULT_TIMEOUT:g})")
+    args = parser.parse_args()
+
+    if do_main(args.provider, args.model, args.prompt, args.count, args.timeout):
+        sys.exit(0)
+    else:
+        sys.exit(1)
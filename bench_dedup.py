@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Bench Dedup - Benchmark sintetico del motore di deduplicazione.
+
+Genera cataloghi sintetici (default 100.000 modelli) con versioni numeriche,
+date, semver, tag ':free' e alias 'latest', in ordine casuale, e misura
+dedup_latest con i separatori usati dagli script models_<provider>.py.
+Per ogni catalogo verifica che la versione scelta sia quella attesa e
+conta quante scelte avrebbe sbagliato il vecchio confronto tra stringhe.
+Con --max-ms fallisce se la mediana supera la soglia.
+"""
+
+__date__ = "2026-10-16"
+__version__ = "1.0.0"
+__author__ = "Gemini CLI"
+
+import sys
+import time
+import random
+import argparse
+import statistics
+
+import model_dedup
+from model_dedup import dedup_latest, split_colon_tag, split_dash_version
+
+
+def _numeric(family, count, rng):
+    versions = rng.sample(range(1, 40), count)
+    ids = [f"{family}-{v:03d}" if v % 2 else f"{family}-{v}" for v in versions]
+    expected = f"{family}-{max(versions):03d}" if max(versions) % 2 else f"{family}-{max(versions)}"
+    return ids, expected
+
+
+def _date(family, count, rng):
+    days = rng.sample(range(0, 3000), count)
+    dates = [time.strftime("%Y-%m-%d", time.gmtime(1577836800 + d * 86400)) for d in days]
+    ids = [f"{family}-{d}" for d in dates]
+    expected = f"{family}-{max(dates)}"
+    return ids, expected
+
+
+def _latest(family, count, rng):
+    ids, _ = _numeric(family, count - 1, rng)
+    ids.append(f"{family}-latest")
+    expected = f"{family}-latest"
+    return ids, expected
+
+
+def _semver(family, count, rng):
+    versions = rng.sample([(a, b) for a in range(1, 4) for b in range(0, 15)], count)
+    ids = [f"org/{family}:{a}.{b}" for a, b in versions]
+    a, b = max(versions)
+    expected = f"org/{family}:{a}.{b}"
+    return ids, expected
+
+
+def _free(family, count, rng):
+    ids = [f"org/{family}", f"org/{family}:free"]
+    expected = f"org/{family}:free"
+    return ids, expected
+
+
+# Generatore di famiglia -> separatore usato dagli script corrispondenti
+STYLES = {
+    "numeric": (_numeric, split_dash_version),
+    "date": (_date, split_dash_version),
+    "latest": (_latest, split_dash_version),
+    "semver": (_semver, split_colon_tag),
+    "free": (_free, split_colon_tag),
+}
+
+
+def build_catalog(style: str, size: int, seed: int) -> tuple:
+    """
+    Catalogo sintetico in ordine casuale.
+
+    Returns:
+        tuple: (modelli come dict {"id"}, {nome base: ID atteso}).
+    """
+    rng = random.Random(seed)
+    generate, split = STYLES[style]
+    models = []
+    expected = {}
+    family = 0
+    while len(models) < size:
+        count = rng.randint(2, 8)
+        ids, best = generate(f"model{family}", count, rng)
+        expected[split(best)[0]] = best
+        models.extend({"id": model_id} for model_id in ids)
+        family += 1
+    rng.shuffle(models)
+    return models, expected
+
+
+def legacy_dedup(models, split) -> list:
+    """Vecchio algoritmo: confronto tra stringhe, '000' in assenza di versione."""
+    latest_models = {}
+    for m in models:
+        base_name, version = split(m["id"])
+        version = version or "000"
+        if base_name not in latest_models or version > latest_models[base_name][0]:
+            latest_models[base_name] = (version, m)
+    return [item[1] for item in latest_models.values()]
+
+
+def count_wrong(selected: list, split, expected: dict) -> int:
+    wrong = sum(1 for m in selected if expected.get(split(m["id"])[0]) != m["id"])
+    wrong += len(expected) - len(selected)
+    return wrong
+
+
+def do_main(size: int, runs: int, seed: int, max_ms: float) -> bool:
+    """
+    Esegue il benchmark su tutti gli stili di versione.
+
+    Returns:
+        bool: False se una scelta è errata o la soglia è superata.
+    """
+    if size < 1 or runs < 1:
+        print("Errore: size e runs devono essere >= 1")
+        return False
+
+    success = True
+    print(f"Deduplicazione di cataloghi sintetici da {size} modelli ({runs} esecuzioni, cache a freddo)")
+    print(f"{'STILE':10} {'BASI':>7} {'MEDIANA':>10} {'MAX':>10} {'ERR':>5} {'ERR LEGACY':>11}")
+    for style, (_, split) in STYLES.items():
+        models, expected = build_catalog(style, size, seed)
+        split_model = lambda m, split=split: split(m["id"])
+
+        timings = []
+        selected = []
+        for _ in range(runs):
+            # Ogni esecuzione parte senza chiavi memorizzate
+            model_dedup.version_key.cache_clear()
+            model_dedup.split_dash_version.cache_clear()
+            model_dedup.split_colon_tag.cache_clear()
+            started = time.perf_counter()
+            selected = dedup_latest(models, split_model)
+            timings.append((time.perf_counter() - started) * 1000)
+
+        wrong = count_wrong(selected, split, expected)
+        legacy_wrong = count_wrong(legacy_dedup(models, split), split, expected)
+        median_ms = statistics.median(timings)
+        print(f"{style:10} {len(expected):>7} {median_ms:>8.1f}ms {max(timings):>8.1f}ms "
+              f"{wrong:>5} {legacy_wrong:>11}")
+
+        if wrong:
+            print(f"ERRORE: {wrong} scelte errate per lo stile {style}")
+            success = False
+        if max_ms is not None and median_ms > max_ms:
+            print(f"REGRESSIONE: {style} {median_ms:.1f} ms > soglia {max_ms:.1f} ms")
+            success = False
+    return success
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark sintetico della deduplicazione dei cataloghi.")
+    parser.add_argument("--size", type=int, default=100_000,
+                        help="Modelli per catalogo (default: 100000)")
+    parser.add_argument("--runs", type=int, default=5,
+                        help="Esecuzioni per stile (default: 5)")
+    parser.add_argument("--seed", type=int, default=42,
+                        help="Seme del generatore casuale (default: 42)")
+    parser.add_argument("--max-ms", type=float, default=None,
+                        help="Soglia massima per la mediana di ciascuno stile")
+    args = parser.parse_args()
+
+    if do_main(args.size, args.runs, args.seed, args.max_ms):
+        sys.exit(0)
+    else:
+        sys.exit(1)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Bench Import - Misura il costo di avvio di llm_provider.
+
+Lancia più interpreti Python a freddo e misura:
+- il tempo di "import llm_provider" (da -X importtime);
+- il tempo del primo accesso alla configurazione;
+- il tempo del primo get_client() del provider indicato.
+Fallisce se la mediana dell'import supera --max-import-ms (default
+DEFAULT_MAX_IMPORT_MS) o se l'import carica moduli che servono solo ai
+percorsi opzionali (FORBIDDEN_MODULES, es. asyncio per l'API async), così
+le regressioni diventano visibili.
+"""
+
+__date__ = "2026-10-16"
+__version__ = "1.0.0"
+__author__ = "Gemini CLI"
+
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+
+# Soglia per la mediana dell'import (circa 25 ms misurati senza moduli superflui)
+DEFAULT_MAX_IMPORT_MS = 40.0
+
+# Moduli che "import llm_provider" non deve caricare
+FORBIDDEN_MODULES = ("asyncio", "httpx", "requests")
+
+# Codice eseguito in ogni interprete figlio
+CHILD_CODE = """
+import json, sys, time
+t0 = time.perf_counter()
+import llm_provider
+t1 = time.perf_counter()
+loaded = [m for m in sys.argv[2:] if m in sys.modules]
+llm_provider.llm_provider.get_provider_config()
+t2 = time.perf_counter()
+name = sys.argv[1]
+client_ok = None
+if name:
+    try:
+        client_ok = llm_provider.llm_provider.get_client(name) is not None
+    except Exception as e:
+        client_ok = False
+t3 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "config": t2 - t1, "client": t3 - t2, "client_ok": client_ok,
+                  "loaded": loaded}))
+"""
+
+
+def parse_importtime(stderr: str, module: str) -> float:
+    """Estrae il tempo cumulativo (in secondi) di un modulo dall'output di -X importtime."""
+    value = None
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) < 3:
+            continue
+        if fields[2].strip() == module:
+            try:
+                value = int(fields[1].strip()) / 1_000_000
+            except ValueError:
+                value = None
+    return value
+
+
+def run_once(provider: str) -> dict:
+    """Esegue un interprete a freddo e restituisce le misure."""
+    cwd = Path(__file__).resolve().parent
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD_CODE, provider or "", *FORBIDDEN_MODULES],
+        cwd=cwd, capture_output=True, text=True, check=False,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "errore sconosciuto")
+
+    measures = json.loads(proc.stdout.strip().splitlines()[-1])
+    measures["importtime"] = parse_importtime(proc.stderr, "llm_provider")
+    return measures
+
+
+def do_main(runs: int, provider: str, max_import_ms: float) -> bool:
+    """
+    Ripete la misura a freddo e stampa mediana e massimo.
+
+    Args:
+        runs: Numero di interpreti da lanciare.
+        provider: Provider di cui misurare il primo get_client (opzionale).
+        max_import_ms: Soglia per l'import; None per nessun controllo.
+            Anche senza soglia l'import non deve caricare FORBIDDEN_MODULES.
+    Returns:
+        bool: False se la soglia è superata o le misure falliscono.
+    """
+    if runs < 1:
+        print("Errore: runs deve essere >= 1")
+        return False
+
+    samples = []
+    for _ in range(runs):
+        try:
+            samples.append(run_once(provider))
+        except (RuntimeError, ValueError) as e:
+            print(f"Errore nella misura: {e}")
+            return False
+
+    print(f"Avvio a freddo di llm_provider ({runs} esecuzioni)")
+    for name in ("importtime", "import", "config", "client"):
+        values = [s[name] * 1000 for s in samples if s.get(name) is not None]
+        if not values:
+            continue
+        print(f"  {name:10} mediana={statistics.median(values):8.2f} ms  max={max(values):8.2f} ms")
+    if provider:
+        print(f"  client {provider}: {'OK' if samples[-1]['client_ok'] else 'non disponibile'}")
+
+    success = True
+    loaded = sorted({m for s in samples for m in s["loaded"]})
+    if loaded:
+        print(f"REGRESSIONE: l'import carica {', '.join(loaded)}")
+        success = False
+    if max_import_ms is not None:
+        median_import = statistics.median(s["import"] * 1000 for s in samples)
+        if median_import > max_import_ms:
+            print(f"REGRESSIONE: import {median_import:.2f} ms > soglia {max_import_ms:.2f} ms")
+            success = False
+    return success
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Misura il costo di avvio di llm_provider.")
+    parser.add_argument("--runs", type=int, default=10,
+                        help="Numero di interpreti a freddo (default: 10)")
+    parser.add_argument("--provider", default="",
+                        help="Provider di cui misurare il primo get_client")
+    parser.add_argument("--max-import-ms", type=float, default=DEFAULT_MAX_IMPORT_MS,
+                        help=f"Soglia massima per la mediana dell'import (default: {DEFAULT_MAX_IMPORT_MS:g}, 0 per nessun controllo)")
+    args = parser.parse_args()
+
+    if do_main(args.runs, args.provider, args.max_import_ms or None):
+        sys.exit(0)
+    else:
+        sys.exit(1)
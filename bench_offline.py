@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Bench Offline - Benchmark di probe e selezione contro il server mock.
+
+Avvia mock_provider.py in un processo locale, crea un catalogo sintetico in una
+directory temporanea e misura in modo ripetibile, senza chiamare i provider:
+- overhead: costo lato client di una richiesta (latenza simulata nulla),
+  per API OpenAI-compatibile, Gemini e HuggingFace, con e senza streaming;
+- probe: models_test.run_concurrent_async con richieste in volo crescenti,
+  per misurare la scalabilità della concorrenza;
+- select: models_ok.run_benchmarks su modelli con latenze note, verificando
+  che la classifica prodotta sia quella attesa.
+I risultati possono essere salvati (--out) e confrontati con un
+riferimento (--baseline): oltre --max-regression il comando fallisce.
+"""
+
+__date__ = "2026-10-16"
+__version__ = "1.0.0"
+__author__ = "Gemini CLI"
+
+import io
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import contextlib
+from pathlib import Path
+
+import http_transport
+from bench_stats import summarize
+from mock_provider import MockProviderProcess
+
+
+PROBE_PROVIDERS = ("groq", "mistral", "cerebras", "gemini", "huggingface")
+OVERHEAD_PROVIDERS = ("groq", "gemini", "huggingface")
+SUITES = ("overhead", "probe", "select")
+
+# Latenze fisse dei modelli usati per verificare la classifica di models_ok
+SELECT_LATENCIES = {"sel-fast": 0.02, "sel-mid": 0.05, "sel-slow": 0.09}
+
+
+def write_catalog(data_dir: Path, provider: str, models: list):
+    """Catalogo minimo letto da models_test e models_ok."""
+    data_dir.mkdir(parents=True, exist_ok=True)
+    (data_dir / f"models_{provider}.txt").write_text(
+        "".join(f"{m}\n" for m in models), encoding="utf-8")
+    (data_dir / f"models_{provider}_wnd.txt").write_text(
+        "".join(f"{m}|128k\n" for m in models), encoding="utf-8")
+
+
+def bench_overhead(requests_count: int) -> dict:
+    """Latenza lato client con server a latenza nulla (ms, p50/p95)."""
+    import models_ok
+
+    results = {}
+    for provider in OVERHEAD_PROVIDERS:
+        for stream in (False, True):
+            samples = []
+            for _ in range(requests_count):
+                success, metrics, _, err = models_ok.measure_once(
+                    provider, "overhead", "mock", "ping", stream)
+                if not success:
+                    raise RuntimeError(f"{provider}: {err}")
+                samples.append(metrics["total"] * 1000)
+            stats = summarize(samples, "none")
+            name = f"{provider}{'_stream' if stream else ''}"
+            results[name] = {"p50_ms": stats["p50"], "p95_ms": stats["p95"]}
+    return results
+
+
+def bench_probe(models_per_provider: int, levels: list) -> dict:
+    """Tempo per testare tutti i modelli con max_in_flight crescente."""
+    import models_test
+
+    results = {}
+    total = models_per_provider * len(PROBE_PROVIDERS)
+    for in_flight in levels:
+        limits = {p: {"rps": 10000.0, "rpm": 1000000.0, "max_in_flight": in_flight}
+                  for p in PROBE_PROVIDERS}
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(models_test.run_concurrent_async(list(PROBE_PROVIDERS), limits))
+        elapsed = time.perf_counter() - started
+        results[f"inflight_{in_flight}"] = {"seconds": elapsed, "probes_per_s": total / elapsed}
+
+    base = results[f"inflight_{levels[0]}"]["probes_per_s"]
+    for in_flight in levels:
+        entry = results[f"inflight_{in_flight}"]
+        # Efficienza: guadagno reale rispetto a quello ideale
+        entry["efficiency"] = entry["probes_per_s"] / (base * in_flight / levels[0])
+    return results
+
+
+def bench_select(runs: int) -> dict:
+    """Benchmark ripetuto di models_ok e verifica della classifica."""
+    import models_ok
+
+    models_to_test = [(model_id, 131072, 0) for model_id in SELECT_LATENCIES]
+    results = {}
+    for stream in (False, True):
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            tested, _ = models_ok.run_benchmarks(
+                "groq", "mock", models_to_test, [("default", models_ok.DEFAULT_QUERY)],
+                stream, runs > 1, runs, 0, 0.0, "none", "p50", None)
+        elapsed = time.perf_counter() - started
+        ranked = [m[0] for m in models_ok.filter_and_sort_models(tested, "total")]
+        expected = sorted(SELECT_LATENCIES, key=SELECT_LATENCIES.get)
+        results["stream" if stream else "plain"] = {
+            "seconds": elapsed,
+            "ranking_ok": ranked == expected,
+        }
+    return results
+
+
+def mock_config(seed: int) -> dict:
+    models = {f"groq/{m}": {"latency": latency} for m, latency in SELECT_LATENCIES.items()}
+    models["overhead"] = {"latency": 0.0, "itl": 0.0, "tokens": 5}
+    config = {
+        "seed": seed,
+        "default": {"latency": {"dist": "lognormal", "median": 0.02, "sigma": 0.2},
+                    "tokens": 10, "itl": 0.001},
+        "models": models,
+    }
+    return config
+
+
+def compare(results: dict, baseline: dict, max_regression: float) -> list:
+    """Confronta le durate (seconds, p50_ms) con il riferimento."""
+    regressions = []
+    for suite, entries in results.items():
+        for name, values in entries.items():
+            reference = baseline.get(suite, {}).get(name, {})
+            for metric in ("seconds", "p50_ms"):
+                base = reference.get(metric)
+                value = values.get(metric)
+                if base and value and value / base > max_regression:
+                    regressions.append((f"{suite}.{name}.{metric}", base, value))
+    return regressions
+
+
+def print_results(results: dict):
+    for suite, entries in results.items():
+        print(f"\n[{suite}]")
+        for name, values in entries.items():
+            text = ", ".join(
+                f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}" for k, v in values.items())
+            print(f"  {name:20} {text}")
+
+
+def do_main(suites: list, models_per_provider: int, levels: list, requests_count: int,
+            runs: int, seed: int, out_file: str, baseline_file: str,
+            max_regression: float) -> bool:
+    """
+    Esegue le suite richieste contro il server mock.
+
+    Returns:
+        bool: False se la classifica è errata o se c'è una regressione.
+    """
+    if models_per_provider < 1 or requests_count < 1 or runs < 1 or not levels:
+        print("Errore: parametri non validi")
+        return False
+
+    baseline = None
+    if baseline_file:
+        try:
+            baseline = json.loads(Path(baseline_file).read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            print(f"Errore nel riferimento: {e}")
+            return False
+
+    results = {}
+    original_dir = os.getcwd()
+    original_env = dict(os.environ)
+    with MockProviderProcess(mock_config(seed)) as server, \
+            tempfile.TemporaryDirectory(prefix="bench_offline_") as workdir:
+        # Tutti i provider finiscono sullo stesso host locale: il pool deve
+        # bastare per le richieste in volo di tutti, come con host separati
+        original_pool = http_transport.POOL_SIZE
+        http_transport.POOL_SIZE = max(original_pool, max(levels) * len(PROBE_PROVIDERS))
+        http_transport.close_all()
+        http_transport.redirect_endpoints(server.base_url)
+        for provider in PROBE_PROVIDERS:
+            os.environ[f"{provider.upper()}_API_KEY"] = "mock"
+        try:
+            os.chdir(workdir)
+            import models_test
+            models_test.SEQUENTIAL_PAUSE = 0.0
+            for provider in PROBE_PROVIDERS:
+                write_catalog(Path("data"), provider,
+                              [f"{provider}-model-{i}" for i in range(models_per_provider)])
+
+            print(f"Server mock su {server.base_url}, directory di lavoro {workdir}")
+            if "overhead" in suites:
+                results["overhead"] = bench_overhead(requests_count)
+            if "probe" in suites:
+                results["probe"] = bench_probe(models_per_provider, levels)
+            if "select" in suites:
+                results["select"] = bench_select(runs)
+            results["_server"] = {"responses": {"total": sum(
+                sum(codes.values()) for codes in server.get_stats().values())}}
+        finally:
+            os.chdir(original_dir)
+            os.environ.clear()
+            os.environ.update(original_env)
+            http_transport.close_all()
+            http_transport.POOL_SIZE = original_pool
+
+    print_results(results)
+
+    success = True
+    for name, entry in results.get("select", {}).items():
+        if not entry["ranking_ok"]:
+            print(f"ERRORE: classifica errata in select.{name}")
+            success = False
+
+    if out_file:
+        Path(out_file).write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"\nRisultati salvati in {out_file}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, max_regression)
+        for name, base, value in regressions:
+            print(f"REGRESSIONE {name}: {base:.3f} -> {value:.3f} (x{value / base:.2f})")
+        if regressions:
+            success = False
+        else:
+            print(f"Nessuna regressione oltre x{max_regression:.2f}")
+    return success
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark offline di probe e selezione contro un server mock locale.")
+    parser.add_argument("--suite", action="append", choices=SUITES, default=None,
+                        help="Suite da eseguire, ripetibile (default: tutte)")
+    parser.add_argument("--models", type=int, default=40,
+                        help="Modelli sintetici per provider nella suite probe (default: 40)")
+    parser.add_argument("--levels", default="1,4,16",
+                        help="Richieste in volo per provider da provare (default: 1,4,16)")
+    parser.add_argument("--requests", type=int, default=50,
+                        help="Richieste per caso nella suite overhead (default: 50)")
+    parser.add_argument("--runs", type=int, default=3,
+                        help="Ripetizioni per modello nella suite select (default: 3)")
+    parser.add_argument("--seed", type=int, default=1,
+                        help="Seme delle distribuzioni del server mock (default: 1)")
+    parser.add_argument("--out", default=None, help="File JSON dei risultati")
+    parser.add_argument("--baseline", default=None,
+                        help="Risultati di riferimento da confrontare")
+    parser.add_argument("--max-regression", type=float, default=1.25,
+                        help="Rapporto massimo tollerato rispetto al riferimento (default: 1.25)")
+    args = parser.parse_args()
+
+    try:
+        levels = [int(v) for v in args.levels.split(",") if v.strip()]
+    except ValueError:
+        print(f"Errore: --levels non valido '{args.levels}'")
+        sys.exit(1)
+
+    if do_main(args.suite or list(SUITES), args.models, levels, args.requests, args.runs,
+               args.seed, args.out, args.baseline, args.max_regression):
+        sys.exit(0)
+    else:
+        sys.exit(1)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Bench Stats - Statistiche per i benchmark ripetuti.
+
+Calcola percentili (con interpolazione lineare), media, deviazione standard
+e rimozione degli outlier sui campioni raccolti da models_ok.py.
+"""
+
+__date__ = "2026-10-16"
+__version__ = "1.0.0"
+__author__ = "Gemini CLI"
+
+import math
+import statistics
+
+
+PERCENTILES = {"p50": 50.0, "p95": 95.0, "p99": 99.0}
+
+# Metodi di rimozione degli outlier
+TRIM_METHODS = ("none", "iqr", "fraction")
+
+
+def percentile(values: list, pct: float) -> float:
+    """
+    Percentile con interpolazione lineare tra i ranghi più vicini.
+    Restituisce None se non ci sono valori.
+    """
+    if not values:
+        return None
+    if pct < 0 or pct > 100:
+        raise ValueError("Il percentile deve essere tra 0 e 100")
+
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+
+    rank = (len(ordered) - 1) * pct / 100.0
+    lower = math.floor(rank)
+    upper = math.ceil(rank)
+    weight = rank - lower
+    value = ordered[lower] + (ordered[upper] - ordered[lower]) * weight
+    return value
+
+
+def trim_outliers(values: list, method: str = "iqr", fraction: float = 0.1) -> list:
+    """
+    Rimuove gli outlier.
+
+    Args:
+        values: Campioni.
+        method: "iqr" (fuori da 1.5 * IQR), "fraction" (scarta la frazione
+            indicata da ciascuna coda) oppure "none".
+        fraction: Frazione per coda usata dal metodo "fraction".
+    Returns:
+        list: Campioni rimasti, ordinati.
+    """
+    if method not in TRIM_METHODS:
+        raise ValueError(f"Metodo di trimming sconosciuto: {method}")
+
+    ordered = sorted(values)
+    # Con pochi campioni il trimming toglierebbe informazione utile
+    if method == "none" or len(ordered) < 4:
+        return ordered
+
+    if method == "fraction":
+        cut = int(len(ordered) * fraction)
+        if cut == 0:
+            return ordered
+        kept = ordered[cut:len(ordered) - cut]
+        return kept
+
+    q1 = percentile(ordered, 25)
+    q3 = percentile(ordered, 75)
+    spread = q3 - q1
+    low = q1 - 1.5 * spread
+    high = q3 + 1.5 * spread
+    kept = [v for v in ordered if low <= v <= high]
+    return kept
+
+
+def summarize(values: list, method: str = "iqr", fraction: float = 0.1) -> dict:
+    """
+    Riassume una serie di campioni dopo la rimozione degli outlier.
+    Restituisce un dizionario vuoto se non ci sono campioni.
+    """
+    if not values:
+        return {}
+
+    kept = trim_outliers(values, method, fraction)
+    summary = {
+        "n": len(values),
+        "trimmed": len(values) - len(kept),
+        "min": kept[0],
+        "max": kept[-1],
+        "mean": statistics.fmean(kept),
+        "stddev": statistics.stdev(kept) if len(kept) > 1 else 0.0,
+    }
+    for name, pct in PERCENTILES.items():
+        summary[name] = percentile(kept, pct)
+    return summary
+
+
+def combine_series(series: list, method: str = "iqr", fraction: float = 0.1) -> dict:
+    """
+    Riassunto complessivo di più serie di campioni (es. i prompt di un
+    workload, di lunghezza diversa).
+    Gli outlier sono rimossi per serie, così i campioni delle serie lente
+    non vengono scartati. I campioni rimasti sono divisi per la mediana
+    della loro serie e riuniti: media, deviazione standard e percentili
+    sono calcolati su questi valori e riportati alla scala della mediana
+    media delle serie: sono quelli di un'unica distribuzione, in cui le
+    serie più lente non dominano la variabilità.
+    Restituisce un dizionario vuoto se non ci sono campioni.
+    """
+    series = [values for values in series if values]
+    if not series:
+        return {}
+
+    kept_series = [trim_outliers(values, method, fraction) for values in series]
+    medians = [statistics.median(kept) for kept in kept_series]
+    scale = statistics.fmean(medians)
+    pooled = []
+    for kept, median in zip(kept_series, medians):
+        # Mediana nulla (es. ttft di 0): la serie resta nella sua scala
+        pooled.extend(v / median * scale if median else v for v in kept)
+
+    summary = {
+        "n": sum(len(values) for values in series),
+        "trimmed": sum(len(values) - len(kept) for values, kept in zip(series, kept_series)),
+        "min": min(kept[0] for kept in kept_series),
+        "max": max(kept[-1] for kept in kept_series),
+        "mean": statistics.fmean(pooled),
+        "stddev": statistics.stdev(pooled) if len(pooled) > 1 else 0.0,
+    }
+    for name, pct in PERCENTILES.items():
+        summary[name] = percentile(pooled, pct)
+    return summary
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Capability Index - Indice delle capacità dei modelli.
+
+Le capacità di ogni modello (chat, modalità di input/output, finestra,
+prezzo, pipeline tag) vengono calcolate una sola volta durante il recupero
+del catalogo da capabilities_for e salvate nel catalogo JSON Lines
+data/models_<provider>.jsonl (vedi catalog_writer.write_catalog).
+CapabilityIndex carica solo i provider richiesti e costruisce insiemi per
+capacità: ricerca di un modello e verifica di una capacità costano O(1),
+le interrogazioni sono intersezioni di insiemi.
+Per i cataloghi generati prima del file .jsonl l'indice viene ricostruito
+una volta dal file _info.txt.
+"""
+
+__date__ = "2026-10-16"
+__version__ = "1.0.0"
+__author__ = "Gemini CLI"
+
+import sys
+import json
+import argparse
+from pathlib import Path
+
+
+DATA_DIR = Path("data")
+
+# Parole chiave nell'ID dei modelli esclusi dalla chat
+GEMINI_NON_CHAT = ("image", "tts", "robotics")
+MISTRAL_NON_CHAT = ("pixtral", "voxtral")
+
+
+def _parse_modality(modality: str) -> tuple:
+    """'text+image->text' -> (['text', 'image'], ['text'])."""
+    source, sep, target = (modality or "").partition("->")
+    if not sep:
+        return [], []
+    inputs = [m for m in source.split("+") if m]
+    outputs = [m for m in target.split("+") if m]
+    return inputs, outputs
+
+
+def _pricing(metadata: dict):
+    pricing = metadata.get("pricing")
+    if not isinstance(pricing, dict):
+        return None
+    parsed = {}
+    for key in ("prompt", "completion"):
+        try:
+            parsed[key] = float(pricing.get(key))
+        except (TypeError, ValueError):
+            pass
+    result = parsed or None
+    return result
+
+
+def capabilities_for(provider: str, model_id: str, metadata: dict) -> dict:
+    """
+    Capacità di un modello dai metadati del provider.
+
+    Returns:
+        dict: chat, input_modalities, output_modalities, pipeline_tag, pricing.
+    """
+    metadata = metadata if isinstance(metadata, dict) else {}
+    lowered = model_id.lower()
+    inputs, outputs = ["text"], ["text"]
+    pipeline_tag = metadata.get("pipeline_tag")
+    chat = True
+
+    if provider == "openrouter":
+        architecture = metadata.get("architecture") or {}
+        inputs, outputs = _parse_modality(architecture.get("modality"))
+        if architecture.get("input_modalities"):
+            inputs = list(architecture["input_modalities"])
+        if architecture.get("output_modalities"):
+            outputs = list(architecture["output_modalities"])
+        chat = "text" in inputs and outputs == ["text"]
+    elif provider == "huggingface":
+        chat = pipeline_tag == "text-generation"
+    elif provider == "gemini":
+        if "image" in lowered:
+            outputs = ["text", "image"]
+        if "tts" in lowered:
+            outputs = ["audio"]
+        chat = not any(keyword in lowered for keyword in GEMINI_NON_CHAT)
+    elif provider == "mistral":
+        vision = (metadata.get("capabilities") or {}).get("vision")
+        if vision or "pixtral" in lowered:
+            inputs = ["text", "image"]
+        if "voxtral" in lowered:
+            inputs = ["text", "audio"]
+        chat = not any(keyword in lowered for keyword in MISTRAL_NON_CHAT)
+
+    capabilities = {
+        "chat": chat,
+        "input_modalities": inputs,
+        "output_modalities": outputs,
+        "pipeline_tag": pipeline_tag,
+        "pricing": _pricing(metadata),
+    }
+    return capabilities
+
+
+def _legacy_records(provider: str, data_dir: Path) -> list:
+    """Record ricostruiti dal file _info.txt per i cataloghi senza .jsonl."""
+    info_file = data_dir / f"models_{provider}_info.txt"
+    wnd_file = data_dir / f"models_{provider}_wnd.txt"
+    if not info_file.exists():
+        return []
+
+    windows = {}
+    if wnd_file.exists():
+        from catalog_cache import parse_wnd_file
+        for model_id, spec in parse_wnd_file(wnd_file).items():
+            windows[model_id] = spec["windowSize"] * 1024 or None
+
+    records = []
+    current = None
+    with open(info_file, "r", encoding="utf-8") as f:
+        for line in f:
+            label, sep, value = line.strip().partition(": ")
+            if label == "ID" and sep:
+                current = {"id": value}
+                records.append(current)
+            elif current is not None and sep:
+                if label == "Pipeline":
+                    current["pipeline_tag"] = value
+                elif label == "Modality":
+                    current["architecture"] = {"modality": value}
+
+    parsed = []
+    for metadata in records:
+        model_id = metadata["id"]
+        record = {"provider": provider, "id": model_id, "window": windows.get(model_id)}
+        record["capabilities"] = capabilities_for(provider, model_id, metadata)
+        parsed.append(record)
+    return parsed
+
+
+def _read_records(provider: str, data_dir: Path) -> list:
+    jsonl_file = data_dir / f"models_{provider}.jsonl"
+    if not jsonl_file.exists():
+        records = _legacy_records(provider, data_dir)
+        return records
+
+    records = []
+    with open(jsonl_file, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "capabilities" not in record:
+                record["capabilities"] = capabilities_for(
+                    provider, record["id"], record.get("metadata"))
+            records.append(record)
+    return records
+
+
+class CapabilityIndex:
+    """Indice in memoria delle capacità, caricato per provider al primo uso."""
+
+    def __init__(self, data_dir=DATA_DIR):
+        self.data_dir = Path(data_dir)
+        self.models = {}
+        self.sets = {}
+
+    def load(self, provider: str) -> dict:
+        """Carica e indicizza il catalogo di un provider (una sola volta)."""
+        models = self.models.get(provider)
+        if models is not None:
+            return models
+
+        models = {}
+        sets = {}
+        for record in _read_records(provider, self.data_dir):
+            capabilities = record["capabilities"]
+            entry = {
+                "provider": provider,
+                "id": record["id"],
+                "window": record.get("window"),
+                **capabilities,
+            }
+            model_id = entry["id"]
+            models[model_id] = entry
+
+            keys = [f"input:{m}" for m in capabilities["input_modalities"]]
+            keys += [f"output:{m}" for m in capabilities["output_modalities"]]
+            if capabilities["chat"]:
+                keys.append("chat")
+            if capabilities["pipeline_tag"]:
+                keys.append(f"pipeline:{capabilities['pipeline_tag']}")
+            pricing = capabilities["pricing"]
+            if pricing and not any(pricing.values()):
+                keys.append("free")
+            for key in keys:
+                sets.setdefault(key, set()).add(model_id)
+
+        self.models[provider] = models
+        self.sets[provider] = sets
+        return models
+
+    def get(self, provider: str, model_id: str):
+        """Record delle capacità di un modello (None se sconosciuto)."""
+        entry = self.load(provider).get(model_id)
+        return entry
+
+    def has(self, provider: str, model_id: str, capability: str = "chat") -> bool:
+        """Verifica una capacità: 'chat', 'free', 'input:image', 'pipeline:text-generation'..."""
+        self.load(provider)
+        found = model_id in self.sets[provider].get(capability, ())
+        return found
+
+    def query(self, provider: str, capabilities: tuple = ("chat",), min_window: int = 0) -> list:
+        """
+        Modelli del provider con tutte le capacità richieste e finestra
+        di almeno min_window token, nell'ordine del catalogo.
+        """
+        models = self.load(provider)
+        sets = self.sets[provider]
+        selected = None
+        for capability in capabilities:
+            matching = sets.get(capability, set())
+            selected = set(matching) if selected is None else selected & matching
+        if selected is None:
+            selected = set(models)
+
+        result = [model_id for model_id, entry in models.items()
+                  if model_id in selected and (entry["window"] or 0) >= min_window]
+        return result
+
+    def providers(self) -> list:
+        """Provider con un catalogo in data_dir."""
+        found = set()
+        if self.data_dir.is_dir():
+            for path in self.data_dir.glob("models_*_info.txt"):
+                found.add(path.name[len("models_"):-len("_info.txt")])
+            for path in self.data_dir.glob("models_*.jsonl"):
+                found.add(path.name[len("models_"):-len(".jsonl")])
+        providers = sorted(found)
+        return providers
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Interroga l'indice delle capacità dei modelli.")
+    parser.add_argument("provider", nargs="?", default=None,
+                        help="Provider da interrogare (default: tutti)")
+    parser.add_argument("--capability", action="append", default=None,
+                        help="Capacità richiesta, ripetibile (default: chat). Es. free, input:image")
+    parser.add_argument("--min-window", type=int, default=0,
+                        help="Finestra minima in token")
+    args = parser.parse_args()
+
+    index = CapabilityIndex()
+    providers = [args.provider] if args.provider else index.providers()
+    capabilities = tuple(args.capability or ["chat"])
+    total = 0
+    for provider in providers:
+        for model_id in index.query(provider, capabilities, args.min_window):
+            entry = index.get(provider, model_id)
+            print(f"{provider}|{model_id}|{entry['window'] or 'N/A'}")
+            total += 1
+    if not total:
+        print("Nessun modello trovato.")
+        sys.exit(1)
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Catalog Cache - Snapshot compilato dei file data/models_*_wnd.txt.
+
+La configurazione dei provider viene salvata in un unico file JSON
+(data/.catalog_cache.json) insieme a mtime e dimensione di ogni file
+sorgente. Se nessun file è cambiato il caricamento è una sola lettura;
+altrimenti vengono riletti solo i file modificati.
+"""
+
+__date__ = "2026-10-16"
+__version__ = "1.0.0"
+__author__ = "Gemini CLI"
+
+import os
+import sys
+import json
+import argparse
+from pathlib import Path
+
+
+CACHE_FILE_NAME = ".catalog_cache.json"
+CACHE_VERSION = 1
+WND_PREFIX = "models_"
+WND_SUFFIX = "_wnd.txt"
+
+
+def parse_window_size(value: str) -> int:
+    """Converte '1024k' in 1024; valori non numerici (es. 'N/A') valgono 0."""
+    size_str = value.strip().lower().replace("k", "")
+    try:
+        size_val = int(size_str)
+    except ValueError:
+        size_val = 0
+    return size_val
+
+
+def parse_wnd_file(file_path: Path) -> dict:
+    """
+    Legge un file id|window.
+
+    Returns:
+        dict: {model_id: {"windowSize": int}} nell'ordine del file.
+    """
+    models = {}
+    with open(file_path, "r", encoding="utf-8") as f:
+        for line in f:
+            model_name, sep, rest = line.strip().partition("|")
+            if not sep or not model_name:
+                continue
+            window_size_str = rest.partition("|")[0]
+            models[model_name] = {"windowSize": parse_window_size(window_size_str)}
+    return models
+
+
+def _scan_sources(data_dir: Path) -> list:
+    """Elenca i file _wnd.txt con le loro firme (mtime_ns, size)."""
+    sources = []
+    with os.scandir(data_dir) as entries:
+        for entry in entries:
+            name = entry.name
+            if not (name.startswith(WND_PREFIX) and name.endswith(WND_SUFFIX)):
+                continue
+            if not entry.is_file():
+                continue
+            stat = entry.stat()
+            sources.append((name, stat.st_mtime_ns, stat.st_size))
+    return sources
+
+
+def _read_snapshot(cache_file: Path) -> dict:
+    try:
+        snapshot = json.loads(cache_file.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if snapshot.get("version") != CACHE_VERSION:
+        return {}
+    files = snapshot.get("files", {})
+    return files
+
+
+def _write_snapshot(cache_file: Path, files: dict):
+    """Scrive lo snapshot su file temporaneo e lo rinomina in modo atomico."""
+    document = {"version": CACHE_VERSION, "files": files}
+    tmp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+    try:
+        tmp_file.write_text(json.dumps(document, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        # Una cache non scrivibile non deve bloccare il caricamento
+        try:
+            tmp_file.unlink()
+        except OSError:
+            pass
+
+
+def load_catalog(data_dir: str = "data", use_cache: bool = True) -> tuple:
+    """
+    Carica la configurazione dei provider usando lo snapshot compilato.
+
+    Returns:
+        tuple: (provider_config, numero di file riletti).
+    """
+    provider_config = {}
+    data_path = Path(data_dir)
+    if not data_path.is_dir():
+        return (provider_config, 0)
+
+    cache_file = data_path / CACHE_FILE_NAME
+    cached = _read_snapshot(cache_file) if use_cache else {}
+    sources = _scan_sources(data_path)
+
+    files = {}
+    parsed = 0
+    for name, mtime_ns, size in sources:
+        entry = cached.get(name)
+        if entry is None or entry.get("mtime_ns") != mtime_ns or entry.get("size") != size:
+            try:
+                models = parse_wnd_file(data_path / name)
+            except OSError as e:
+                print(f"Errore nel caricamento del file {data_path / name}: {e}")
+                continue
+            entry = {"mtime_ns": mtime_ns, "size": size, "models": models}
+            parsed += 1
+        files[name] = entry
+
+        provider_name = name[len(WND_PREFIX):-len(WND_SUFFIX)]
+        if entry["models"]:
+            provider_config[provider_name] = {
+                "client": provider_name,
+                "models": entry["models"],
+            }
+
+    # Riscrive lo snapshot solo se qualcosa è cambiato (anche file rimossi)
+    if use_cache and (parsed or set(files) != set(cached)):
+        _write_snapshot(cache_file, files)
+
+    result = (provider_config, parsed)
+    return result
+
+
+def load_provider_config(data_dir: str = "data") -> dict:
+    """Restituisce la sola configurazione dei provider (vedi load_catalog)."""
+    provider_config, _ = load_catalog(data_dir)
+    return provider_config
+
+
+def do_main(data_dir: str, rebuild: bool) -> bool:
+    """Aggiorna lo snapshot e stampa un riepilogo."""
+    if not Path(data_dir).is_dir():
+        print(f"Errore: {data_dir} non è una directory")
+        return False
+
+    if rebuild:
+        try:
+            (Path(data_dir) / CACHE_FILE_NAME).unlink()
+        except FileNotFoundError:
+            pass
+
+    provider_config, parsed = load_catalog(data_dir)
+    total = sum(len(p["models"]) for p in provider_config.values())
+    print(f"Catalogo: {len(provider_config)} provider, {total} modelli, {parsed} file riletti")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Aggiorna lo snapshot compilato del catalogo modelli.")
+    parser.add_argument("data_dir", nargs="?", default="data",
+                        help="Directory dei file _wnd.txt (default: data)")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Ignora lo snapshot esistente e rilegge tutti i file")
+    args = parser.parse_args()
+
+    if do_main(args.data_dir, args.rebuild):
+        sys.exit(0)
+    else:
+        sys.exit(1)
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Catalog Writer - Scrittura dei file di catalogo dei provider.
+
+write_catalog è la fase di scrittura comune a tutti gli script
+models_<provider>.py: ordina una sola volta i modelli e in una sola passata
+produce models_<provider>.txt, _wnd.txt, _info.txt e il catalogo JSON Lines
+models_<provider>.jsonl con tutti i metadati e le capacità del modello
+(vedi capability_index.py).
+I file vengono riscritti solo se il contenuto è cambiato, così il loro mtime
+resta stabile e le cache a valle (es. catalog_cache.py) non vengono
+invalidate inutilmente: per i provider i cui SDK non espongono ETag
+(Gemini, Mistral, Groq) è l'unico risparmio possibile. Con force i file
+vengono riscritti comunque. La scrittura passa da file temporanei rinominati in
+modo atomico: chi legge non vede mai un catalogo scritto a metà.
+Con cancel_writes(provider) le scritture successive di quel provider vengono
+scartate (es. un refresh oltre il timeout di models_refresh_all.py).
+"""
+
+__date__ = "2026-10-16"
+__version__ = "1.1.0"
+__author__ = "Gemini CLI"
+
+import os
+import json
+import filecmp
+import threading
+from pathlib import Path
+
+from capability_index import capabilities_for
+
+
+# Il controllo dell'annullamento e le ridenominazioni avvengono con questo
+# lock: dopo cancel_writes() nessun catalogo di quel provider cambia più
+_commit_lock = threading.Lock()
+_cancelled = set()
+
+
+class WriteCancelled(RuntimeError):
+    """La scrittura del catalogo è stata annullata con cancel_writes()."""
+
+
+def cancel_writes(provider: str):
+    """
+    Scarta le scritture future del catalogo del provider. Se una scrittura
+    è in corso di ridenominazione attende che finisca, così il catalogo
+    resta quello vecchio o quello nuovo per intero.
+    """
+    with _commit_lock:
+        _cancelled.add(provider)
+
+
+class AtomicFileSet:
+    """
+    Scrittura in streaming di più file insieme.
+    Ogni file viene scritto su un temporaneo; alla chiusura senza errori i
+    temporanei identici al file esistente vengono scartati, gli altri
+    rinominati in modo atomico. In caso di eccezione nessun file cambia.
+
+    Con force anche i temporanei identici vengono rinominati.
+    Con cancelled, se cancelled() è vera al momento di rinominare i file
+    vengono scartati tutti e si solleva WriteCancelled.
+
+    Uso:
+        with AtomicFileSet([p1, p2]) as (f1, f2):
+            f1.write(...)
+    """
+
+    def __init__(self, paths: list, cancelled=None, force: bool = False):
+        self.paths = [Path(p) for p in paths]
+        self.cancelled = cancelled
+        self.force = force
+        self.tmp_paths = []
+        self.handles = []
+        self.changed = 0
+
+    def __enter__(self):
+        for path in self.paths:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            self.tmp_paths.append(tmp_path)
+            self.handles.append(open(tmp_path, "w", encoding="utf-8"))
+        handles = tuple(self.handles)
+        return handles
+
+    def __exit__(self, exc_type, exc, tb):
+        for handle in self.handles:
+            handle.close()
+
+        if exc_type is not None:
+            self._discard()
+            return False
+
+        with _commit_lock:
+            if self.cancelled is not None and self.cancelled():
+                self._discard()
+                raise WriteCancelled(f"Scrittura di {', '.join(p.name for p in self.paths)} annullata")
+            for path, tmp_path in zip(self.paths, self.tmp_paths):
+                if not self.force and path.exists() and filecmp.cmp(path, tmp_path, shallow=False):
+                    tmp_path.unlink()
+                else:
+                    os.replace(tmp_path, path)
+                    self.changed += 1
+        return False
+
+    def _discard(self):
+        for tmp_path in self.tmp_paths:
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
+
+
+def catalog_paths(provider: str, data_dir: str = "data") -> list:
+    """Percorsi dei file di catalogo di un provider: txt, wnd, info e jsonl."""
+    base = Path(data_dir)
+    paths = [
+        base / f"models_{provider}.txt",
+        base / f"models_{provider}_wnd.txt",
+        base / f"models_{provider}_info.txt",
+        base / f"models_{provider}.jsonl",
+    ]
+    return paths
+
+
+def format_window(limit) -> str:
+    """Formato dei file _wnd.txt: '128k', '512' oppure 'N/A' se sconosciuto."""
+    if limit is None:
+        return "N/A"
+    text = f"{limit // 1024}k" if limit >= 1024 else f"{limit}"
+    return text
+
+
+def to_metadata(model) -> dict:
+    """Metadati completi di un modello: dict, oggetto pydantic degli SDK o oggetto semplice."""
+    if isinstance(model, dict):
+        return model
+    if hasattr(model, "model_dump"):
+        try:
+            metadata = model.model_dump(mode="json", exclude_none=True)
+            return metadata
+        except Exception:
+            pass
+    metadata = {k: v for k, v in vars(model).items() if not k.startswith("_")}
+    return metadata
+
+
+def catalog_entry(model_id: str, window, info: list, metadata: dict) -> dict:
+    """
+    Voce di catalogo passata a write_catalog.
+
+    Args:
+        model_id: ID del modello.
+        window: Finestra di contesto in token (None se sconosciuta).
+        info: Coppie (etichetta, valore) per il file _info.txt.
+        metadata: Metadati completi per il catalogo JSON Lines.
+    """
+    entry = {"id": model_id, "window": window, "info": info, "metadata": metadata}
+    return entry
+
+
+def write_catalog(provider: str, title: str, entries: list, data_dir: str = "data",
+                  force: bool = False) -> int:
+    """
+    Ordina le voci per ID e scrive tutti i formati del catalogo in una passata.
+
+    Args:
+        provider: Nome del provider nei nomi dei file.
+        title: Intestazione del file _info.txt.
+        entries: Voci create con catalog_entry.
+        data_dir: Directory di destinazione.
+        force: Riscrive anche i file il cui contenuto non è cambiato.
+
+    Returns:
+        int: Numero di file riscritti.
+    Raises:
+        WriteCancelled: se le scritture del provider sono state annullate.
+    """
+    ordered = sorted(entries, key=lambda entry: entry["id"])
+
+    file_set = AtomicFileSet(catalog_paths(provider, data_dir), lambda: provider in _cancelled, force)
+    with file_set as (names, wnd, info, jsonl):
+        info.write(f"{title} - INFORMAZIONI DETTAGLIATE\n")
+        info.write("=" * 50 + "\n\n")
+        for entry in ordered:
+            model_id = entry["id"]
+            names.write(f"{model_id}\n")
+            wnd.write(f"{model_id}|{format_window(entry['window'])}\n")
+            info.write(f"ID: {model_id}\n")
+            for label, value in entry["info"]:
+                info.write(f"{label}: {value}\n")
+            info.write("-" * 30 + "\n")
+            record = {"provider": provider, "id": model_id, "window": entry["window"],
+                      "capabilities": capabilities_for(provider, model_id, entry["metadata"]),
+                      "metadata": entry["metadata"]}
+            jsonl.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+    changed = file_set.changed
+    return changed
+
+
+def catalog_exists(provider: str, data_dir: str = "data") -> bool:
+    """Verifica che tutti i file di catalogo del provider esistano."""
+    exists = all(path.exists() for path in catalog_paths(provider, data_dir))
+    return exists
+
+
+def count_models(provider: str, data_dir: str = "data") -> int:
+    """Conta i modelli già presenti in models_<provider>.txt."""
+    path = catalog_paths(provider, data_dir)[0]
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            count = sum(1 for line in f if line.strip())
+    except FileNotFoundError:
+        count = 0
+    return count
+
+
+def report(provider_label: str, result: dict):
+    """Stampa il riepilogo di scrittura comune a tutti gli script."""
+    count = result["count"]
+    if result.get("not_modified"):
+        print(f"Catalogo {provider_label} invariato (304): {count} modelli, nessuna scrittura.")
+    elif result["changed"]:
+        print(f"Completato! Salvati {count} modelli {provider_label} in data/ ({result['changed']} file aggiornati)")
+    else:
+        print(f"Completato! {count} modelli {provider_label}: nessuna modifica, file invariati")
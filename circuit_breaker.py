@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Circuit Breaker - Protezione dai provider e modelli in errore.
+
+Ogni circuito osserva gli esiti delle ultime chiamate:
+- closed: le chiamate passano; se la quota di errori o di timeout supera
+  la soglia il circuito si apre;
+- open: le chiamate vengono rifiutate subito per open_seconds;
+- half_open: passa una chiamata di prova; se riesce il circuito si chiude,
+  altrimenti si riapre.
+I cambi di stato sono notificati ai listener registrati e conservati in un
+breve storico, così da poterli usare per gli allarmi.
+"""
+
+__date__ = "2026-10-16"
+__version__ = "1.0.0"
+__author__ = "Gemini CLI"
+
+import time
+import threading
+from collections import deque
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+DEFAULT_SETTINGS = {
+    "window": 20,
+    "min_calls": 5,
+    "error_threshold": 0.5,
+    "timeout_threshold": 0.3,
+    "open_seconds": 30.0,
+    "half_open_calls": 1,
+}
+
+
+def is_timeout_error(error) -> bool:
+    """Riconosce i timeout di requests, httpx, asyncio e socket."""
+    if error is None:
+        return False
+    if isinstance(error, TimeoutError):
+        return True
+    timeout = "timeout" in type(error).__name__.lower()
+    return timeout
+
+
+class CircuitBreaker:
+    """Circuito closed/open/half-open su una finestra delle ultime chiamate."""
+
+    def __init__(self, name: str, window: int = 20, min_calls: int = 5,
+                 error_threshold: float = 0.5, timeout_threshold: float = 0.3,
+                 open_seconds: float = 30.0, half_open_calls: int = 1,
+                 on_state_change=None):
+        if window < 1 or min_calls < 1 or open_seconds < 0:
+            raise ValueError("Parametri del circuit breaker non validi")
+        self.name = name
+        self.min_calls = min_calls
+        self.error_threshold = error_threshold
+        self.timeout_threshold = timeout_threshold
+        self.open_seconds = open_seconds
+        self.half_open_calls = max(1, half_open_calls)
+        self.on_state_change = on_state_change
+        self.results = deque(maxlen=window)
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.trials = 0
+        self.lock = threading.Lock()
+
+    def _transition(self, new_state: str, now: float):
+        old_state = self.state
+        if old_state == new_state:
+            return
+        self.state = new_state
+        if new_state == OPEN:
+            self.opened_at = now
+        if new_state == HALF_OPEN:
+            self.trials = 0
+        if new_state == CLOSED:
+            self.results.clear()
+        if self.on_state_change is not None:
+            self.on_state_change(self.name, old_state, new_state)
+
+    def allow(self, now: float = None) -> bool:
+        """Indica se una chiamata può passare (in half_open occupa uno slot di prova)."""
+        if now is None:
+            now = time.monotonic()
+        with self.lock:
+            if self.state == OPEN:
+                if now - self.opened_at < self.open_seconds:
+                    return False
+                self._transition(HALF_OPEN, now)
+                self.opened_at = now
+            if self.state == HALF_OPEN:
+                # Una prova mai conclusa non deve bloccare il circuito per sempre
+                if self.trials >= self.half_open_calls and now - self.opened_at < self.open_seconds:
+                    return False
+                if self.trials >= self.half_open_calls:
+                    self.trials = 0
+                    self.opened_at = now
+                self.trials += 1
+            return True
+
+    def is_open(self, now: float = None) -> bool:
+        """Verifica senza effetti collaterali se il circuito rifiuterebbe le chiamate."""
+        if now is None:
+            now = time.monotonic()
+        with self.lock:
+            blocked = self.state == OPEN and now - self.opened_at < self.open_seconds
+        return blocked
+
+    def record(self, ok: bool, timed_out: bool = False, now: float = None):
+        """Registra l'esito di una chiamata."""
+        if now is None:
+            now = time.monotonic()
+        with self.lock:
+            if self.state == HALF_OPEN:
+                if ok:
+                    self._transition(CLOSED, now)
+                else:
+                    self._transition(OPEN, now)
+                return
+
+            self.results.append((ok, timed_out))
+            if self.state != CLOSED or len(self.results) < self.min_calls:
+                return
+            total = len(self.results)
+            errors = sum(1 for success, _ in self.results if not success)
+            timeouts = sum(1 for _, timeout in self.results if timeout)
+            if errors / total >= self.error_threshold or timeouts / total >= self.timeout_threshold:
+                self._transition(OPEN, now)
+
+
+class BreakerRegistry:
+    """Insieme di circuiti con impostazioni comuni, listener e storico degli eventi."""
+
+    def __init__(self, settings: dict = None, history: int = 100):
+        self.settings = dict(DEFAULT_SETTINGS)
+        if settings:
+            self.settings.update(settings)
+        self.breakers = {}
+        self.listeners = []
+        self.events = deque(maxlen=history)
+        self.lock = threading.Lock()
+
+    def _notify(self, name: str, old_state: str, new_state: str):
+        event = {"time": time.time(), "breaker": name, "from": old_state, "to": new_state}
+        self.events.append(event)
+        for listener in list(self.listeners):
+            try:
+                listener(name, old_state, new_state)
+            except Exception as e:
+                print(f"Errore nel listener del circuit breaker: {e}")
+
+    def get(self, name: str) -> CircuitBreaker:
+        """Restituisce il circuito indicato, creandolo se serve."""
+        with self.lock:
+            breaker = self.breakers.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(name, on_state_change=self._notify, **self.settings)
+                self.breakers[name] = breaker
+        return breaker
+
+    def is_open(self, name: str) -> bool:
+        """Come CircuitBreaker.is_open, senza creare circuiti per nomi mai visti."""
+        with self.lock:
+            breaker = self.breakers.get(name)
+        if breaker is None:
+            return False
+        blocked = breaker.is_open()
+        return blocked
+
+    def add_listener(self, callback):
+        """Registra callback(nome, stato_precedente, nuovo_stato)."""
+        self.listeners.append(callback)
+
+    def states(self) -> dict:
+        """Stato corrente di tutti i circuiti."""
+        with self.lock:
+            snapshot = {name: breaker.state for name, breaker in self.breakers.items()}
+        return snapshot
+
+    def recent_events(self) -> list:
+        """Ultimi cambi di stato, dal più vecchio al più recente."""
+        events = list(self.events)
+        return events
+
+
+def provider_breaker_name(provider: str) -> str:
+    name = f"provider:{provider}"
+    return name
+
+
+def model_breaker_name(provider: str, model: str) -> str:
+    name = f"model:{provider}/{model}"
+    return name
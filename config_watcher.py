@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Config Watcher - Sorveglianza dei file di configurazione di LlmProvider.
+
+Un thread in background confronta le firme (mtime_ns, dimensione) dei file
+data/models_*_wnd.txt e di api_keys.json e, quando cambiano, chiama
+on_change con i nomi dei file modificati, aggiunti o rimossi.
+Su Linux il thread viene svegliato da inotify (via ctypes, senza dipendenze)
+appena una directory sorvegliata cambia; altrove, o se inotify non è
+disponibile, controlla le firme ogni interval secondi.
+Da riga di comando stampa i cambiamenti man mano che avvengono.
+"""
+
+__date__ = "2026-10-16"
+__version__ = "1.0.0"
+__author__ = "Gemini CLI"
+
+import os
+import sys
+import time
+import errno
+import select
+import argparse
+import threading
+from pathlib import Path
+
+from catalog_cache import WND_PREFIX, WND_SUFFIX
+
+
+DEFAULT_INTERVAL = 2.0
+
+# Attesa dopo un evento, per raccogliere in un solo reload le scritture vicine
+DEBOUNCE = 0.2
+
+# Eventi inotify: scrittura chiusa, rinomina (scrittura atomica), creazione, rimozione
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+
+def is_catalog_file(name: str) -> bool:
+    """True per i file data/models_<provider>_wnd.txt."""
+    return name.startswith(WND_PREFIX) and name.endswith(WND_SUFFIX)
+
+
+def scan_signatures(data_dir: Path, keys_file: Path) -> dict:
+    """Firme {percorso: (mtime_ns, size)} dei file sorvegliati esistenti."""
+    signatures = {}
+    try:
+        with os.scandir(data_dir) as entries:
+            for entry in entries:
+                if is_catalog_file(entry.name) and entry.is_file():
+                    stat = entry.stat()
+                    signatures[str(data_dir / entry.name)] = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        pass
+    try:
+        stat = keys_file.stat()
+        signatures[str(keys_file)] = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        pass
+    return signatures
+
+
+def diff_signatures(old: dict, new: dict) -> set:
+    """Percorsi modificati, aggiunti o rimossi tra due scansioni."""
+    changed = {path for path in old.keys() | new.keys() if old.get(path) != new.get(path)}
+    return changed
+
+
+class Inotify:
+    """Descrittore inotify minimo: serve solo a svegliare il watcher."""
+
+    def __init__(self, directories: list):
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        for directory in directories:
+            if libc.inotify_add_watch(self.fd, os.fsencode(str(directory)), WATCH_MASK) < 0:
+                err = ctypes.get_errno()
+                os.close(self.fd)
+                raise OSError(err, f"inotify_add_watch {directory}")
+
+    def wait(self, timeout: float) -> bool:
+        """Attende un evento fino a timeout secondi; True se è arrivato."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except OSError as e:
+            if e.errno != errno.EAGAIN:
+                raise
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+class ConfigWatcher:
+    """
+    Thread che chiama on_change(percorsi cambiati) a ogni modifica dei file
+    del catalogo o delle chiavi.
+    """
+
+    def __init__(self, on_change, data_dir: str = "data", keys_file: str = "api_keys.json",
+                 interval: float = DEFAULT_INTERVAL, use_inotify: bool = True):
+        self.on_change = on_change
+        self.data_dir = Path(data_dir)
+        self.keys_file = Path(keys_file)
+        self.interval = interval
+        self.use_inotify = use_inotify
+        self.mode = None
+        self.signatures = scan_signatures(self.data_dir, self.keys_file)
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def _open_inotify(self):
+        if not self.use_inotify or not sys.platform.startswith("linux"):
+            return None
+        directories = {self.data_dir.resolve(), self.keys_file.resolve().parent}
+        try:
+            notifier = Inotify(sorted(d for d in directories if d.is_dir()))
+        except (OSError, AttributeError):
+            return None
+        return notifier
+
+    def check(self) -> set:
+        """Confronta le firme e, se qualcosa è cambiato, chiama on_change."""
+        signatures = scan_signatures(self.data_dir, self.keys_file)
+        changed = diff_signatures(self.signatures, signatures)
+        self.signatures = signatures
+        if changed:
+            try:
+                self.on_change(changed)
+            except Exception as e:
+                # Un reload fallito non deve fermare la sorveglianza
+                print(f"Errore nel ricaricamento della configurazione: {e}")
+        return changed
+
+    def _run(self):
+        notifier = self._open_inotify()
+        self.mode = "inotify" if notifier is not None else "polling"
+        try:
+            while not self.stop_event.is_set():
+                if notifier is not None:
+                    # Il timeout fa da rete di sicurezza per gli eventi persi
+                    if notifier.wait(self.interval) and self.stop_event.wait(DEBOUNCE):
+                        break
+                elif self.stop_event.wait(self.interval):
+                    break
+                self.check()
+        finally:
+            if notifier is not None:
+                notifier.close()
+
+    def start(self):
+        """Avvia il thread di sorveglianza (daemon)."""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name="config-watcher", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Ferma il thread di sorveglianza."""
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+
+
+def do_main(data_dir: str, keys_file: str, interval: float, polling: bool) -> bool:
+    """Stampa i file cambiati finché non viene interrotto."""
+    if not Path(data_dir).is_dir():
+        print(f"Errore: {data_dir} non è una directory")
+        return False
+
+    def report(changed):
+        stamp = time.strftime("%H:%M:%S")
+        for path in sorted(changed):
+            print(f"{stamp} cambiato: {path}")
+
+    watcher = ConfigWatcher(report, data_dir, keys_file, interval, not polling)
+    watcher.start()
+    time.sleep(0.1)
+    print(f"Sorveglianza di {data_dir} e {keys_file} ({watcher.mode}), Ctrl+C per uscire")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.stop()
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Mostra le modifiche ai file del catalogo e delle chiavi.")
+    parser.add_argument("data_dir", nargs="?", default="data",
+                        help="Directory dei file _wnd.txt (default: data)")
+    parser.add_argument("--keys", default="api_keys.json", help="File delle chiavi (default: api_keys.json)")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL,
+                        help=f"Secondi tra due controlli (default: {DEFAULT_INTERVAL:g})")
+    parser.add_argument("--polling", action="store_true", help="Non usare inotify")
+    args = parser.parse_args()
+
+    if do_main(args.data_dir, args.keys, args.interval, args.polling):
+        sys.exit(0)
+    else:
+        sys.exit(1)
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Context Enrichment - Finestra di contesto reale dei modelli.
+
+Per i cataloghi che non espongono la finestra di contesto nella lista dei
+modelli (HuggingFace, Cerebras) recupera il limite reale con richieste
+parallele a concorrenza limitata:
+- HuggingFace: config.json del repository (max_position_embeddings e simili);
+- Cerebras: metadati del modello esposti dall'API del provider.
+I risultati, anche quelli negativi, sono salvati su disco
+(data/.context_cache.json) con chiave provider, modello e revisione: finché
+la revisione non cambia le esecuzioni successive non fanno richieste.
+"""
+
+__date__ = "2026-10-16"
+__version__ = "1.0.0"
+__author__ = "Gemini CLI"
+
+import os
+import json
+import time
+import tempfile
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import http_transport
+
+
+CACHE_FILE = Path("data") / ".context_cache.json"
+DEFAULT_WORKERS = 8
+DEFAULT_TIMEOUT = 15
+
+# Le voci senza una revisione precisa (es. "main") vengono riverificate dopo questo intervallo
+UNVERSIONED_TTL = 7 * 86400.0
+
+HF_CONFIG_URL = "https://huggingface.co/{model_id}/resolve/{revision}/config.json"
+CEREBRAS_MODEL_URL = "https://api.cerebras.ai/v1/models/{model_id}"
+
+# Campi di config.json che indicano la lunghezza massima della sequenza, in ordine di priorità
+HF_WINDOW_FIELDS = ("max_position_embeddings", "n_positions", "max_sequence_length",
+                    "seq_length", "model_max_length", "n_ctx")
+
+# Campi usati dai provider compatibili OpenAI per la finestra di contesto
+METADATA_WINDOW_FIELDS = ("context_length", "context_window", "max_context_length",
+                          "max_model_len", "max_input_tokens")
+
+
+def _positive_int(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)) and value > 0:
+        return int(value)
+    if isinstance(value, str) and value.isdigit() and int(value) > 0:
+        return int(value)
+    return None
+
+
+def window_from_fields(document: dict, fields: tuple):
+    """Primo campo valido tra fields; cerca anche in text_config/llm_config."""
+    if not isinstance(document, dict):
+        return None
+    for field in fields:
+        value = _positive_int(document.get(field))
+        if value:
+            return value
+    # Modelli multimodali: la parte testuale ha una configurazione annidata
+    for nested in ("text_config", "llm_config", "language_config"):
+        value = window_from_fields(document.get(nested), fields)
+        if value:
+            return value
+    return None
+
+
+# Serializza i salvataggi del processo: più fetcher (es. models_refresh_all)
+# possono scrivere lo stesso file da thread diversi
+_save_lock = threading.Lock()
+_shared = {}
+
+
+def _read_entries(path: Path) -> dict:
+    try:
+        entries = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return entries if isinstance(entries, dict) else {}
+
+
+def shared_cache(path=CACHE_FILE) -> "ContextCache":
+    """Cache unica per processo associata a path."""
+    path = Path(path).resolve()
+    with _save_lock:
+        cache = _shared.get(path)
+        if cache is None:
+            cache = ContextCache(path)
+            _shared[path] = cache
+    return cache
+
+
+class ContextCache:
+    """Cache su disco delle finestre di contesto, thread-safe."""
+
+    def __init__(self, path=CACHE_FILE):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.entries = _read_entries(self.path)
+        # Modifiche non ancora salvate: {chiave: voce}, applicate al file in save()
+        self.updates = {}
+
+    @staticmethod
+    def key(provider: str, model_id: str, revision: str) -> str:
+        key = f"{provider}:{model_id}@{revision}"
+        return key
+
+    def lookup(self, provider: str, model_id: str, revision: str, versioned: bool = True):
+        """
+        Returns:
+            tuple: (trovato, finestra). La finestra può essere None (esito negativo noto).
+        """
+        with self.lock:
+            entry = self.entries.get(self.key(provider, model_id, revision))
+        if entry is None:
+            return False, None
+        if not versioned and time.time() - entry.get("checked_at", 0) > UNVERSIONED_TTL:
+            return False, None
+        found = (True, entry.get("window"))
+        return found
+
+    def store(self, provider: str, model_id: str, revision: str, window, source: str):
+        with self.lock:
+            # Una nuova revisione sostituisce quelle precedenti dello stesso modello
+            prefix = f"{provider}:{model_id}@"
+            for old_key in [k for k in self.entries if k.startswith(prefix)]:
+                del self.entries[old_key]
+            for old_key in [k for k in self.updates if k.startswith(prefix)]:
+                del self.updates[old_key]
+            key = self.key(provider, model_id, revision)
+            self.entries[key] = {"window": window, "source": source, "checked_at": time.time()}
+            self.updates[key] = self.entries[key]
+
+    @staticmethod
+    def _merge(entries: dict, updates: dict) -> dict:
+        """Applica le modifiche alle voci lette dal file (altre revisioni comprese)."""
+        merged = dict(entries)
+        for key in updates:
+            prefix = key.rpartition("@")[0] + "@"
+            for old_key in [k for k in merged if k.startswith(prefix)]:
+                del merged[old_key]
+        merged.update(updates)
+        return merged
+
+    def save(self):
+        """
+        Scrive la cache solo se modificata. Il file viene riletto e fuso con
+        le modifiche, così non si perdono le voci salvate nel frattempo da
+        altri fetcher, poi sostituito con una rinomina atomica.
+        """
+        with _save_lock, self.lock:
+            if not self.updates:
+                return
+            merged = self._merge(_read_entries(self.path), self.updates)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(prefix=f"{self.path.name}.", suffix=".tmp",
+                                            dir=self.path.parent)
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(merged, f, indent=1, sort_keys=True)
+                os.replace(tmp_name, self.path)
+            except BaseException:
+                try:
+                    os.unlink(tmp_name)
+                except OSError:
+                    pass
+                raise
+            self.entries = merged
+            self.updates = {}
+
+
+def fetch_hf_window(model_id: str, revision: str, headers: dict):
+    """
+    Legge config.json dal repository HuggingFace.
+
+    Returns:
+        tuple: (finestra o None, esito definitivo). Un esito non definitivo
+        (errore di rete, 5xx, 429) non viene salvato in cache.
+    """
+    url = HF_CONFIG_URL.format(model_id=model_id, revision=revision or "main")
+    try:
+        response = http_transport.get(url, headers=headers, timeout=DEFAULT_TIMEOUT)
+    except Exception:
+        return None, False
+    # 401/403: modello gated; 404: nessun config.json. In entrambi i casi l'esito è stabile
+    if response.status_code in (401, 403, 404):
+        return None, True
+    if response.status_code != 200:
+        return None, False
+    try:
+        config = response.json()
+    except ValueError:
+        return None, True
+    window = window_from_fields(config, HF_WINDOW_FIELDS)
+    return window, True
+
+
+def fetch_cerebras_window(model_id: str, headers: dict):
+    """Legge i metadati del singolo modello dall'API Cerebras."""
+    url = CEREBRAS_MODEL_URL.format(model_id=model_id)
+    try:
+        response = http_transport.get(url, headers=headers, timeout=DEFAULT_TIMEOUT)
+    except Exception:
+        return None, False
+    if response.status_code == 404:
+        return None, True
+    if response.status_code != 200:
+        return None, False
+    try:
+        metadata = response.json()
+    except ValueError:
+        return None, True
+    window = window_from_fields(metadata, METADATA_WINDOW_FIELDS)
+    return window, True
+
+
+def enrich_windows(provider: str, models: list, fetch, revision_of,
+                   workers: int = DEFAULT_WORKERS, cache: ContextCache = None) -> dict:
+    """
+    Recupera in parallelo le finestre dei modelli non presenti in cache.
+
+    Args:
+        provider: Nome del provider (parte della chiave di cache).
+        models: Modelli del catalogo (dict con "id").
+        fetch: fetch(model) -> (finestra o None, esito definitivo).
+        revision_of: revision_of(model) -> (revisione, versionata).
+        workers: Richieste contemporanee al massimo.
+        cache: Cache da usare (default: quella condivisa del processo su CACHE_FILE).
+
+    Returns:
+        dict: {model_id: finestra in token oppure None}.
+    """
+    if workers < 1:
+        raise ValueError("workers deve essere positivo")
+    if cache is None:
+        cache = shared_cache()
+
+    windows = {}
+    pending = []
+    for model in models:
+        model_id = model.get("id")
+        revision, versioned = revision_of(model)
+        found, window = cache.lookup(provider, model_id, revision, versioned)
+        if found:
+            windows[model_id] = window
+        else:
+            pending.append((model, model_id, revision))
+
+    def job(item):
+        model, model_id, revision = item
+        window, definitive = fetch(model)
+        if definitive:
+            cache.store(provider, model_id, revision, window, "fetch")
+        return model_id, window
+
+    if pending:
+        print(f"Recupero finestra di contesto per {len(pending)} modelli {provider} "
+              f"({len(windows)} in cache, {min(workers, len(pending))} richieste parallele)...")
+        with ThreadPoolExecutor(max_workers=min(workers, len(pending))) as pool:
+            for model_id, window in pool.map(job, pending):
+                windows[model_id] = window
+        cache.save()
+    return windows
+
+
+def enrich_huggingface(models: list, headers: dict, workers: int = DEFAULT_WORKERS,
+                       cache: ContextCache = None) -> dict:
+    """Finestre dei modelli HuggingFace, con chiave di cache sulla revisione (sha)."""
+    def revision_of(model):
+        sha = model.get("sha")
+        result = (sha, True) if sha else ("main", False)
+        return result
+
+    def fetch(model):
+        revision, _ = revision_of(model)
+        result = fetch_hf_window(model.get("id"), revision, headers)
+        return result
+
+    windows = enrich_windows("huggingface", models, fetch, revision_of, workers, cache)
+    return windows
+
+
+def enrich_cerebras(models: list, headers: dict, workers: int = DEFAULT_WORKERS,
+                    cache: ContextCache = None) -> dict:
+    """
+    Finestre dei modelli Cerebras: prima i campi già presenti nella lista,
+    poi l'endpoint del singolo modello. La revisione è il timestamp 'created'.
+    """
+    windows = {}
+    remaining = []
+    for model in models:
+        window = window_from_fields(model, METADATA_WINDOW_FIELDS)
+        if window:
+            windows[model.get("id")] = window
+        else:
+            remaining.append(model)
+
+    def revision_of(model):
+        created = model.get("created")
+        result = (str(created), True) if created else ("latest", False)
+        return result
+
+    def fetch(model):
+        result = fetch_cerebras_window(model.get("id"), headers)
+        return result
+
+    windows.update(enrich_windows("cerebras", remaining, fetch, revision_of, workers, cache))
+    return windows
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Context Scaling - Latenza dei modelli al crescere del contesto.
+
+Invia a un modello prompt di dimensione crescente (es. 1k, 8k, 32k token,
+fino alla sua finestra di contesto) in streaming e per ogni passo registra
+time-to-first-token (che a output minimo coincide con il prefill) e tempo
+totale. Sui punti misurati stima la curva ttft = a + b·n + c·n² (n in
+migliaia di token), da cui si ricava fino a che contesto un modello resta
+sotto una soglia di latenza. Usato da models_ok.py --context-scaling.
+"""
+
+__date__ = "2026-10-16"
+__version__ = "1.0.0"
+__author__ = "Gemini CLI"
+
+import json
+import time
+import uuid
+from pathlib import Path
+
+
+DEFAULT_STEPS = (1024, 8192, 32768, 65536, 131072)
+DEFAULT_MAX_TTFT = 5.0
+
+# Ultimo passo: una quota della finestra, per lasciare spazio alla risposta
+WINDOW_FILL = 0.9
+
+# Stima usata per dimensionare i prompt: circa 4 caratteri per token
+CHARS_PER_TOKEN = 4
+
+# Output minimo: interessa il prefill, non la generazione
+OUTPUT_TOKENS = 16
+
+FILLER = ("Il documento seguente contiene note tecniche, verbali di riunione, "
+          "elenchi di requisiti e osservazioni sul funzionamento del sistema. ")
+
+
+def parse_steps(text: str) -> list:
+    """Converte '1k,8k,32k' o '1024,8192' in una lista ordinata di token."""
+    steps = set()
+    for item in (text or "").split(","):
+        item = item.strip().lower()
+        if not item:
+            continue
+        multiplier = 1024 if item.endswith("k") else 1
+        try:
+            value = int(float(item.rstrip("k")) * multiplier)
+        except ValueError:
+            raise ValueError(f"Passo non valido: '{item}'")
+        if value <= 0:
+            raise ValueError(f"Passo non valido: '{item}'")
+        steps.add(value)
+    if not steps:
+        raise ValueError("Nessun passo indicato")
+    ordered = sorted(steps)
+    return ordered
+
+
+def steps_for_window(steps, window: int) -> list:
+    """Passi entro la finestra, più un ultimo passo vicino alla finestra stessa."""
+    if not window:
+        return list(steps)
+    limit = int(window * WINDOW_FILL)
+    selected = [step for step in steps if step <= limit]
+    if limit > 0 and (not selected or limit > selected[-1]):
+        selected.append(limit)
+    return selected
+
+
+def build_prompt(tokens: int, nonce: str) -> str:
+    """
+    Prompt di circa tokens token. Il nonce in testa evita che la cache dei
+    prefissi del provider riusi il prefill del passo precedente.
+    """
+    question = "\n\nRispondi solo con la parola OK."
+    head = f"[{nonce}] "
+    size = max(0, tokens * CHARS_PER_TOKEN - len(head) - len(question))
+    body = (FILLER * (size // len(FILLER) + 1))[:size]
+    prompt = head + body + question
+    return prompt
+
+
+def _solve(matrix: list, vector: list) -> list:
+    """Eliminazione di Gauss con pivot parziale (sistemi piccoli)."""
+    size = len(vector)
+    rows = [list(matrix[i]) + [vector[i]] for i in range(size)]
+    for col in range(size):
+        pivot = max(range(col, size), key=lambda r: abs(rows[r][col]))
+        if abs(rows[pivot][col]) < 1e-12:
+            raise ValueError("Sistema singolare")
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        for r in range(col + 1, size):
+            factor = rows[r][col] / rows[col][col]
+            for c in range(col, size + 1):
+                rows[r][c] -= factor * rows[col][c]
+    solution = [0.0] * size
+    for r in range(size - 1, -1, -1):
+        total = rows[r][size] - sum(rows[r][c] * solution[c] for c in range(r + 1, size))
+        solution[r] = total / rows[r][r]
+    return solution
+
+
+def fit_curve(points: list) -> dict:
+    """
+    Minimi quadrati di ttft rispetto ai migliaia di token.
+    Con almeno 4 punti distinti stima anche il termine quadratico
+    (il costo dell'attenzione cresce con n²), altrimenti solo la retta.
+
+    Args:
+        points: Coppie (token, secondi).
+    Returns:
+        dict: intercept, per_1k, per_1k2, r2; None se i punti non bastano.
+    """
+    xs = [tokens / 1000 for tokens, _ in points]
+    ys = [value for _, value in points]
+    if len(set(xs)) < 2:
+        return None
+    degree = 2 if len(set(xs)) >= 4 else 1
+
+    powers = [[x ** p for p in range(degree + 1)] for x in xs]
+    matrix = [[sum(row[i] * row[j] for row in powers) for j in range(degree + 1)]
+              for i in range(degree + 1)]
+    vector = [sum(row[i] * y for row, y in zip(powers, ys)) for i in range(degree + 1)]
+    try:
+        coefficients = _solve(matrix, vector)
+    except ValueError:
+        return None
+    coefficients += [0.0] * (3 - len(coefficients))
+
+    mean = sum(ys) / len(ys)
+    total = sum((y - mean) ** 2 for y in ys)
+    residual = sum((y - sum(c * x ** p for p, c in enumerate(coefficients))) ** 2
+                   for x, y in zip(xs, ys))
+    fit = {
+        "intercept": coefficients[0],
+        "per_1k": coefficients[1],
+        "per_1k2": coefficients[2],
+        "r2": 1 - residual / total if total > 0 else 1.0,
+    }
+    return fit
+
+
+def predict(fit: dict, tokens: int) -> float:
+    """ttft stimato per un contesto di tokens token."""
+    x = tokens / 1000
+    value = fit["intercept"] + fit["per_1k"] * x + fit["per_1k2"] * x * x
+    return value
+
+
+def fast_until(fit: dict, window: int, max_ttft: float) -> int:
+    """Contesto massimo (a passi di 1k, entro la finestra) con ttft stimato sotto max_ttft."""
+    if fit is None or not window:
+        return None
+    best = 0
+    for tokens in range(1024, window + 1, 1024):
+        if predict(fit, tokens) > max_ttft:
+            break
+        best = tokens
+    return best
+
+
+def scale_model(measure, window: int, steps: list, runs: int = 1,
+                pause: float = 0.0, max_ttft: float = DEFAULT_MAX_TTFT) -> dict:
+    """
+    Misura un modello a contesti crescenti.
+
+    Args:
+        measure: measure(prompt) -> (esito, metriche con total/ttft, errore).
+        window: Finestra di contesto dichiarata (token).
+        steps: Dimensioni del contesto da provare (token).
+        runs: Ripetizioni per passo (si tiene la mediana).
+        pause: Pausa tra le richieste.
+        max_ttft: Soglia per fast_until.
+    Returns:
+        dict: steps (per passo ttft/total/prefill o errore), fit, fast_until.
+    """
+    measured = []
+    baseline = None
+    for tokens in steps_for_window(steps, window):
+        ttfts = []
+        totals = []
+        error = ""
+        for _ in range(runs):
+            success, metrics, err = measure(build_prompt(tokens, uuid.uuid4().hex[:12]))
+            if success and "ttft" in metrics:
+                ttfts.append(metrics["ttft"])
+                totals.append(metrics["total"])
+            else:
+                error = err or "errore"
+            time.sleep(pause)
+
+        if not ttfts:
+            # Oltre questo passo il modello non risponde: la finestra reale è più piccola
+            measured.append({"tokens": tokens, "error": error})
+            break
+        ttft = sorted(ttfts)[len(ttfts) // 2]
+        if baseline is None:
+            baseline = ttft
+        measured.append({
+            "tokens": tokens,
+            "ttft": ttft,
+            "total": sorted(totals)[len(totals) // 2],
+            # Costo marginale rispetto al passo più piccolo
+            "prefill": max(0.0, ttft - baseline),
+            "errors": runs - len(ttfts),
+        })
+
+    points = [(s["tokens"], s["ttft"]) for s in measured if "ttft" in s]
+    fit = fit_curve(points)
+    # Se un passo fallisce, la stima non va oltre l'ultimo contesto riuscito
+    usable = points[-1][0] if points and "error" in measured[-1] else window
+    result = {
+        "window": window,
+        "steps": measured,
+        "fit": fit,
+        "fast_until": fast_until(fit, usable, max_ttft),
+        "max_ttft": max_ttft,
+    }
+    return result
+
+
+def format_scaling(result: dict) -> str:
+    """Riga di riepilogo per la stampa."""
+    parts = []
+    for step in result["steps"]:
+        if "ttft" in step:
+            parts.append(f"{step['tokens'] // 1024}k={step['ttft']:.2f}s")
+        else:
+            parts.append(f"{step['tokens'] // 1024}k=ERR")
+    fit = result["fit"]
+    if fit is not None:
+        parts.append(f"pendenza={fit['per_1k'] * 1000:.1f}ms/1k (r2={fit['r2']:.2f})")
+    if result["fast_until"] is not None:
+        parts.append(f"ttft<{result['max_ttft']:g}s fino a {result['fast_until'] // 1024}k")
+    text = ", ".join(parts)
+    return text
+
+
+def save_context_results(provider: str, results: dict, options: dict) -> Path:
+    """Salva le curve in data_ok/<provider>_context.json."""
+    output_dir = Path("data_ok")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    output_file = output_dir / f"{provider}_context.json"
+    document = {
+        "provider": provider,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "options": options,
+        "models": results,
+    }
+    output_file.write_text(json.dumps(document, indent=2), encoding="utf-8")
+    return output_file
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+HTTP Cache - GET condizionali per i cataloghi dei provider.
+
+Per ogni URL salva su disco (data/.http_cache/) il corpo JSON della risposta
+insieme a ETag e Last-Modified. Le richieste successive inviano
+If-None-Match / If-Modified-Since: se il server risponde 304 si riusa il
+corpo salvato senza riscaricarlo.
+"""
+
+__date__ = "2026-10-16"
+__version__ = "1.0.0"
+__author__ = "Gemini CLI"
+
+import os
+import json
+import hashlib
+from pathlib import Path
+from urllib.parse import urlencode
+
+import http_transport
+
+
+CACHE_DIR = Path("data") / ".http_cache"
+
+
+def _cache_file(url: str, params: dict) -> Path:
+    """Nome del file di cache: hash di URL e parametri (non degli header)."""
+    key = url
+    if params:
+        key = f"{url}?{urlencode(sorted(params.items()))}"
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    path = CACHE_DIR / f"{digest}.json"
+    return path
+
+
+def _read_entry(path: Path) -> dict:
+    try:
+        entry = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        entry = {}
+    return entry
+
+
+def _write_entry(path: Path, entry: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_file.write_text(json.dumps(entry), encoding="utf-8")
+    os.replace(tmp_file, path)
+
+
+def cached_get_json(url: str, headers: dict = None, params: dict = None,
+                    timeout: float = 30, force: bool = False) -> tuple:
+    """
+    GET condizionale che restituisce il corpo JSON.
+
+    Args:
+        url: URL da interrogare.
+        headers: Header della richiesta (es. Authorization).
+        params: Parametri di query.
+        timeout: Timeout in secondi.
+        force: Ignora la cache e riscarica sempre.
+    Returns:
+        tuple: (dati JSON, True se il server ha risposto 304 Not Modified).
+    Raises:
+        requests.HTTPError per risposte diverse da 200/304.
+    """
+    path = _cache_file(url, params)
+    entry = {} if force else _read_entry(path)
+
+    request_headers = dict(headers or {})
+    if "body" in entry:
+        if entry.get("etag"):
+            request_headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            request_headers["If-Modified-Since"] = entry["last_modified"]
+
+    response = http_transport.get(url, headers=request_headers,
+                                  params=params, timeout=timeout)
+
+    if response.status_code == 304 and "body" in entry:
+        result = (entry["body"], True)
+        return result
+
+    response.raise_for_status()
+    data = response.json()
+
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if etag or last_modified:
+        new_entry = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "body": data,
+        }
+        try:
+            _write_entry(path, new_entry)
+        except OSError as e:
+            print(f"Avviso: impossibile salvare la cache HTTP: {e}")
+
+    result = (data, False)
+    return result
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+HTTP Transport - Sessioni HTTP condivise per probe e benchmark.
+
+Mantiene una sessione keep-alive con pool di connessioni per ogni host dei
+provider, così che le richieste successive riutilizzino la stessa connessione
+TCP/TLS. Se disponibile la libreria httpx (con il pacchetto h2) si può
+abilitare HTTP/2. La funzione preconnect apre le connessioni in anticipo,
+in modo che le misure di latenza riguardino il modello e non l'handshake.
+"""
+
+__date__ = "2026-10-16"
+__version__ = "1.0.0"
+__author__ = "Gemini CLI"
+
+import os
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Endpoint e dimensione del pool sono condivisi con l'API async
+import provider_endpoints
+from provider_endpoints import GEMINI_BASE_URL, HF_INFERENCE_URL, OPENAI_COMPATIBLE_ENDPOINTS, POOL_SIZE
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+def redirect_endpoints(base_url: str):
+    """
+    Punta gli endpoint di tutti i provider verso base_url (vedi
+    provider_endpoints.redirect_endpoints), aggiornando anche gli URL
+    esposti da questo modulo.
+    """
+    global GEMINI_BASE_URL, HF_INFERENCE_URL
+    provider_endpoints.redirect_endpoints(base_url)
+    GEMINI_BASE_URL = provider_endpoints.GEMINI_BASE_URL
+    HF_INFERENCE_URL = provider_endpoints.HF_INFERENCE_URL
+
+
+# Eccezioni di timeout da trattare in modo uniforme
+if httpx is not None:
+    TIMEOUT_ERRORS = (requests.exceptions.Timeout, httpx.TimeoutException)
+else:
+    TIMEOUT_ERRORS = (requests.exceptions.Timeout,)
+
+_sessions = {}
+_lock = threading.Lock()
+_use_http2 = os.getenv("LLM_HTTP2", "") == "1"
+
+
+def http2_available() -> bool:
+    """Verifica se httpx e h2 sono installati."""
+    if httpx is None:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def enable_http2(enabled: bool = True) -> bool:
+    """
+    Abilita o disabilita HTTP/2 per le sessioni create da ora in poi.
+    Restituisce True se HTTP/2 è effettivamente attivo.
+    """
+    global _use_http2
+    if enabled and not http2_available():
+        print("HTTP/2 non disponibile (installare httpx[http2]): uso HTTP/1.1 keep-alive.")
+        enabled = False
+    with _lock:
+        if enabled != _use_http2:
+            _close_sessions_locked()
+        _use_http2 = enabled
+    return enabled
+
+
+def provider_hosts(providers: list) -> list:
+    """Restituisce gli URL base degli host usati dai provider indicati."""
+    urls = []
+    for provider in providers:
+        if provider == "gemini":
+            urls.append(GEMINI_BASE_URL)
+        elif provider == "huggingface":
+            urls.append(HF_INFERENCE_URL)
+        elif provider in OPENAI_COMPATIBLE_ENDPOINTS:
+            urls.append(OPENAI_COMPATIBLE_ENDPOINTS[provider])
+    return urls
+
+
+def _host_key(url: str) -> str:
+    parts = urlsplit(url)
+    key = f"{parts.scheme}://{parts.netloc}"
+    return key
+
+
+def _new_session():
+    if _use_http2:
+        session = httpx.Client(
+            http2=True,
+            limits=httpx.Limits(max_connections=POOL_SIZE,
+                                max_keepalive_connections=POOL_SIZE),
+        )
+        return session
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1,
+                          pool_maxsize=POOL_SIZE, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session(url: str):
+    """Restituisce la sessione condivisa per l'host dell'URL, creandola se serve."""
+    key = _host_key(url)
+    with _lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _new_session()
+            _sessions[key] = session
+    return session
+
+
+def post(url: str, **kwargs):
+    """POST sulla sessione condivisa dell'host (stessa firma di requests.post)."""
+    session = get_session(url)
+    response = session.post(url, **kwargs)
+    return response
+
+
+def get(url: str, **kwargs):
+    """GET sulla sessione condivisa dell'host (stessa firma di requests.get)."""
+    session = get_session(url)
+    response = session.get(url, **kwargs)
+    return response
+
+
+class _StreamResponse:
+    """Vista uniforme su una risposta in streaming (requests o httpx)."""
+
+    def __init__(self, response, is_httpx: bool):
+        self.response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.is_httpx = is_httpx
+
+    def iter_lines(self):
+        """Restituisce le righe del corpo man mano che arrivano."""
+        if self.is_httpx:
+            lines = self.response.iter_lines()
+        else:
+            # chunk_size=None: i dati arrivano appena letti, senza attendere 512 byte
+            lines = self.response.iter_lines(chunk_size=None, decode_unicode=True)
+        for line in lines:
+            if isinstance(line, bytes):
+                line = line.decode("utf-8", errors="replace")
+            yield line
+
+    def iter_chunks(self, chunk_size: int = 65536):
+        """Restituisce il corpo a blocchi di byte man mano che arriva."""
+        if self.is_httpx:
+            chunks = self.response.iter_bytes(chunk_size)
+        else:
+            chunks = self.response.iter_content(chunk_size)
+        for chunk in chunks:
+            yield chunk
+
+    def read_text(self) -> str:
+        """Legge tutto il corpo rimanente (utile per i messaggi di errore)."""
+        if self.is_httpx:
+            self.response.read()
+        text = self.response.text
+        return text
+
+
+@contextmanager
+def stream_request(method: str, url: str, **kwargs):
+    """
+    Richiesta in streaming sulla sessione condivisa dell'host.
+    Da usare come context manager: la connessione torna nel pool all'uscita.
+    """
+    session = get_session(url)
+    if httpx is not None and isinstance(session, httpx.Client):
+        with session.stream(method, url, **kwargs) as response:
+            yield _StreamResponse(response, True)
+        return
+
+    response = session.request(method, url, stream=True, **kwargs)
+    try:
+        yield _StreamResponse(response, False)
+    finally:
+        response.close()
+
+
+def stream_post(url: str, **kwargs):
+    """POST in streaming (vedi stream_request)."""
+    context = stream_request("POST", url, **kwargs)
+    return context
+
+
+def stream_get(url: str, **kwargs):
+    """GET in streaming (vedi stream_request)."""
+    context = stream_request("GET", url, **kwargs)
+    return context
+
+
+def _warm_up(url: str) -> bool:
+    key = _host_key(url)
+    try:
+        # Qualsiasi risposta va bene: serve solo ad aprire la connessione TLS
+        response = get_session(url).head(key + "/", timeout=5)
+        response.close()
+        ok = True
+    except Exception:
+        ok = False
+    return ok
+
+
+def preconnect(urls: list) -> int:
+    """
+    Apre in parallelo una connessione verso ogni host indicato.
+    Restituisce il numero di host raggiunti.
+    """
+    hosts = {}
+    for url in urls:
+        hosts.setdefault(_host_key(url), url)
+    if not hosts:
+        return 0
+
+    with ThreadPoolExecutor(max_workers=len(hosts)) as executor:
+        results = list(executor.map(_warm_up, hosts.values()))
+    connected = sum(1 for ok in results if ok)
+    return connected
+
+
+def _close_sessions_locked():
+    for session in _sessions.values():
+        try:
+            session.close()
+        except Exception:
+            pass
+    _sessions.clear()
+
+
+def close_all():
+    """Chiude tutte le sessioni aperte."""
+    with _lock:
+        _close_sessions_locked()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+JSON Stream - Lettura incrementale di array JSON.
+
+Estrae gli elementi di un array JSON di primo livello man mano che i byte
+arrivano dalla rete, senza caricare l'intero documento in memoria.
+La memoria occupata è limitata al singolo elemento più grande.
+"""
+
+__date__ = "2026-10-16"
+__version__ = "1.0.0"
+__author__ = "Gemini CLI"
+
+import json
+import codecs
+
+
+_WHITESPACE = " \t\r\n"
+
+
+def iter_json_array(chunks):
+    """
+    Restituisce uno alla volta gli elementi di un array JSON.
+
+    Args:
+        chunks: Iterabile di blocchi bytes (o str) che compongono il documento.
+    Raises:
+        ValueError: se il documento non è un array JSON valido.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    pos = 0
+    started = False
+    finished = False
+
+    for chunk in chunks:
+        if isinstance(chunk, bytes):
+            chunk = utf8.decode(chunk)
+        # Scarta la parte già consumata per tenere il buffer piccolo
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+        while not finished:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos >= len(buffer):
+                break
+
+            if not started:
+                if buffer[pos] != "[":
+                    raise ValueError("Il documento non è un array JSON")
+                started = True
+                pos += 1
+                continue
+
+            char = buffer[pos]
+            if char == "]":
+                finished = True
+                pos += 1
+                break
+            if char == ",":
+                pos += 1
+                continue
+
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Elemento incompleto: servono altri byte
+                break
+            # Un numero in fondo al buffer potrebbe continuare nel blocco successivo
+            if end == len(buffer) and not isinstance(item, (dict, list, str)):
+                break
+            pos = end
+            yield item
+
+    if not finished:
+        tail = buffer[pos:].strip()
+        if tail:
+            item, end = decoder.raw_decode(tail)
+            yield item
+            tail = tail[end:].strip().lstrip(",").strip()
+        if tail != "]":
+            raise ValueError("Array JSON troncato")
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Key Pool - Pool di chiavi API per provider, con un client per chiave.
+
+api_keys.json può elencare più chiavi per provider: il pool le usa tutte,
+scegliendo per ogni chiamata la chiave meno carica (o a turno) tra quelle
+con quota disponibile secondo il registro delle quote. Una chiave che
+riceve un 429 viene esclusa fino al ripristino della quota, una con errore
+di autenticazione (401/403) per AUTH_EJECT secondi; le altre continuano a
+servire le chiamate. I client dei singoli SDK sono creati al primo uso.
+"""
+
+__date__ = "2026-10-16"
+__version__ = "1.0.0"
+__author__ = "Gemini CLI"
+
+import time
+import threading
+
+from model_router import is_request_method
+from quota_ledger import DEFAULT_BACKOFF, QuotaExhausted, error_response, estimate_tokens
+
+
+LEAST_LOADED = "least_loaded"
+ROUND_ROBIN = "round_robin"
+STRATEGIES = (LEAST_LOADED, ROUND_ROBIN)
+
+# Esclusione di una chiave rifiutata dal provider (chiave revocata o errata)
+AUTH_EJECT = 600.0
+
+AUTH_STATUSES = (401, 403)
+
+SETTER_PREFIX = "set_"
+
+
+def is_key_setter(name: str) -> bool:
+    """Setter della chiave API: nel pool ogni client ha la sua, non si cambia."""
+    key_setter = name.startswith(SETTER_PREFIX) and "key" in name.lower()
+    return key_setter
+
+
+def request_tokens(args, kwargs) -> int:
+    """Stima dei token di una chiamata dai testi degli argomenti (prompt o messaggi)."""
+    texts = []
+    pending = list(args) + list(kwargs.values())
+    while pending:
+        value = pending.pop()
+        if isinstance(value, str):
+            texts.append(value)
+        elif isinstance(value, dict):
+            pending.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            pending.extend(value)
+    max_tokens = kwargs.get("max_tokens")
+    tokens = estimate_tokens("".join(texts), max_tokens if isinstance(max_tokens, int) else 0)
+    return tokens
+
+
+class PoolMember:
+    """Una chiave del pool con il suo client e il suo carico."""
+
+    def __init__(self, name: str, key: str):
+        self.name = name
+        self.key = key
+        self.client = None
+        self.in_flight = 0
+        self.calls = 0
+        self.errors = 0
+        self.ejected_until = 0.0
+        self.eject_reason = ""
+
+
+class KeyPool:
+    """
+    Chiavi di un provider condivise tra thread.
+
+    Args:
+        provider: Nome del client (usato anche nel registro delle quote).
+        keys: Lista di (nome, chiave); la prima è quella esportata.
+        factory: factory(chiave) -> client dell'SDK.
+        ledger: Registro delle quote (opzionale).
+        strategy: "least_loaded" o "round_robin".
+    """
+
+    def __init__(self, provider: str, keys: list, factory, ledger=None,
+                 strategy: str = LEAST_LOADED, max_wait: float = None):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Strategia sconosciuta: {strategy}")
+        if not keys:
+            raise ValueError(f"Nessuna chiave per {provider}")
+        self.provider = provider
+        self.members = [PoolMember(name, key) for name, key in keys]
+        self.factory = factory
+        self.ledger = ledger
+        self.strategy = strategy
+        if max_wait is None:
+            max_wait = ledger.max_wait if ledger is not None else 0.0
+        self.max_wait = max_wait
+        self.cursor = 0
+        # Ultimo valore di ogni setter applicato con configure(), ripetuto sui
+        # client creati dopo
+        self.settings = {}
+        self.ignored = set()
+        self.lock = threading.Lock()
+
+    def _client(self, member: PoolMember):
+        if member.client is None:
+            with self.lock:
+                if member.client is None:
+                    client = self.factory(member.key)
+                    for method, (args, kwargs) in self.settings.items():
+                        getattr(client, method)(*args, **kwargs)
+                    member.client = client
+        return member.client
+
+    def configure(self, method: str, *args, **kwargs):
+        """
+        Applica un setter (es. set_model) ai client di tutte le chiavi, anche
+        a quelli creati in seguito. Non passa dal registro delle quote.
+        I setter della chiave vengono ignorati: le chiavi sono quelle del pool.
+        """
+        if is_key_setter(method):
+            if method not in self.ignored:
+                self.ignored.add(method)
+                print(f"{method} ignorato: le chiavi del pool {self.provider} vengono da api_keys.json")
+            return
+        with self.lock:
+            self.settings[method] = (args, kwargs)
+            clients = [m.client for m in self.members if m.client is not None]
+        for client in clients:
+            getattr(client, method)(*args, **kwargs)
+
+    def _ordered(self) -> list:
+        """Chiavi nell'ordine di preferenza della strategia (con il lock)."""
+        count = len(self.members)
+        rotated = [self.members[(self.cursor + i) % count] for i in range(count)]
+        if self.strategy == LEAST_LOADED:
+            # sorted è stabile: a parità di carico vale il turno
+            rotated.sort(key=lambda m: m.in_flight)
+        return rotated
+
+    def _try_acquire(self, now: float, tokens: int) -> tuple:
+        """
+        Returns:
+            tuple: (chiave prenotata o None, secondi prima che se ne liberi una).
+        """
+        delays = []
+        with self.lock:
+            for member in self._ordered():
+                if member.ejected_until > now:
+                    delays.append(member.ejected_until - now)
+                    continue
+                delay = 0.0
+                if self.ledger is not None:
+                    delay = self.ledger.reserve(self.provider, member.key, tokens, now)
+                if delay > 0:
+                    delays.append(delay)
+                    continue
+                member.in_flight += 1
+                member.calls += 1
+                self.cursor = (self.members.index(member) + 1) % len(self.members)
+                return member, 0.0
+        return None, min(delays)
+
+    def acquire(self, tokens: int = 0) -> PoolMember:
+        """
+        Prenota una chiave per una chiamata di circa tokens token, attendendo
+        se sono tutte esaurite o escluse.
+
+        Raises:
+            QuotaExhausted: se servirebbe attendere più di max_wait.
+        """
+        waited = 0.0
+        while True:
+            member, delay = self._try_acquire(time.time(), tokens)
+            if member is not None:
+                return member
+            if waited + delay > self.max_wait:
+                raise QuotaExhausted(self.provider, time.time() + delay)
+            time.sleep(delay)
+            waited += delay
+
+    async def acquire_async(self, tokens: int = 0) -> PoolMember:
+        """Come acquire(), senza bloccare il loop."""
+        # Importato qui: il percorso sincrono non deve caricare asyncio
+        import asyncio
+
+        waited = 0.0
+        while True:
+            member, delay = self._try_acquire(time.time(), tokens)
+            if member is not None:
+                return member
+            if waited + delay > self.max_wait:
+                raise QuotaExhausted(self.provider, time.time() + delay)
+            await asyncio.sleep(delay)
+            waited += delay
+
+    def release(self, member: PoolMember, error=None, headers=None):
+        """
+        Chiude una chiamata: registra le quote ed esclude la chiave se serve.
+        headers sono quelli di una risposta riuscita, se il chiamante li vede.
+        """
+        status = 200 if headers is not None else None
+        if error is not None:
+            headers, status = error_response(error)
+        limited = False
+        if self.ledger is not None and (headers is not None or status == 429):
+            limited = self.ledger.observe(self.provider, member.key, headers, status)
+        now = time.time()
+        with self.lock:
+            member.in_flight -= 1
+            if error is None:
+                return
+            member.errors += 1
+            if status in AUTH_STATUSES:
+                self._eject(member, now + AUTH_EJECT, f"HTTP {status}")
+            elif limited or status == 429:
+                delay = DEFAULT_BACKOFF
+                if self.ledger is not None:
+                    delay = self.ledger.delay(self.provider, member.key, now=now) or DEFAULT_BACKOFF
+                self._eject(member, now + delay, "HTTP 429")
+
+    @staticmethod
+    def _eject(member: PoolMember, until: float, reason: str):
+        member.ejected_until = max(member.ejected_until, until)
+        member.eject_reason = reason
+
+    def delay(self) -> float:
+        """Secondi prima che almeno una chiave possa servire una chiamata."""
+        now = time.time()
+        delays = []
+        with self.lock:
+            for member in self.members:
+                delay = max(0.0, member.ejected_until - now)
+                if self.ledger is not None:
+                    delay = max(delay, self.ledger.delay(self.provider, member.key, now=now))
+                delays.append(delay)
+        return min(delays)
+
+    def call(self, method: str, *args, **kwargs):
+        """Esegue client.method(*args, **kwargs) con la chiave scelta dal pool."""
+        member = self.acquire(request_tokens(args, kwargs))
+        try:
+            value = getattr(self._client(member), method)(*args, **kwargs)
+        except Exception as e:
+            self.release(member, e)
+            raise
+        self.release(member)
+        return value
+
+    def has_keys(self, keys: list) -> bool:
+        """True se il pool usa esattamente queste (nome, chiave)."""
+        same = [(m.name, m.key) for m in self.members] == list(keys)
+        return same
+
+    def clients(self) -> list:
+        """Client di tutte le chiavi (creati ora se mancano)."""
+        clients = [self._client(member) for member in self.members]
+        return clients
+
+    def any_client(self):
+        """Client di una chiave qualsiasi, per gli attributi che non sono chiamate."""
+        client = self._client(self.members[0])
+        return client
+
+    def stats(self) -> list:
+        """Stato delle chiavi (senza le chiavi stesse)."""
+        now = time.time()
+        with self.lock:
+            rows = [{
+                "name": m.name,
+                "in_flight": m.in_flight,
+                "calls": m.calls,
+                "errors": m.errors,
+                "ejected_for": max(0.0, m.ejected_until - now),
+                "eject_reason": m.eject_reason if m.ejected_until > now else "",
+            } for m in self.members]
+        return rows
+
+
+class PooledClient:
+    """
+    Proxy di un client llmclient: i metodi di richiesta (vedi
+    is_request_method) sono distribuiti sulle chiavi del pool, i setter
+    (set_*) applicati a tutti i client e gli altri attributi letti dal
+    client della prima chiave.
+    """
+
+    def __init__(self, pool: KeyPool):
+        self._pool = pool
+
+    def __getattr__(self, name):
+        attr = getattr(self._pool.any_client(), name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+
+        if name.startswith(SETTER_PREFIX):
+            def pooled_setter(*args, **kwargs):
+                self._pool.configure(name, *args, **kwargs)
+
+            return pooled_setter
+
+        if not is_request_method(name):
+            return attr
+
+        def pooled_call(*args, **kwargs):
+            return self._pool.call(name, *args, **kwargs)
+
+        return pooled_call
+
+    @property
+    def pool(self):
+        return self._pool
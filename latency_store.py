@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Latency Store - Storico delle misure di latenza dei modelli.
+
+Ogni campione misurato da models_ok.py viene aggiunto a un archivio SQLite
+(data_ok/latency.sqlite) con timestamp, provider, modello, latenza,
+lunghezza della risposta ed eventuale errore.
+Da riga di comando permette di:
+- calcolare p50/p95 mobili per modello su una finestra (rolling);
+- rilevare regressioni rispetto a una finestra di riferimento (regress);
+- esportare i campioni in formato compatto CSV o JSON Lines (export).
+"""
+
+__date__ = "2026-10-16"
+__version__ = "1.0.0"
+__author__ = "Gemini CLI"
+
+import re
+import sys
+import csv
+import json
+import time
+import sqlite3
+import argparse
+from pathlib import Path
+
+from bench_stats import percentile
+
+
+DEFAULT_DB = Path("data_ok") / "latency.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    ts       REAL NOT NULL,
+    provider TEXT NOT NULL,
+    model    TEXT NOT NULL,
+    latency  REAL,
+    ttft     REAL,
+    tps      REAL,
+    length   INTEGER,
+    error    TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_samples_model_ts ON samples (provider, model, ts);
+CREATE INDEX IF NOT EXISTS idx_samples_ts ON samples (ts);
+"""
+
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+DURATION_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([smhdw])\s*$")
+
+
+def parse_duration(value: str) -> float:
+    """Converte '30m', '12h', '7d', '2w' in secondi."""
+    match = DURATION_RE.match(value or "")
+    if not match:
+        raise ValueError(f"Durata non valida '{value}': attesi ad esempio 30m, 12h, 7d")
+    seconds = float(match.group(1)) * DURATION_UNITS[match.group(2)]
+    return seconds
+
+
+class LatencyStore:
+    """Archivio append-only dei campioni di latenza."""
+
+    def __init__(self, db_path=DEFAULT_DB):
+        db_path = Path(db_path)
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def append(self, provider: str, model: str, latency: float = None,
+               length: int = 0, error: str = "", ttft: float = None,
+               tps: float = None, ts: float = None):
+        """Aggiunge un campione (latency None per le richieste fallite)."""
+        if ts is None:
+            ts = time.time()
+        self.conn.execute(
+            "INSERT INTO samples (ts, provider, model, latency, ttft, tps, length, error) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (ts, provider, model, latency, ttft, tps, length, error or None))
+        self.conn.commit()
+
+    def _rows(self, provider: str, start: float, end: float) -> list:
+        query = "SELECT model, latency, error FROM samples WHERE ts >= ? AND ts < ?"
+        params = [start, end]
+        if provider:
+            query += " AND provider = ?"
+            params.append(provider)
+        rows = self.conn.execute(query, params).fetchall()
+        return rows
+
+    def window_stats(self, provider: str, start: float, end: float) -> dict:
+        """
+        Statistiche per modello nell'intervallo [start, end).
+
+        Returns:
+            dict: {modello: {"n", "errors", "error_rate", "p50", "p95"}}.
+        """
+        grouped = {}
+        for model, latency, error in self._rows(provider, start, end):
+            entry = grouped.setdefault(model, {"latencies": [], "errors": 0})
+            if latency is None or error:
+                entry["errors"] += 1
+            else:
+                entry["latencies"].append(latency)
+
+        stats = {}
+        for model, entry in grouped.items():
+            total = len(entry["latencies"]) + entry["errors"]
+            stats[model] = {
+                "n": total,
+                "errors": entry["errors"],
+                "error_rate": entry["errors"] / total if total else 0.0,
+                "p50": percentile(entry["latencies"], 50),
+                "p95": percentile(entry["latencies"], 95),
+            }
+        return stats
+
+    def rolling(self, provider: str, window: float, now: float = None) -> dict:
+        """Statistiche dell'ultima finestra di window secondi."""
+        if now is None:
+            now = time.time()
+        stats = self.window_stats(provider, now - window, now + 1)
+        return stats
+
+    def regressions(self, provider: str, window: float, baseline: float,
+                    threshold: float = 1.25, metric: str = "p50",
+                    now: float = None) -> list:
+        """
+        Confronta l'ultima finestra con la finestra di riferimento che la precede.
+        Segnala i modelli il cui metric è cresciuto oltre threshold volte.
+
+        Returns:
+            list: Tuple (modello, valore di riferimento, valore attuale, rapporto).
+        """
+        if now is None:
+            now = time.time()
+        current = self.window_stats(provider, now - window, now + 1)
+        reference = self.window_stats(provider, now - window - baseline, now - window)
+
+        found = []
+        for model, stats in current.items():
+            base = reference.get(model, {}).get(metric)
+            value = stats.get(metric)
+            if base is None or value is None or base <= 0:
+                continue
+            ratio = value / base
+            if ratio >= threshold:
+                found.append((model, base, value, ratio))
+        found.sort(key=lambda item: item[3], reverse=True)
+        return found
+
+    def export(self, out_file: str, since: float = None, provider: str = None) -> int:
+        """
+        Esporta i campioni in CSV (.csv) o JSON Lines (altre estensioni).
+
+        Returns:
+            int: Numero di campioni esportati.
+        """
+        query = "SELECT ts, provider, model, latency, ttft, tps, length, error FROM samples WHERE ts >= ?"
+        params = [since or 0]
+        if provider:
+            query += " AND provider = ?"
+            params.append(provider)
+        query += " ORDER BY ts"
+        columns = ("ts", "provider", "model", "latency", "ttft", "tps", "length", "error")
+
+        count = 0
+        path = Path(out_file)
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            if path.suffix == ".csv":
+                writer = csv.writer(f)
+                writer.writerow(columns)
+                for row in self.conn.execute(query, params):
+                    writer.writerow(row)
+                    count += 1
+            else:
+                for row in self.conn.execute(query, params):
+                    record = {k: v for k, v in zip(columns, row) if v is not None}
+                    f.write(json.dumps(record, separators=(",", ":")) + "\n")
+                    count += 1
+        return count
+
+    def close(self):
+        self.conn.close()
+
+
+def _fmt(value) -> str:
+    text = f"{value:.2f}s" if value is not None else "-"
+    return text
+
+
+def print_rolling(stats: dict):
+    """Stampa la tabella delle statistiche mobili ordinata per p50."""
+    print(f"{'MODELLO':45} {'N':>5} {'ERR%':>6} {'P50':>8} {'P95':>8}")
+    ordered = sorted(stats.items(), key=lambda item: (item[1]["p50"] is None, item[1]["p50"] or 0))
+    for model, s in ordered:
+        print(f"{model[:45]:45} {s['n']:>5} {s['error_rate'] * 100:>5.1f}% {_fmt(s['p50']):>8} {_fmt(s['p95']):>8}")
+
+
+def do_main(command: str, provider: str, window: str, baseline: str,
+            threshold: float, metric: str, out_file: str, db_path: str) -> bool:
+    """Esegue il comando di interrogazione richiesto."""
+    if not Path(db_path).exists():
+        print(f"Errore: archivio {db_path} non trovato")
+        return False
+
+    try:
+        window_s = parse_duration(window)
+        baseline_s = parse_duration(baseline)
+    except ValueError as e:
+        print(f"Errore: {e}")
+        return False
+
+    store = LatencyStore(db_path)
+    success = True
+    try:
+        if command == "rolling":
+            stats = store.rolling(provider, window_s)
+            if not stats:
+                print("Nessun campione nella finestra richiesta.")
+            else:
+                print_rolling(stats)
+        elif command == "regress":
+            found = store.regressions(provider, window_s, baseline_s, threshold, metric)
+            if not found:
+                print(f"Nessuna regressione di {metric} oltre x{threshold:.2f}.")
+            for model, base, value, ratio in found:
+                print(f"REGRESSIONE {model}: {metric} {base:.2f}s -> {value:.2f}s (x{ratio:.2f})")
+            success = not found
+        elif command == "export":
+            if not out_file:
+                print("Errore: indicare --out per l'esportazione")
+                return False
+            since = time.time() - window_s
+            count = store.export(out_file, since, provider)
+            print(f"Esportati {count} campioni in {out_file}")
+    finally:
+        store.close()
+    return success
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Interroga lo storico delle latenze dei modelli.")
+    parser.add_argument("command", choices=["rolling", "regress", "export"],
+                        help="rolling: p50/p95 mobili; regress: confronto con baseline; export: esportazione")
+    parser.add_argument("provider", nargs="?", default=None,
+                        help="Provider da considerare (default: tutti)")
+    parser.add_argument("--window", default="7d",
+                        help="Finestra analizzata/esportata (default: 7d)")
+    parser.add_argument("--baseline", default="28d",
+                        help="Finestra di riferimento precedente a --window (default: 28d)")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="Rapporto oltre il quale segnalare una regressione (default: 1.25)")
+    parser.add_argument("--metric", choices=["p50", "p95"], default="p50",
+                        help="Percentile confrontato da regress (default: p50)")
+    parser.add_argument("--out", default=None,
+                        help="File di esportazione (.csv oppure .jsonl)")
+    parser.add_argument("--db", default=str(DEFAULT_DB),
+                        help=f"Archivio SQLite (default: {DEFAULT_DB})")
+    args = parser.parse_args()
+
+    if do_main(args.command, args.provider, args.window, args.baseline,
+               args.threshold, args.metric, args.out, args.db):
+        sys.exit(0)
+    else:
+        sys.exit(1)
@@ -1,133 +1,680 @@
 import os
 import json
-import glob
-from llmclient.gemini_client import GeminiClient
-from llmclient.groq_client import GroqClient
-from llmclient.mistral_client import MistralClient
-from llmclient.huggingface_client import HuggingFaceClient
-from llmclient.openrouter_client import OpenRouterClient
+import importlib
+import weakref
+import threading
+from types import MappingProxyType
+from pathlib import Path
+from collections import namedtuple
+
+from catalog_cache import load_provider_config
+from config_watcher import DEFAULT_INTERVAL, ConfigWatcher, is_catalog_file
+from model_router import DEFAULT_MAX_ERROR_RATE, InstrumentedClient, ModelRouter
+from circuit_breaker import BreakerRegistry, is_timeout_error, model_breaker_name, provider_breaker_name
+from quota_ledger import QuotaLedger, is_rate_limited
+from key_pool import LEAST_LOADED, KeyPool, PooledClient
+from provider_endpoints import has_chat_endpoint
+
+# I moduli SDK vengono importati solo al primo get_client(name)
+CLIENT_CLASSES = {
+    "gemini": ("llmclient.gemini_client", "GeminiClient"),
+    "groq": ("llmclient.groq_client", "GroqClient"),
+    "mistral": ("llmclient.mistral_client", "MistralClient"),
+    "huggingface": ("llmclient.huggingface_client", "HuggingFaceClient"),
+    "openrouter": ("llmclient.openrouter_client", "OpenRouterClient"),
+}
+
+KEYS_FILE = "api_keys.json"
+
+# Snapshot di catalogo, chiavi e pool: mai modificato, sostituito in blocco
+# (anche un nuovo pool produce un nuovo snapshot; pools è in sola lettura)
+ProviderState = namedtuple("ProviderState", "provider_config key_lists api_keys pools")
+
+
+class Selection(namedtuple("Selection", "provider model windowSize client")):
+    """
+    Selezione immutabile di un modello, da tenere per richiesta: a differenza
+    della configurazione condivisa non cambia se un altro thread chiama
+    set_config() o route(). client è il nome del client llmclient.
+    """
+
+    __slots__ = ()
+
+    def as_dict(self):
+        """Stessa forma di get_config()."""
+        return dict(self._asdict())
+
+
+def is_usable(client_name, async_api=False):
+    """
+    True se il client ha una classe llmclient o, per l'API async (che parla
+    HTTP direttamente), un endpoint chat in provider_endpoints.
+    """
+    if async_api:
+        return has_chat_endpoint(client_name)
+    usable = client_name in CLIENT_CLASSES
+    return usable
+
+
+def load_client_class(name):
+    """Importa il modulo SDK del client e ne restituisce la classe."""
+    module_name, class_name = CLIENT_CLASSES[name]
+    module = importlib.import_module(module_name)
+    client_class = getattr(module, class_name)
+    return client_class
+
 
 class LlmProvider:
-    def __init__(self):
-        self.clients = {}
-        self.provider_config = {}
-        self.config = {
+    """
+    Gestore dei provider LLM.
+    Chiavi API, configurazione dei modelli e client sono caricati in modo
+    lazy: la costruzione non legge file e non importa SDK.
+    Tutte le chiavi di un provider elencate in api_keys.json formano un pool
+    (key_pool.py) con un client per chiave; key_strategy sceglie come
+    distribuire le chiamate ("least_loaded" o "round_robin").
+    Catalogo, chiavi e pool stanno in uno snapshot (ProviderState) che
+    reload() sostituisce in blocco; start_watching() lo ricarica da solo
+    quando cambiano i file.
+    """
+
+    def __init__(self, key_strategy=LEAST_LOADED):
+        self.key_strategy = key_strategy
+        self._state = None
+        self._config = None
+        self._router = None
+        self._quota = None
+        self._watcher = None
+        self._async_transports = weakref.WeakKeyDictionary()
+        self.breakers = BreakerRegistry()
+        self._lock = threading.RLock()
+        self._reload_lock = threading.Lock()
+
+    @property
+    def state(self):
+        """Snapshot corrente di catalogo, chiavi e pool (letto al primo accesso)."""
+        if self._state is None:
+            with self._lock:
+                if self._state is None:
+                    key_lists = self._load_key_lists()
+                    self._state = ProviderState(self._load_provider_config(), key_lists,
+                                                self._exported_keys(key_lists),
+                                                MappingProxyType({}))
+        return self._state
+
+    @property
+    def key_lists(self):
+        """Tutte le chiavi per provider: {provider: [(nome, chiave), ...]}, l'esportata per prima."""
+        return self.state.key_lists
+
+    @property
+    def api_keys(self):
+        return self.state.api_keys
+
+    @api_keys.setter
+    def api_keys(self, value):
+        self._swap(api_keys=value)
+
+    @property
+    def provider_config(self):
+        return self.state.provider_config
+
+    @provider_config.setter
+    def provider_config(self, value):
+        self._swap(provider_config=value)
+
+    @property
+    def pools(self):
+        return self.state.pools
+
+    @property
+    def router(self):
+        """Router delle prestazioni, inizializzato dai benchmark in data_ok/."""
+        if self._router is None:
+            with self._lock:
+                if self._router is None:
+                    router = ModelRouter()
+                    router.seed_from_benchmarks("data_ok")
+                    self._router = router
+        return self._router
+
+    @property
+    def quota(self):
+        """Registro delle quote per chiave (data_ok/quota_ledger.sqlite), condiviso con probe e benchmark."""
+        if self._quota is None:
+            with self._lock:
+                if self._quota is None:
+                    self._quota = QuotaLedger()
+        return self._quota
+
+    @property
+    def config(self):
+        if self._config is None:
+            with self._lock:
+                if self._config is None:
+                    self._config = self._default_config()
+        return self._config
+
+    @config.setter
+    def config(self, value):
+        self._config = value
+
+    def _default_config(self):
+        config = {
             "provider": "",
             "model": "",
             "windowSize": 0,
             "client": "",
         }
-        self.api_keys = {}
-        self._load_api_keys()
-        self._load_provider_config()
-        self._init_clients()
-        
-        # Imposta un default se possibile
+        # Imposta un default se possibile: il modello più veloce misurato,
+        # altrimenti il primo del catalogo
         if self.provider_config:
-            p = next(iter(self.provider_config))
-            m = next(iter(self.provider_config[p]["models"]))
-            self.set_config(p, m)
+            best = self.router.choose(self._route_candidates())
+            if best is not None:
+                p, m, _ = best
+            else:
+                p = next(iter(self.provider_config))
+                m = next(iter(self.provider_config[p]["models"]))
+            config = self._build_config(p, m)
+        return config
 
-    def _load_api_keys(self):
+    def _load_key_lists(self):
+        key_lists = {}
         try:
-            if os.path.exists("api_keys.json"):
-                with open("api_keys.json", "r") as f:
+            if os.path.exists(KEYS_FILE):
+                with open(KEYS_FILE, "r") as f:
                     data = json.load(f)
                     for provider, info in data.get("providers", {}).items():
                         exported_key_name = info.get("exported_key")
-                        for key_info in info.get("keys", []):
-                            if key_info.get("name") == exported_key_name:
-                                self.api_keys[provider] = key_info.get("key")
-                                break
-                        if provider not in self.api_keys and info.get("keys"):
-                            self.api_keys[provider] = info["keys"][0]["key"]
+                        keys = [(k.get("name", ""), k["key"])
+                                for k in info.get("keys", []) if k.get("key")]
+                        # La chiave esportata resta la prima (e quella di api_keys)
+                        keys.sort(key=lambda k: k[0] != exported_key_name)
+                        if keys:
+                            key_lists[provider] = keys
         except Exception as e:
             print(f"Errore nel caricamento delle chiavi API: {e}")
+        return key_lists
+
+    @staticmethod
+    def _exported_keys(key_lists):
+        api_keys = {provider: keys[0][1] for provider, keys in key_lists.items()}
+        return api_keys
 
     def _load_provider_config(self):
-        data_dir = "data"
-        if not os.path.exists(data_dir):
-            return
-        files = glob.glob(os.path.join(data_dir, "models_*_wnd.txt"))
-        for file_path in files:
-            filename = os.path.basename(file_path)
-            provider_name = filename.replace("models_", "").replace("_wnd.txt", "")
-            
-            models = {}
-            try:
-                with open(file_path, "r") as f:
-                    for line in f:
-                        line = line.strip()
-                        if line and "|" in line:
-                            parts = line.split("|")
-                            if len(parts) >= 2:
-                                model_name, window_size_str = parts[0], parts[1]
-                                # Convert 1024k to integer 1024
-                                size_val = window_size_str.lower().replace("k", "")
-                                try:
-                                    size_val = int(size_val)
-                                except:
-                                    size_val = 0
-                                models[model_name] = {"windowSize": size_val}
-                
-                if models:
-                    self.provider_config[provider_name] = {
-                        "client": provider_name,
-                        "models": models
-                    }
-            except Exception as e:
-                print(f"Errore nel caricamento del file {file_path}: {e}")
+        provider_config = {}
+        try:
+            provider_config = load_provider_config("data")
+        except Exception as e:
+            print(f"Errore nel caricamento della configurazione dei modelli: {e}")
+        return provider_config
 
-    def _init_clients(self):
+    def _get_key(self, name, state=None):
+        state = state or self.state
+        key = state.api_keys.get(name)
         # OpenRouter might use 'openai' key if available in api_keys.json
-        or_key = self.api_keys.get("openrouter") or self.api_keys.get("openai")
-        
-        mapping = {
-            "gemini": GeminiClient,
-            "groq": GroqClient,
-            "mistral": MistralClient,
-            "huggingface": HuggingFaceClient,
-            "openrouter": OpenRouterClient
+        if name == "openrouter" and not key:
+            key = state.api_keys.get("openai")
+        return key
+
+    def _get_keys(self, name, state=None):
+        """Chiavi del pool di un client; la prima è sempre quella di _get_key."""
+        state = state or self.state
+        key = self._get_key(name, state)
+        if not key:
+            return []
+        keys = []
+        for provider in (name, "openai") if name == "openrouter" else (name,):
+            keys = state.key_lists.get(provider, [])
+            if keys:
+                break
+        if not keys or keys[0][1] != key:
+            # Chiave impostata a mano in api_keys: ha la precedenza sul file
+            keys = [("default", key)]
+        return keys
+
+    def _create_pool(self, name, state=None):
+        # Il pool serve anche l'API async, che usa solo le chiavi
+        if not is_usable(name) and not is_usable(name, async_api=True):
+            return None
+        keys = self._get_keys(name, state)
+        if not keys:
+            return None
+
+        def factory(key):
+            # L'SDK si importa solo quando serve un client sincrono
+            if not is_usable(name):
+                raise LookupError(f"Nessun client llmclient per {name}: usare aget_client() o achat()")
+            return load_client_class(name)(key)
+
+        pool = KeyPool(name, keys, factory, self.quota, self.key_strategy)
+        return pool
+
+    def _init_clients(self):
+        """Costruisce subito tutti i client disponibili (caricamento eager)."""
+        for name in CLIENT_CLASSES:
+            pool = self._get_pool(name)
+            if pool is not None:
+                pool.clients()
+
+    def _build_config(self, provider, model, provider_config=None):
+        provider_config = provider_config or self.provider_config
+        config = {
+            "provider": provider,
+            "model": model,
+            "windowSize": provider_config[provider]["models"][model]["windowSize"],
+            "client": provider_config[provider].get("client", provider)
         }
-        
-        for name, client_class in mapping.items():
-            key = self.api_keys.get(name)
-            if name == "openrouter" and not key:
-                key = or_key
-            
-            if key:
-                self.clients[name] = client_class(key)
+        return config
+
+    def select(self, provider, model):
+        """
+        Handle immutabile per un modello del catalogo, senza toccare la
+        configurazione condivisa.
+
+        Returns:
+            Selection o None se il modello non è nel catalogo.
+        """
+        # Una sola lettura dello snapshot: un reload concorrente non lo cambia
+        provider_config = self.provider_config
+        if provider in provider_config and model in provider_config[provider]["models"]:
+            selection = Selection(**self._build_config(provider, model, provider_config))
+            return selection
+        return None
+
+    def current_selection(self):
+        """Handle della configurazione condivisa corrente (None se vuota)."""
+        config = self.config
+        if not config.get("model"):
+            return None
+        selection = Selection(**config)
+        return selection
 
     def set_config(self, provider, model):
-        if provider in self.provider_config and model in self.provider_config[provider]["models"]:
-            self.config = {
-                "provider": provider,
-                "model": model,
-                "windowSize": self.provider_config[provider]["models"][model]["windowSize"],
-                "client": self.provider_config[provider].get("client", provider)
-            }
-            return True
-        return False
-
-    def get_client(self, client_name=None):
+        selection = self.select(provider, model)
+        if selection is None:
+            return False
+        # Copy-on-write: si sostituisce il dizionario, chi lo sta leggendo tiene il suo
+        self.config = selection.as_dict()
+        return True
+
+    def _route_candidates(self, min_window=0, providers=None, async_api=False):
+        """Modelli del catalogo utilizzabili (client con chiave) e con finestra sufficiente."""
+        candidates = []
+        for provider, info in self.provider_config.items():
+            if providers and provider not in providers:
+                continue
+            client_name = info.get("client", provider)
+            if not is_usable(client_name, async_api) or not self._get_key(client_name):
+                continue
+            for model, model_info in info["models"].items():
+                window = model_info["windowSize"]
+                if window >= min_window:
+                    candidates.append((provider, model, window))
+        return candidates
+
+    def route_selection(self, min_window=0, providers=None, max_error_rate=DEFAULT_MAX_ERROR_RATE):
+        """
+        Handle del modello sano più veloce con finestra di almeno min_window
+        (stessa unità di windowSize, cioè migliaia di token), senza toccare
+        la configurazione condivisa.
+
+        Returns:
+            Selection o None se nessun modello è adatto.
+        """
+        candidates = self._route_candidates(min_window, providers)
+        best = self.router.choose(candidates, max_error_rate)
+        if best is None:
+            return None
+        provider, model, _ = best
+        selection = self.select(provider, model)
+        return selection
+
+    def route(self, min_window=0, providers=None, max_error_rate=DEFAULT_MAX_ERROR_RATE):
+        """
+        Come route_selection(), ma imposta il modello scelto come
+        configurazione corrente.
+
+        Returns:
+            dict o None: la nuova configurazione, None se nessun modello è adatto.
+        """
+        selection = self.route_selection(min_window, providers, max_error_rate)
+        if selection is None:
+            return None
+        self.config = selection.as_dict()
+        config = self.config
+        return config
+
+    def record_result(self, provider, model, latency, ok):
+        """Registra l'esito di una chiamata fatta al di fuori di get_client."""
+        self.router.observe(provider, model, latency, ok)
+
+    def quota_delay(self, client_name=None):
+        """
+        Secondi da attendere prima che la chiave del client abbia di nuovo
+        quota (0 se la chiamata può partire subito).
+        """
         if client_name is None:
             client_name = self.config.get("client")
-        return self.clients.get(client_name)
+        pool = self._get_pool(client_name)
+        if pool is None:
+            return 0.0
+        delay = pool.delay()
+        return delay
+
+    def get_key_stats(self, client_name=None):
+        """Carico, errori ed esclusioni delle chiavi del pool di un client."""
+        if client_name is None:
+            client_name = self.config.get("client")
+        pool = self._get_pool(client_name)
+        stats = pool.stats() if pool is not None else []
+        return stats
+
+    def get_breaker_states(self):
+        """Stato (closed/open/half_open) di tutti i circuit breaker."""
+        states = self.breakers.states()
+        return states
+
+    def add_breaker_listener(self, callback):
+        """Registra callback(nome, stato_precedente, nuovo_stato) per gli allarmi."""
+        self.breakers.add_listener(callback)
+
+    def _is_blocked(self, provider, model):
+        blocked = (self.breakers.is_open(provider_breaker_name(provider))
+                   or self.breakers.is_open(model_breaker_name(provider, model)))
+        return blocked
+
+    def _breakers_allow(self, provider, model):
+        model_breaker = self.breakers.get(model_breaker_name(provider, model))
+        if model_breaker.is_open():
+            return False
+        allowed = (self.breakers.get(provider_breaker_name(provider)).allow()
+                   and model_breaker.allow())
+        return allowed
+
+    def _failover(self, config, async_api=False):
+        """
+        Cerca un modello equivalente (finestra almeno pari) con circuiti
+        chiusi, preferendo il più veloce secondo il router.
+        """
+        candidates = []
+        for candidate in self._route_candidates(config["windowSize"], async_api=async_api):
+            provider, model, _ = candidate
+            if provider == config["provider"] and model == config["model"]:
+                continue
+            if not self._is_blocked(provider, model):
+                candidates.append(candidate)
+        best = self.router.choose(candidates, max_error_rate=1.0)
+        return best
+
+    def _get_pool(self, client_name):
+        pool = self.state.pools.get(client_name)
+        if pool is None and client_name:
+            with self._lock:
+                state = self.state
+                pool = state.pools.get(client_name)
+                if pool is None:
+                    pool = self._create_pool(client_name, state)
+                    if pool is not None:
+                        # Copy-on-write: si pubblica un nuovo snapshot con il pool in più
+                        pools = dict(state.pools)
+                        pools[client_name] = pool
+                        self._state = state._replace(pools=MappingProxyType(pools))
+        return pool
+
+    def get_client(self, client_name=None, selection=None):
+        """
+        Restituisce il client (creato al primo uso) avvolto in un proxy che
+        misura ogni chiamata e aggiorna statistiche e circuit breaker del
+        modello corrente. Se il circuito del provider o del modello è aperto
+        passa automaticamente a un modello equivalente; se non ce ne sono
+        restituisce None invece di attendere il timeout.
+        Ogni chiamata usa la chiave del pool meno carica con quota disponibile
+        secondo il registro delle quote, attendendo se sono tutte esaurite
+        (QuotaExhausted se non torna entro l'attesa massima).
+        Con selection (vedi select()) usa quel modello invece della
+        configurazione condivisa, come client_for().
+        """
+        if selection is not None:
+            _, client = self.client_for(selection)
+            return client
+        config = self.config
+        if client_name is None:
+            client_name = config.get("client")
+        used, client = self._resolve(config, client_name)
+        if used is not config:
+            # Failover sulla configurazione condivisa: diventa la nuova selezione
+            self.config = used
+        return client
+
+    def client_for(self, selection):
+        """
+        Client per un handle di select()/route_selection(), senza leggere né
+        modificare la configurazione condivisa: sicuro da usare in parallelo
+        da più thread. Un eventuale failover vale solo per questa richiesta.
+
+        Returns:
+            tuple: (Selection effettivamente usata, client o None).
+        """
+        used, client = self._resolve(selection.as_dict(), selection.client)
+        result = (Selection(**used), client)
+        return result
+
+    def _admit(self, config, async_api=False):
+        """
+        Controlla i circuiti del modello di una configurazione e, se sono
+        aperti, passa a un modello equivalente.
+
+        Returns:
+            tuple: (configurazione usata, nuova se c'è stato failover; True se ammessa).
+        """
+        if self._breakers_allow(config["provider"], config["model"]):
+            return config, True
+        alternative = self._failover(config, async_api)
+        if alternative is None:
+            return config, False
+        provider, model, _ = alternative
+        print(f"Failover: {config['provider']}/{config['model']} -> {provider}/{model}")
+        config = self._build_config(provider, model)
+        allowed = self._breakers_allow(provider, model)
+        return config, allowed
+
+    def _result_recorder(self, provider, model):
+        """
+        on_result(latency, ok, error) che aggiorna router e circuit breaker del
+        modello. I limiti di quota (429, QuotaExhausted) non contano: li
+        registra il pool delle chiavi nel registro delle quote.
+        """
+        router = self.router
+        provider_breaker = self.breakers.get(provider_breaker_name(provider))
+        model_breaker = self.breakers.get(model_breaker_name(provider, model))
+
+        def on_result(latency, ok, error):
+            if not ok and is_rate_limited(error):
+                return
+            router.observe(provider, model, latency, ok)
+            timed_out = is_timeout_error(error)
+            provider_breaker.record(ok, timed_out)
+            model_breaker.record(ok, timed_out)
+
+        return on_result
+
+    def _resolve(self, config, client_name):
+        """
+        Client per una configurazione, con failover se i circuiti sono aperti.
+
+        Returns:
+            tuple: (configurazione usata, nuova se c'è stato failover; client o None).
+        """
+        tracked = config.get("client") == client_name and bool(config.get("model"))
+
+        if tracked:
+            config, allowed = self._admit(config)
+            if not allowed:
+                return config, None
+            client_name = config["client"]
+        elif client_name:
+            if not self.breakers.get(provider_breaker_name(client_name)).allow():
+                return config, None
+
+        if not is_usable(client_name):
+            return config, None
+        pool = self._get_pool(client_name)
+        if pool is None:
+            return config, None
+        client = PooledClient(pool)
+        if not tracked:
+            return config, client
+
+        # Il modello di riferimento è quello selezionato al momento della richiesta
+        on_result = self._result_recorder(config["provider"], config["model"])
+        instrumented = InstrumentedClient(client, on_result)
+        return config, instrumented
+
+    def _async_transport(self):
+        """Trasporto async dell'event loop corrente (asyncio e httpx importati al primo uso)."""
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        transport = self._async_transports.get(loop)
+        if transport is None:
+            from async_client import AsyncTransport
+            transport = AsyncTransport()
+            self._async_transports[loop] = transport
+        return transport
+
+    async def aget_client(self, selection=None):
+        """
+        Client async (async_client.AsyncLlmClient) per un handle di select()
+        o, se omesso, per la configurazione corrente: stesse chiavi, quote,
+        circuit breaker e failover dei client sincroni, ma le chiamate
+        usano il pool di connessioni async del provider invece di un thread.
+        Serve ogni provider di provider_endpoints, anche quelli senza client
+        llmclient (es. cerebras).
+
+        Returns:
+            AsyncLlmClient o None se nessun modello è utilizzabile.
+        """
+        from async_client import AsyncLlmClient
+
+        config = selection.as_dict() if selection is not None else self.config
+        if not config.get("model"):
+            return None
+        config, allowed = self._admit(config, async_api=True)
+        if not allowed or not is_usable(config["client"], async_api=True):
+            return None
+        pool = self._get_pool(config["client"])
+        if pool is None:
+            return None
+        on_result = self._result_recorder(config["provider"], config["model"])
+        client = AsyncLlmClient(Selection(**config), pool, self._async_transport(), on_result)
+        return client
+
+    async def achat(self, messages, selection=None, max_tokens=None, timeout=None):
+        """
+        Chiamata chat async: messages è un prompt o una lista di messaggi
+        {"role", "content"}. timeout (secondi) vale per l'intera chiamata.
+
+        Returns:
+            str o None se nessun modello è utilizzabile.
+        """
+        from async_client import DEFAULT_TIMEOUT
+
+        client = await self.aget_client(selection)
+        if client is None:
+            return None
+        text = await client.chat(messages, max_tokens, timeout or DEFAULT_TIMEOUT)
+        return text
+
+    async def aclose(self):
+        """Chiude i pool di connessioni async dell'event loop corrente."""
+        import asyncio
+
+        transport = self._async_transports.pop(asyncio.get_running_loop(), None)
+        if transport is not None:
+            await transport.aclose()
 
     def get_config(self):
-        return self.config
+        # Copia: la configurazione condivisa si sostituisce, non si modifica
+        return dict(self.config)
 
     def get_provider_config(self):
         return self.provider_config
 
-    def reload(self):
-        """Ricarica le chiavi API e la configurazione dei modelli dai file."""
-        self.provider_config = {}
-        self.api_keys = {}
-        self._load_api_keys()
-        self._load_provider_config()
-        self._init_clients()
+    def _swap(self, provider_config=None, key_lists=None, api_keys=None):
+        """
+        Sostituisce lo snapshot con uno nuovo: i valori non indicati restano
+        quelli correnti e i pool delle chiavi invariate restano in uso.
+        """
+        # Con il lock: nessun pool creato nel frattempo va perso
+        with self._lock:
+            old = self.state
+            if api_keys is None:
+                api_keys = old.api_keys if key_lists is None else self._exported_keys(key_lists)
+            state = ProviderState(
+                old.provider_config if provider_config is None else provider_config,
+                old.key_lists if key_lists is None else key_lists,
+                api_keys, MappingProxyType({}))
+            pools = {name: pool for name, pool in old.pools.items()
+                     if pool.has_keys(self._get_keys(name, state))}
+            self._state = state._replace(pools=MappingProxyType(pools))
+            self._refresh_config(state.provider_config)
+
+    def _refresh_config(self, provider_config):
+        """Allinea la selezione corrente al nuovo catalogo (default se il modello è sparito)."""
+        config = self._config
+        if not config or not config.get("model"):
+            return
+        provider = config["provider"]
+        model = config["model"]
+        if provider in provider_config and model in provider_config[provider]["models"]:
+            if provider_config[provider]["models"][model]["windowSize"] != config["windowSize"]:
+                self._config = self._build_config(provider, model)
+        else:
+            self._config = None
+
+    def reload(self, changed=None):
+        """
+        Ricarica chiavi API e configurazione dei modelli dai file.
+        Il nuovo snapshot è costruito a parte e sostituito in blocco: chi
+        legge vede sempre il vecchio o il nuovo, mai una configurazione
+        vuota. Il catalogo rilegge solo i file modificati (catalog_cache) e
+        i client delle chiavi invariate restano in uso con le loro connessioni.
+        changed (percorsi dei file cambiati) limita il reload al catalogo o
+        alle chiavi.
+        """
+        with self._reload_lock:
+            if self._state is None:
+                # Mai caricato: il primo accesso leggerà i file aggiornati
+                return True
+            names = None if changed is None else {Path(path).name for path in changed}
+            provider_config = None
+            key_lists = None
+            if names is None or any(is_catalog_file(name) for name in names):
+                provider_config = self._load_provider_config()
+            if names is None or Path(KEYS_FILE).name in names:
+                key_lists = self._load_key_lists()
+            if provider_config is not None or key_lists is not None:
+                self._swap(provider_config, key_lists)
         return True
 
-# Singleton instance
+    def start_watching(self, interval=DEFAULT_INTERVAL):
+        """
+        Avvia un thread che ricarica la configurazione quando cambiano
+        data/*_wnd.txt o api_keys.json (inotify, altrimenti polling).
+        """
+        with self._lock:
+            if self._watcher is None:
+                self._watcher = ConfigWatcher(self.reload, "data", KEYS_FILE, interval)
+                self._watcher.start()
+        return self._watcher
+
+    def stop_watching(self):
+        """Ferma il thread avviato da start_watching()."""
+        with self._lock:
+            watcher = self._watcher
+            self._watcher = None
+        if watcher is not None:
+            watcher.stop()
+
+# Singleton instance (economico: nessun I/O finché non viene usato)
 llm_provider = LlmProvider()
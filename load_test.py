@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Load Test - Throughput sostenuto e punto di saturazione dei modelli.
+
+Sottopone un modello a un carico crescente, a livelli di durata fissa:
+- closed loop: N worker che inviano una richiesta dopo l'altra;
+- open loop: richieste a intervalli regolari per ottenere un RPS obiettivo,
+  indipendentemente dalle risposte. La latenza è misurata dall'istante
+  programmato, così le code lato client non la nascondono.
+Per ogni livello registra RPS ottenuto, percentili di latenza ed errori
+(429, 5xx, timeout). La rampa si ferma al primo livello saturo; la capacità
+del modello è il primo livello non saturo vicino al throughput massimo.
+Usato da models_ok.py --load-test.
+"""
+
+__date__ = "2026-10-16"
+__version__ = "1.0.0"
+__author__ = "Gemini CLI"
+
+import re
+import json
+import math
+import time
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from bench_stats import summarize
+
+
+MODES = ("closed", "open")
+DEFAULT_LEVELS = {"closed": "1,2,4,8,16", "open": "0.5,1,2,4,8"}
+DEFAULT_DURATION = 20.0
+DEFAULT_MAX_ERROR_RATE = 0.05
+
+# Worker massimi del generatore open loop (richieste in volo contemporanee)
+OPEN_LOOP_WORKERS = 64
+
+# In open loop il livello è saturo se si ottiene meno di questa quota del target
+MIN_OPEN_RATIO = 0.9
+
+# La capacità è il livello più basso che ottiene almeno questa quota del
+# throughput massimo: oltre il ginocchio più worker allungano solo le code
+KNEE_RATIO = 0.95
+
+# Attesa massima delle richieste ancora in volo a fine livello
+DRAIN_TIMEOUT = 60.0
+
+STATUS_RE = re.compile(r"^HTTP (\d{3})")
+
+
+def parse_levels(text: str, mode: str = "open") -> list:
+    """
+    Converte '1,2,4' in una lista ordinata di livelli positivi.
+    In closed loop i livelli sono worker: solo interi da 1 in su.
+    """
+    levels = set()
+    for item in (text or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            value = float(item)
+        except ValueError:
+            raise ValueError(f"Livello non valido: '{item}'")
+        if value <= 0:
+            raise ValueError(f"Livello non valido: '{item}'")
+        if mode == "closed":
+            if not value.is_integer():
+                raise ValueError(f"Livello non valido: '{item}' (in closed loop è un numero intero di worker)")
+            value = int(value)
+        levels.add(value)
+    if not levels:
+        raise ValueError("Nessun livello indicato")
+    ordered = sorted(levels)
+    return ordered
+
+
+def classify_error(err: str) -> str:
+    """Categoria di un errore: '429', '5xx', '4xx', 'timeout' o 'other'."""
+    match = STATUS_RE.match(err or "")
+    if match:
+        status = int(match.group(1))
+        if status == 429:
+            return "429"
+        category = "5xx" if status >= 500 else "4xx"
+        return category
+    category = "timeout" if (err or "").lower().startswith("timeout") else "other"
+    return category
+
+
+def connections_needed(mode: str, levels: list, max_workers: int = OPEN_LOOP_WORKERS) -> int:
+    """Connessioni HTTP da tenere nel pool per non strozzare il carico."""
+    needed = int(max(levels)) if mode == "closed" else max_workers
+    return needed
+
+
+class _Recorder:
+    """Raccoglie gli esiti delle richieste di un livello da più thread."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.errors = {}
+        self.first = None
+        self.last = None
+
+    def add(self, started: float, finished: float, success: bool, err: str):
+        with self.lock:
+            self.first = started if self.first is None else min(self.first, started)
+            self.last = finished if self.last is None else max(self.last, finished)
+            if success:
+                self.latencies.append(finished - started)
+            else:
+                category = classify_error(err)
+                self.errors[category] = self.errors.get(category, 0) + 1
+
+
+def _call(measure, recorder: _Recorder, started: float):
+    try:
+        success, _, err = measure()
+    except Exception as e:
+        success, err = False, str(e)[:50]
+    recorder.add(started, time.perf_counter(), success, err)
+
+
+def run_closed_loop(measure, workers: int, duration: float) -> _Recorder:
+    """N worker in ciclo chiuso fino allo scadere di duration secondi."""
+    recorder = _Recorder()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        while time.perf_counter() < deadline:
+            _call(measure, recorder, time.perf_counter())
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(duration + DRAIN_TIMEOUT)
+    return recorder
+
+
+def run_open_loop(measure, rps: float, duration: float,
+                  max_workers: int = OPEN_LOOP_WORKERS) -> _Recorder:
+    """Richieste a intervalli regolari di 1/rps secondi per duration secondi."""
+    recorder = _Recorder()
+    total = max(1, int(rps * duration))
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        start = time.perf_counter()
+        for i in range(total):
+            scheduled = start + i / rps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            # La latenza parte dall'istante programmato, non da quando un worker è libero
+            executor.submit(_call, measure, recorder, scheduled)
+    finally:
+        executor.shutdown(wait=True)
+    return recorder
+
+
+def summarize_level(recorder: _Recorder, level: float, mode: str,
+                    duration: float, max_error_rate: float) -> dict:
+    """RPS ottenuto, latenze, errori per categoria e stato di saturazione."""
+    ok = len(recorder.latencies)
+    failed = sum(recorder.errors.values())
+    total = ok + failed
+    elapsed = (recorder.last - recorder.first) if total else 0.0
+    elapsed = max(elapsed, duration)
+
+    # 4xx diversi da 429 sono errori della richiesta, non del carico
+    load_errors = sum(recorder.errors.get(c, 0) for c in ("429", "5xx", "timeout"))
+    error_rate = load_errors / total if total else 1.0
+    ok_rps = ok / elapsed
+    stats = summarize(recorder.latencies, "none") if ok else {}
+
+    saturated = ok == 0 or error_rate > max_error_rate
+    if mode == "open" and ok_rps < level * MIN_OPEN_RATIO:
+        saturated = True
+
+    entry = {
+        "level": level,
+        "requests": total,
+        "ok": ok,
+        "achieved_rps": total / elapsed,
+        "ok_rps": ok_rps,
+        "p50": stats.get("p50"),
+        "p95": stats.get("p95"),
+        "p99": stats.get("p99"),
+        "mean": stats.get("mean"),
+        "errors": dict(recorder.errors),
+        "error_rate": error_rate,
+        "saturated": saturated,
+    }
+    return entry
+
+
+def capacity_of(levels: list, mode: str) -> dict:
+    """
+    Capacità: il primo livello non saturo che raggiunge KNEE_RATIO del
+    throughput massimo. concurrency è il numero di worker consigliato
+    (in open loop dalla legge di Little: throughput per latenza media).
+    """
+    stable = [entry for entry in levels if not entry["saturated"]]
+    if not stable:
+        return None
+    peak = max(entry["ok_rps"] for entry in stable)
+    best = next(entry for entry in stable if entry["ok_rps"] >= peak * KNEE_RATIO)
+    if mode == "closed":
+        concurrency = int(best["level"])
+    else:
+        concurrency = max(1, math.ceil(best["ok_rps"] * (best["mean"] or 0)))
+    capacity = {
+        "rps": best["ok_rps"],
+        "concurrency": concurrency,
+        "p95": best["p95"],
+        "level": best["level"],
+    }
+    return capacity
+
+
+def ramp_model(measure, mode: str, levels: list, duration: float = DEFAULT_DURATION,
+               max_error_rate: float = DEFAULT_MAX_ERROR_RATE, pause: float = 0.0,
+               max_workers: int = OPEN_LOOP_WORKERS, on_level=None) -> dict:
+    """
+    Esegue la rampa di carico su un modello.
+
+    Args:
+        measure: measure() -> (esito, metriche, errore); chiamata da più thread.
+        mode: "closed" (livelli = worker) o "open" (livelli = RPS).
+        levels: Livelli crescenti.
+        duration: Secondi per livello.
+        max_error_rate: Quota di 429/5xx/timeout oltre la quale il livello è saturo.
+        pause: Pausa tra i livelli, per lasciare scaricare le quote del provider.
+        on_level: Callback opzionale chiamata con il riepilogo di ogni livello.
+    Returns:
+        dict: levels, capacity, onset_429, onset_5xx.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Modalità sconosciuta: {mode}")
+
+    measured = []
+    for i, level in enumerate(levels):
+        if i and pause:
+            time.sleep(pause)
+        if mode == "closed":
+            recorder = run_closed_loop(measure, int(level), duration)
+        else:
+            recorder = run_open_loop(measure, level, duration, max_workers)
+        entry = summarize_level(recorder, level, mode, duration, max_error_rate)
+        measured.append(entry)
+        if on_level is not None:
+            on_level(entry)
+        if entry["saturated"]:
+            break
+
+    result = {
+        "mode": mode,
+        "levels": measured,
+        "capacity": capacity_of(measured, mode),
+        "onset_429": next((e["level"] for e in measured if e["errors"].get("429")), None),
+        "onset_5xx": next((e["level"] for e in measured if e["errors"].get("5xx")), None),
+    }
+    return result
+
+
+def format_level(entry: dict) -> str:
+    """Riga di riepilogo di un livello."""
+    errors = ", ".join(f"{k}={v}" for k, v in sorted(entry["errors"].items())) or "nessun errore"
+    latency = (f"p50={entry['p50']:.2f}s p95={entry['p95']:.2f}s"
+               if entry["p50"] is not None else "nessuna risposta")
+    text = (f"livello {entry['level']:g}: {entry['ok_rps']:.2f} rps ok, {latency}, {errors}"
+            f"{' [SATURO]' if entry['saturated'] else ''}")
+    return text
+
+
+def format_capacity(result: dict) -> str:
+    """Riga di riepilogo della capacità di un modello."""
+    capacity = result["capacity"]
+    if capacity is None:
+        return "saturo già al primo livello"
+    text = (f"capacità {capacity['rps']:.2f} rps con {capacity['concurrency']} worker "
+            f"(p95 {capacity['p95']:.2f}s)")
+    if result["onset_429"] is not None:
+        text += f", 429 da livello {result['onset_429']:g}"
+    if result["onset_5xx"] is not None:
+        text += f", 5xx da livello {result['onset_5xx']:g}"
+    return text
+
+
+def save_load_results(provider: str, results: dict, options: dict) -> Path:
+    """Salva i risultati in data_ok/<provider>_load.json."""
+    output_dir = Path("data_ok")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    output_file = output_dir / f"{provider}_load.json"
+    document = {
+        "provider": provider,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "options": options,
+        "models": results,
+    }
+    output_file.write_text(json.dumps(document, indent=2), encoding="utf-8")
+    return output_file
@@ -0,0 +1,503 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Mock Provider - Server locale che imita le API dei provider.
+
+Risponde agli stessi endpoint usati da probe e benchmark:
+- chat OpenAI-compatibile: POST /<provider>/v1/chat/completions;
+- Gemini: POST /v1beta|v1/models/<modello>:generateContent e
+  :streamGenerateContent?alt=sse;
+- HuggingFace inference: POST /models/<modello>.
+Per ogni modello si configurano distribuzione della latenza, costo del
+prefill per 1k token di prompt, token generati e latenza tra token,
+quote di errori 5xx e 429, limiti rps/rpm con header x-ratelimit-*,
+capacità (richieste servite in parallelo) e finestra di contesto.
+Lo streaming usa Server-Sent Events come i provider reali.
+
+Con http_transport.redirect_endpoints(url) (o la variabile d'ambiente
+LLM_ENDPOINT_BASE_URL) models_test.py e models_ok.py usano questo server.
+"""
+
+__date__ = "2026-10-16"
+__version__ = "1.0.0"
+__author__ = "Gemini CLI"
+
+import re
+import os
+import sys
+import json
+import math
+import time
+import random
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+from collections import deque
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+DEFAULT_PROFILE = {
+    # Latenza prima del primo token, in secondi
+    "latency": {"dist": "lognormal", "median": 0.05, "sigma": 0.25},
+    # Secondi aggiuntivi per ogni 1000 token di prompt
+    "prefill_per_1k": 0.0,
+    "tokens": 20,
+    "itl": 0.002,
+    "error_rate": 0.0,
+    "rate_limit_rate": 0.0,
+    "rps": None,
+    "rpm": None,
+    # Richieste servite in parallelo (None = illimitate); le altre attendono
+    "capacity": None,
+    "queue_timeout": 30.0,
+    "window": None,
+}
+
+OPENAI_PATH_RE = re.compile(r"^/([^/]+)/v1/chat/completions$")
+GEMINI_PATH_RE = re.compile(r"^/(v1beta|v1)/models/([^:]+):(generateContent|streamGenerateContent)$")
+HF_PATH_RE = re.compile(r"^/models/(.+)$")
+
+WORDS = ("lorem", "ipsum", "dolor", "sit", "amet", "consectetur", "adipiscing", "elit")
+
+# Stima grossolana usata anche dai provider per i limiti: 4 caratteri per token
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    tokens = max(1, len(text) // CHARS_PER_TOKEN)
+    return tokens
+
+
+def sample_latency(spec, rng: random.Random) -> float:
+    """
+    Campiona una latenza in secondi da una distribuzione:
+    numero fisso, oppure {"dist": fixed|uniform|normal|lognormal|exponential, ...}.
+    """
+    if spec is None:
+        return 0.0
+    if isinstance(spec, (int, float)):
+        return float(spec)
+    dist = spec.get("dist", "fixed")
+    if dist == "fixed":
+        value = spec.get("value", 0.0)
+    elif dist == "uniform":
+        value = rng.uniform(spec.get("low", 0.0), spec.get("high", 0.0))
+    elif dist == "normal":
+        value = rng.gauss(spec.get("mean", 0.0), spec.get("stddev", 0.0))
+    elif dist == "lognormal":
+        value = rng.lognormvariate(math.log(spec.get("median", 0.05)), spec.get("sigma", 0.0))
+    elif dist == "exponential":
+        value = rng.expovariate(1.0 / spec.get("mean", 0.05))
+    else:
+        raise ValueError(f"Distribuzione sconosciuta: {dist}")
+    latency = max(0.0, value)
+    return latency
+
+
+class _WindowCounter:
+    """Conteggio delle richieste in una finestra scorrevole."""
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self.times = deque()
+
+    def admit(self, now: float) -> tuple:
+        """Returns: (ammessa, richieste rimaste, secondi al reset)."""
+        while self.times and now - self.times[0] >= self.window:
+            self.times.popleft()
+        reset = self.window - (now - self.times[0]) if self.times else self.window
+        if len(self.times) >= self.limit:
+            return False, 0, reset
+        self.times.append(now)
+        result = (True, self.limit - len(self.times), reset)
+        return result
+
+
+class ModelState:
+    """Profilo e stato (limiti, capacità, contatori) di un modello simulato."""
+
+    def __init__(self, profile: dict):
+        self.profile = profile
+        self.lock = threading.Lock()
+        self.counters = []
+        if profile.get("rps"):
+            self.counters.append(("second", _WindowCounter(int(profile["rps"]), 1.0)))
+        if profile.get("rpm"):
+            self.counters.append(("minute", _WindowCounter(int(profile["rpm"]), 60.0)))
+        capacity = profile.get("capacity")
+        self.slots = threading.BoundedSemaphore(capacity) if capacity else None
+
+    def admit(self, now: float) -> tuple:
+        """
+        Applica i limiti rps/rpm.
+
+        Returns:
+            tuple: (ammessa, header x-ratelimit-*, secondi di Retry-After).
+        """
+        headers = {}
+        retry_after = 0.0
+        admitted = True
+        with self.lock:
+            for name, counter in self.counters:
+                ok, remaining, reset = counter.admit(now)
+                # Header nello stile OpenAI/Groq: requests = finestra più lunga
+                suffix = "requests" if name == "minute" or len(self.counters) == 1 else f"requests-{name}"
+                headers[f"x-ratelimit-limit-{suffix}"] = str(counter.limit)
+                headers[f"x-ratelimit-remaining-{suffix}"] = str(remaining)
+                headers[f"x-ratelimit-reset-{suffix}"] = f"{reset:.3f}s"
+                if not ok:
+                    admitted = False
+                    retry_after = max(retry_after, reset)
+        result = (admitted, headers, retry_after)
+        return result
+
+
+class MockProviderServer:
+    """
+    Server mock in un thread in background.
+
+    Uso:
+        with MockProviderServer(config) as server:
+            http_transport.redirect_endpoints(server.base_url)
+    """
+
+    def __init__(self, config: dict = None, host: str = "127.0.0.1", port: int = 0):
+        config = config or {}
+        self.default = dict(DEFAULT_PROFILE)
+        self.default.update(config.get("default", {}))
+        self.overrides = config.get("models", {})
+        self.rng = random.Random(config.get("seed", 0))
+        self.rng_lock = threading.Lock()
+        self.models = {}
+        self.models_lock = threading.Lock()
+        self.stats = {}
+        self.stats_lock = threading.Lock()
+
+        handler = type("MockHandler", (_MockHandler,), {"mock": self})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        url = f"http://{host}:{port}"
+        return url
+
+    def start(self) -> str:
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def model(self, provider: str, model_id: str) -> ModelState:
+        """Stato del modello; il profilo unisce default, 'provider/modello' e 'modello'."""
+        key = f"{provider}/{model_id}"
+        with self.models_lock:
+            state = self.models.get(key)
+            if state is None:
+                profile = dict(self.default)
+                profile.update(self.overrides.get(model_id, {}))
+                profile.update(self.overrides.get(key, {}))
+                state = ModelState(profile)
+                self.models[key] = state
+        return state
+
+    def random(self) -> float:
+        with self.rng_lock:
+            value = self.rng.random()
+        return value
+
+    def latency(self, spec) -> float:
+        with self.rng_lock:
+            value = sample_latency(spec, self.rng)
+        return value
+
+    def count(self, provider: str, model_id: str, status: int):
+        key = f"{provider}/{model_id}"
+        with self.stats_lock:
+            entry = self.stats.setdefault(key, {})
+            entry[str(status)] = entry.get(str(status), 0) + 1
+
+    def get_stats(self) -> dict:
+        """Risposte servite per modello e codice di stato."""
+        with self.stats_lock:
+            snapshot = {key: dict(value) for key, value in self.stats.items()}
+        return snapshot
+
+    def reset_stats(self):
+        with self.stats_lock:
+            self.stats.clear()
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    mock = None
+
+    def setup(self):
+        super().setup()
+        # Header e corpo partono in scritture separate: senza TCP_NODELAY
+        # l'ACK ritardato del client aggiungerebbe ~40 ms a ogni risposta
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        if urlsplit(self.path).path == "/_stats":
+            self._send_json(200, self.mock.get_stats())
+            return
+        self._send_json(404, {"error": {"message": "Not found"}})
+
+    def do_POST(self):
+        parts = urlsplit(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": {"message": "JSON non valido"}})
+            return
+
+        match = OPENAI_PATH_RE.match(parts.path)
+        if match:
+            provider = match.group(1)
+            model_id = body.get("model", "")
+            messages = body.get("messages") or []
+            prompt = "".join(str(m.get("content", "")) for m in messages)
+            self._serve("openai", provider, model_id, prompt, bool(body.get("stream")))
+            return
+
+        match = GEMINI_PATH_RE.match(parts.path)
+        if match:
+            model_id = match.group(2)
+            contents = body.get("contents") or []
+            prompt = "".join(part.get("text", "") for c in contents for part in c.get("parts", []))
+            stream = match.group(3) == "streamGenerateContent"
+            if stream and parse_qs(parts.query).get("alt") != ["sse"]:
+                self._send_json(400, {"error": {"message": "Solo alt=sse è supportato"}})
+                return
+            self._serve("gemini", "gemini", model_id, prompt, stream)
+            return
+
+        match = HF_PATH_RE.match(parts.path)
+        if match:
+            model_id = match.group(1)
+            self._serve("hf", "huggingface", model_id, str(body.get("inputs", "")), bool(body.get("stream")))
+            return
+
+        self._send_json(404, {"error": {"message": "Endpoint sconosciuto"}})
+
+    def _send_json(self, status: int, document, headers: dict = None):
+        data = json.dumps(document).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_chunk(self, text: str):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _serve(self, api: str, provider: str, model_id: str, prompt: str, stream: bool):
+        mock = self.mock
+        state = mock.model(provider, model_id)
+        profile = state.profile
+
+        admitted, headers, retry_after = state.admit(time.monotonic())
+        if not admitted or mock.random() < profile["rate_limit_rate"]:
+            headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+            mock.count(provider, model_id, 429)
+            self._send_json(429, {"error": {"message": "Rate limit reached", "code": 429}}, headers)
+            return
+
+        prompt_tokens = estimate_tokens(prompt)
+        window = profile.get("window")
+        if window and prompt_tokens > window:
+            mock.count(provider, model_id, 400)
+            self._send_json(400, {"error": {"message": f"Context length {prompt_tokens} exceeds {window}"}})
+            return
+
+        # Oltre la capacità le richieste restano in coda, come su un server saturo
+        if state.slots is not None and not state.slots.acquire(timeout=profile["queue_timeout"]):
+            mock.count(provider, model_id, 503)
+            self._send_json(503, {"error": {"message": "Server overloaded"}}, headers)
+            return
+        try:
+            delay = mock.latency(profile["latency"]) + profile["prefill_per_1k"] * prompt_tokens / 1000
+            time.sleep(delay)
+            if mock.random() < profile["error_rate"]:
+                mock.count(provider, model_id, 500)
+                self._send_json(500, {"error": {"message": "Internal error"}}, headers)
+                return
+
+            tokens = [WORDS[i % len(WORDS)] + " " for i in range(int(profile["tokens"]))]
+            if stream:
+                self._stream(api, model_id, tokens, prompt_tokens, profile["itl"], headers)
+            else:
+                time.sleep(profile["itl"] * len(tokens))
+                self._send_json(200, self._document(api, model_id, "".join(tokens), prompt_tokens, len(tokens)), headers)
+            mock.count(provider, model_id, 200)
+        finally:
+            if state.slots is not None:
+                state.slots.release()
+
+    @staticmethod
+    def _document(api: str, model_id: str, text: str, prompt_tokens: int, output_tokens: int):
+        if api == "gemini":
+            document = {
+                "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}],
+                "usageMetadata": {"promptTokenCount": prompt_tokens, "candidatesTokenCount": output_tokens},
+            }
+        elif api == "hf":
+            document = [{"generated_text": text}]
+        else:
+            document = {
+                "object": "chat.completion",
+                "model": model_id,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                             "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": output_tokens},
+            }
+        return document
+
+    def _stream(self, api: str, model_id: str, tokens: list, prompt_tokens: int,
+                itl: float, headers: dict):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        for i, token in enumerate(tokens):
+            if i:
+                time.sleep(itl)
+            last = i == len(tokens) - 1
+            if api == "gemini":
+                event = {"candidates": [{"content": {"parts": [{"text": token}], "role": "model"}}]}
+                if last:
+                    event["usageMetadata"] = {"promptTokenCount": prompt_tokens,
+                                              "candidatesTokenCount": len(tokens)}
+            elif api == "hf":
+                event = {"token": {"text": token}}
+                if last:
+                    event["details"] = {"generated_tokens": len(tokens)}
+            else:
+                event = {"model": model_id, "choices": [{"index": 0, "delta": {"content": token}}]}
+            self._send_chunk(f"data: {json.dumps(event)}\n\n")
+
+        if api == "openai":
+            usage = {"choices": [], "usage": {"prompt_tokens": prompt_tokens,
+                                              "completion_tokens": len(tokens)}}
+            self._send_chunk(f"data: {json.dumps(usage)}\n\n")
+            self._send_chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+class MockProviderProcess:
+    """
+    Server mock in un interprete separato, così che client e server non si
+    contendano il GIL durante i benchmark di concorrenza.
+    Stessa interfaccia di MockProviderServer (base_url, get_stats, with).
+    """
+
+    def __init__(self, config: dict = None, host: str = "127.0.0.1"):
+        self.config = config or {}
+        self.host = host
+        self.process = None
+        self.config_file = None
+        self.base_url = None
+
+    def start(self) -> str:
+        fd, self.config_file = tempfile.mkstemp(prefix="mock_provider_", suffix=".json")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self.config, f)
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--host", self.host,
+             "--port", "0", "--config", self.config_file],
+            stdout=subprocess.PIPE, text=True)
+        # La prima riga stampata contiene l'URL del server
+        line = self.process.stdout.readline()
+        if not line.strip():
+            self.stop()
+            raise RuntimeError("Il server mock non si è avviato")
+        self.base_url = line.split()[-1]
+        return self.base_url
+
+    def stop(self):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait(timeout=10)
+            self.process.stdout.close()
+            self.process = None
+        if self.config_file:
+            os.unlink(self.config_file)
+            self.config_file = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def get_stats(self) -> dict:
+        import requests
+        stats = requests.get(f"{self.base_url}/_stats", timeout=5).json()
+        return stats
+
+
+def load_config(config_file: str) -> dict:
+    """Legge la configurazione JSON: {"seed", "default": {...}, "models": {id: {...}}}."""
+    if not config_file:
+        return {}
+    with open(config_file, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    return config
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Server locale che imita le API dei provider LLM.")
+    parser.add_argument("--host", default="127.0.0.1", help="Indirizzo di ascolto")
+    parser.add_argument("--port", type=int, default=8765, help="Porta (default: 8765)")
+    parser.add_argument("--config", default=None,
+                        help="File JSON con i profili dei modelli")
+    args = parser.parse_args()
+
+    server = MockProviderServer(load_config(args.config), args.host, args.port)
+    print(f"Mock provider in ascolto su {server.base_url}", flush=True)
+    print(f"Per usarlo: LLM_ENDPOINT_BASE_URL={server.base_url} python models_ok.py groq", flush=True)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Model Dedup - Selezione della versione più recente per nome base.
+
+Motore comune a tutti i filter_and_sort_models: una sola passata O(n) sul
+catalogo mantiene, per ogni nome base, il modello con la chiave più alta.
+Le versioni vengono confrontate con version_key, non come stringhe:
+- numeri e semver per valore ("10" > "9", "1.10" > "1.9");
+- date (2024-08-06, 20240806, 2407) come sequenze numeriche;
+- gli alias "latest" prevalgono su qualsiasi versione;
+- i tag testuali (es. "free", "beta") prevalgono sull'assenza di versione.
+Il parser usa espressioni regolari precompilate e memorizza i risultati.
+"""
+
+__date__ = "2026-10-16"
+__version__ = "1.0.0"
+__author__ = "Gemini CLI"
+
+import re
+from functools import lru_cache
+
+
+LATEST_ALIASES = frozenset({"latest"})
+
+# Rango delle categorie di versione: a parità di nome base vince il più alto
+RANK_NONE = 0
+RANK_TAG = 1
+RANK_NUMERIC = 2
+RANK_LATEST = 3
+
+NUMERIC_RE = re.compile(r"^v?(\d+(?:[.\-_]\d+)*)(?:[.\-_+]?([a-z][\w.\-]*))?$", re.IGNORECASE)
+NUMBER_SPLIT_RE = re.compile(r"[.\-_]")
+
+# Suffisso di versione in coda a un ID separato da trattini: data, numero o alias
+DASH_VERSION_RE = re.compile(r"^(.+?)-(\d{4}-\d{2}-\d{2}|\d+|latest)$", re.IGNORECASE)
+
+
+@lru_cache(maxsize=65536)
+def version_key(version) -> tuple:
+    """
+    Chiave ordinabile di una versione.
+
+    Returns:
+        tuple: (rango, parti numeriche, rilascio finale, qualificatore).
+    """
+    if version is None or version == "":
+        return (RANK_NONE, (), 0, "")
+    text = str(version).strip().lower()
+    if text in LATEST_ALIASES:
+        return (RANK_LATEST, (), 0, "")
+
+    match = NUMERIC_RE.match(text)
+    if match:
+        numbers = tuple(int(part) for part in NUMBER_SPLIT_RE.split(match.group(1)))
+        qualifier = match.group(2) or ""
+        # Come in semver: "2.0-preview" precede "2.0"
+        key = (RANK_NUMERIC, numbers, 0 if qualifier else 1, qualifier)
+        return key
+    key = (RANK_TAG, (), 0, text)
+    return key
+
+
+@lru_cache(maxsize=65536)
+def split_dash_version(name: str) -> tuple:
+    """'gemini-1.5-pro-002' -> ('gemini-1.5-pro', '002'); senza versione -> (name, None)."""
+    match = DASH_VERSION_RE.match(name)
+    if not match:
+        return name, None
+    parts = (match.group(1), match.group(2))
+    return parts
+
+
+@lru_cache(maxsize=65536)
+def split_colon_tag(model_id: str) -> tuple:
+    """'meta-llama/llama-3-8b:free' -> ('meta-llama/llama-3-8b', 'free')."""
+    base, sep, tag = model_id.partition(":")
+    parts = (base, tag if sep else None)
+    return parts
+
+
+def dedup_latest(models, split, rank=None) -> list:
+    """
+    Mantiene un solo modello per nome base, in una sola passata.
+
+    Args:
+        models: Iterabile di modelli (anche un generatore).
+        split: split(modello) -> (nome base, versione).
+        rank: rank(modello, versione) -> chiave confrontabile
+              (default: version_key della versione).
+    Returns:
+        list: I modelli scelti, nell'ordine di prima comparsa del nome base.
+    """
+    if rank is None:
+        rank = lambda model, version: version_key(version)
+
+    latest_models = {}
+    for model in models:
+        base_name, version = split(model)
+        key = rank(model, version)
+        current = latest_models.get(base_name)
+        if current is None or key > current[0]:
+            latest_models[base_name] = (key, model)
+
+    selected = [model for _, model in latest_models.values()]
+    return selected
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Model Router - Scelta del modello in base alle prestazioni misurate.
+
+Mantiene per ogni coppia (provider, modello) una latenza media mobile
+esponenziale (EWMA) e un tasso di errore EWMA. Le statistiche vengono
+inizializzate dai risultati dei benchmark in data_ok/ (file _stats.json,
+classifiche _wnd.txt e storico latency.sqlite) e aggiornate dalle chiamate
+reali fatte tramite i client restituiti da LlmProvider.get_client.
+"""
+
+__date__ = "2026-10-16"
+__version__ = "1.0.0"
+__author__ = "Gemini CLI"
+
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+
+
+DEFAULT_ALPHA = 0.2
+DEFAULT_MAX_ERROR_RATE = 0.5
+SEED_HISTORY_WINDOW = 7 * 86400.0
+
+# Metodi dei client llmclient che inviano una richiesta al modello: solo
+# questi vengono misurati (getter e setter non sono chiamate al provider)
+REQUEST_METHOD_PREFIXES = ("chat", "complete", "completion", "generate", "send",
+                           "stream", "ask", "query", "invoke", "predict", "call")
+
+
+def is_request_method(name: str) -> bool:
+    """True se il metodo invia una richiesta al modello (es. chat, send_request)."""
+    request = not name.startswith("_") and name.lower().startswith(REQUEST_METHOD_PREFIXES)
+    return request
+
+
+class ModelRouter:
+    """Statistiche EWMA per modello e selezione del modello più veloce e sano."""
+
+    def __init__(self, alpha: float = DEFAULT_ALPHA):
+        if not 0 < alpha <= 1:
+            raise ValueError("alpha deve essere in (0, 1]")
+        self.alpha = alpha
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def _entry(self, provider: str, model: str) -> dict:
+        key = (provider, model)
+        entry = self.stats.get(key)
+        if entry is None:
+            entry = {"latency": None, "error_rate": 0.0, "samples": 0,
+                     "rank": None, "updated_at": 0.0}
+            self.stats[key] = entry
+        return entry
+
+    def seed(self, provider: str, model: str, latency: float = None,
+             error_rate: float = None, rank: int = None):
+        """Imposta i valori iniziali senza sovrascrivere le misure reali."""
+        with self.lock:
+            entry = self._entry(provider, model)
+            if entry["samples"] > 0:
+                return
+            if latency is not None:
+                entry["latency"] = latency
+            if error_rate is not None:
+                entry["error_rate"] = error_rate
+            if rank is not None:
+                entry["rank"] = rank
+
+    def observe(self, provider: str, model: str, latency: float, ok: bool):
+        """Aggiorna le medie mobili con l'esito di una chiamata reale."""
+        with self.lock:
+            entry = self._entry(provider, model)
+            error = 0.0 if ok else 1.0
+            if entry["samples"] == 0 and entry["latency"] is None:
+                entry["error_rate"] = error
+            else:
+                entry["error_rate"] += self.alpha * (error - entry["error_rate"])
+            # La latenza delle chiamate fallite (spesso un timeout) non è rappresentativa
+            if ok and latency is not None:
+                if entry["latency"] is None:
+                    entry["latency"] = latency
+                else:
+                    entry["latency"] += self.alpha * (latency - entry["latency"])
+            entry["samples"] += 1
+            entry["updated_at"] = time.time()
+
+    def get_stats(self, provider: str, model: str) -> dict:
+        """Copia delle statistiche di un modello (None se sconosciuto)."""
+        with self.lock:
+            entry = self.stats.get((provider, model))
+            snapshot = dict(entry) if entry else None
+        return snapshot
+
+    def choose(self, candidates: list, max_error_rate: float = DEFAULT_MAX_ERROR_RATE):
+        """
+        Sceglie il candidato migliore tra tuple (provider, modello, windowSize).
+        Ordine: modelli sani con latenza nota (crescente), poi modelli sani
+        senza latenza ordinati per posizione in classifica e finestra.
+
+        Returns:
+            tuple o None: il candidato scelto.
+        """
+        ranked = []
+        with self.lock:
+            for candidate in candidates:
+                provider, model, window = candidate
+                entry = self.stats.get((provider, model))
+                if entry and entry["error_rate"] > max_error_rate:
+                    continue
+                latency = entry["latency"] if entry else None
+                rank = entry["rank"] if entry and entry["rank"] is not None else float("inf")
+                if latency is not None:
+                    key = (0, latency, rank, -window)
+                else:
+                    key = (1, rank, 0.0, -window)
+                ranked.append((key, candidate))
+
+        if not ranked:
+            return None
+        ranked.sort(key=lambda item: item[0])
+        best = ranked[0][1]
+        return best
+
+    def seed_from_benchmarks(self, data_ok_dir: str = "data_ok") -> int:
+        """
+        Inizializza le statistiche dai risultati dei benchmark.
+        Priorità: storico latency.sqlite, poi _stats.json; la posizione nei
+        file _wnd.txt serve come ordine di riserva.
+
+        Returns:
+            int: Numero di modelli inizializzati.
+        """
+        base = Path(data_ok_dir)
+        if not base.is_dir():
+            return 0
+        seeded = set()
+
+        # Classifiche: ordine dei modelli che hanno superato il test
+        for wnd_file in base.glob("*_wnd.txt"):
+            provider = wnd_file.name[:-len("_wnd.txt")]
+            try:
+                lines = wnd_file.read_text(encoding="utf-8").splitlines()
+            except OSError:
+                continue
+            for rank, line in enumerate(lines):
+                model = line.partition("|")[0].strip()
+                if model:
+                    self.seed(provider, model, rank=rank)
+                    seeded.add((provider, model))
+
+        # Distribuzioni dei benchmark ripetuti
+        for stats_file in base.glob("*_stats.json"):
+            try:
+                document = json.loads(stats_file.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            provider = document.get("provider") or stats_file.name[:-len("_stats.json")]
+            for model, bench in document.get("models", {}).items():
+                total = bench.get("stats", {}).get("total", {})
+                attempts = bench.get("attempts") or 0
+                error_rate = len(bench.get("errors", [])) / attempts if attempts else None
+                self.seed(provider, model, total.get("p50"), error_rate)
+                seeded.add((provider, model))
+
+        # Storico recente: ha la precedenza perché più aggiornato
+        history = base / "latency.sqlite"
+        if history.exists():
+            from latency_store import LatencyStore
+            store = LatencyStore(history)
+            try:
+                since = time.time() - SEED_HISTORY_WINDOW
+                rows = store.conn.execute(
+                    "SELECT DISTINCT provider FROM samples WHERE ts >= ?", (since,)).fetchall()
+                for (provider,) in rows:
+                    for model, s in store.rolling(provider, SEED_HISTORY_WINDOW).items():
+                        with self.lock:
+                            entry = self._entry(provider, model)
+                            if entry["samples"] == 0:
+                                if s["p50"] is not None:
+                                    entry["latency"] = s["p50"]
+                                entry["error_rate"] = s["error_rate"]
+                        seeded.add((provider, model))
+            except sqlite3.Error:
+                pass
+            finally:
+                store.close()
+
+        count = len(seeded)
+        return count
+
+
+class InstrumentedClient:
+    """
+    Proxy trasparente di un client llmclient.
+    Misura la durata delle chiamate ai metodi di richiesta (vedi
+    is_request_method, o request_methods se indicato) e la riporta a
+    on_result; gli altri attributi passano invariati.
+    before_call, se indicato, viene eseguito prima di ogni richiesta
+    (es. per attendere la quota del provider).
+    """
+
+    def __init__(self, client, on_result, before_call=None, request_methods=None):
+        self._client = client
+        self._on_result = on_result
+        self._before_call = before_call
+        self._request_methods = request_methods
+
+    def _is_request(self, name: str) -> bool:
+        if self._request_methods is not None:
+            return name in self._request_methods
+        return is_request_method(name)
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr) or not self._is_request(name):
+            return attr
+
+        def timed_call(*args, **kwargs):
+            if self._before_call is not None:
+                self._before_call()
+            started = time.perf_counter()
+            try:
+                value = attr(*args, **kwargs)
+            except Exception as e:
+                self._on_result(time.perf_counter() - started, False, e)
+                raise
+            self._on_result(time.perf_counter() - started, True, None)
+            return value
+
+        return timed_call
+
+    @property
+    def wrapped(self):
+        """Client originale, senza strumentazione."""
+        return self._client
@@ -1,92 +1,96 @@
 #!/usr/bin/env python3
 """
 Script per ottenere i modelli Cerebras e salvarli in file.
+
+La finestra di contesto viene letta dai metadati del provider
+(vedi context_enrichment.py); get_context_window resta come stima di riserva.
 """
 
 import os
-import requests
-from pathlib import Path
+import argparse
+
+from http_cache import cached_get_json
+from catalog_writer import catalog_entry, catalog_exists, count_models, report, write_catalog
+from model_dedup import dedup_latest, split_dash_version
+from context_enrichment import DEFAULT_WORKERS, enrich_cerebras
 
 def filter_and_sort_models(models):
     """
     HIGHLIGHT: Filtri di selezione
     1. Per Cerebras, includiamo tutti i modelli restituiti dall'API.
-    2. Raggruppa per nome base e mantiene il più recente se applicabile.
+    2. Raggruppa per nome base e mantiene il più recente se applicabile
+       (confronto delle versioni con model_dedup.version_key).
     """
-    latest_models = {}
-    for m in models:
-        model_id = m.get("id")
-        parts = model_id.split("-")
-        if len(parts) > 1 and parts[-1].isdigit():
-            base_name = "-".join(parts[:-1])
-            version = parts[-1]
-        else:
-            base_name = model_id
-            version = "000"
-            
-        if base_name not in latest_models:
-            latest_models[base_name] = (version, m)
-        else:
-            current_version, _ = latest_models[base_name]
-            if version > current_version:
-                latest_models[base_name] = (version, m)
-                
-    return [item[1] for item in latest_models.values()]
+    latest_models = dedup_latest(models, lambda m: split_dash_version(m.get("id")))
+    return latest_models
 
-def main():
+def get_context_window(model_id):
+    """Stima euristica usata quando il provider non espone la finestra."""
+    if "llama-3.1" in model_id or "llama-3.3" in model_id:
+        return 131072 # 128k
+    if "llama3" in model_id:
+        return 8192
+    return 8192 # Default
+
+def refresh(force=False, workers=DEFAULT_WORKERS):
+    """
+    Scarica, filtra e salva il catalogo Cerebras.
+    Solleva un'eccezione in caso di errore.
+    Con force ignora la cache HTTP e riscrive i file anche se invariati.
+
+    Returns:
+        dict: count (modelli), changed (file riscritti), not_modified (risposta 304).
+    """
     api_key = os.getenv("CEREBRAS_API_KEY")
     if not api_key:
-        print("ERRORE: Imposta la variabile d'ambiente CEREBRAS_API_KEY")
-        return
+        raise RuntimeError("Imposta la variabile d'ambiente CEREBRAS_API_KEY")
     
     url = "https://api.cerebras.ai/v1/models"
     headers = {"Authorization": f"Bearer {api_key}"}
     
-    try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        all_models = response.json().get("data", [])
-        
-        filtered_models = filter_and_sort_models(all_models)
-        
-        Path("data").mkdir(exist_ok=True)
-        
-        def get_context_window(model_id):
-            if "llama-3.1" in model_id or "llama-3.3" in model_id:
-                return 131072 # 128k
-            if "llama3" in model_id:
-                return 8192
-            return 8192 # Default
-        
-        # 1. Salva lista nomi
-        with open("data/models_cerebras.txt", "w") as f:
-            for m in sorted(filtered_models, key=lambda x: x.get("id")):
-                f.write(f"{m.get('id')}\n")
-        
-        # 2. Salva nomi e finestra (wnd)
-        with open("data/models_cerebras_wnd.txt", "w") as f:
-            for m in sorted(filtered_models, key=lambda x: x.get("id")):
-                model_id = m.get("id")
-                limit = get_context_window(model_id)
-                k_limit = f"{limit // 1024}k" if limit >= 1024 else f"{limit}"
-                f.write(f"{model_id}|{k_limit}\n")
-                
-        # 3. Salva info dettagliate
-        with open("data/models_cerebras_info.txt", "w") as f:
-            f.write("MODELLI CEREBRAS - INFORMAZIONI DETTAGLIATE\n")
-            f.write("=" * 50 + "\n\n")
-            for m in sorted(filtered_models, key=lambda x: x.get("id")):
-                model_id = m.get("id")
-                f.write(f"ID: {model_id}\n")
-                f.write(f"Created: {m.get('created')}\n")
-                f.write(f"Owned By: {m.get('owned_by')}\n")
-                f.write(f"Context (est.): {get_context_window(model_id)}\n")
-                f.write("-" * 30 + "\n")
+    # GET condizionale: con 304 il catalogo non è cambiato
+    data, not_modified = cached_get_json(url, headers=headers, force=force)
+    if not_modified and catalog_exists("cerebras"):
+        result = {"count": count_models("cerebras"), "changed": 0, "not_modified": True}
+        return result
+    all_models = data.get("data", [])
+    
+    filtered_models = filter_and_sort_models(all_models)
+
+    # Finestra reale dai metadati del provider, stima euristica come riserva
+    windows = enrich_cerebras(filtered_models, headers, workers)
 
-        print(f"Completato! Salvati {len(filtered_models)} modelli Cerebras in data/")
-        
+    entries = []
+    for m in filtered_models:
+        model_id = m.get("id")
+        if windows.get(model_id):
+            limit, source = windows[model_id], "provider"
+        else:
+            limit, source = get_context_window(model_id), "est."
+        info = [
+            ("Created", m.get("created")),
+            ("Owned By", m.get("owned_by")),
+            (f"Context ({source})", limit),
+        ]
+        entries.append(catalog_entry(model_id, limit, info, m))
+
+    changed = write_catalog("cerebras", "MODELLI CEREBRAS", entries, force=force)
+    result = {"count": len(filtered_models), "changed": changed, "not_modified": False}
+    return result
+
+def main(force=False, workers=DEFAULT_WORKERS):
+    try:
+        result = refresh(force, workers)
     except Exception as e:
-        print(f"Errore: {e}")
+        print(f"ERRORE: {e}")
+        return
+    report("Cerebras", result)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Aggiorna il catalogo dei modelli Cerebras.")
+    parser.add_argument("--force", action="store_true",
+                        help="Ignora la cache HTTP, riscarica il catalogo e riscrive i file")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Richieste parallele per la finestra di contesto (default: {DEFAULT_WORKERS})")
+    args = parser.parse_args()
+    main(args.force, args.workers)
@@ -1,84 +1,160 @@
 #!/usr/bin/env python3
 """
 Script per ottenere i modelli HuggingFace filtrati e salvarli in file.
+
+Il catalogo viene letto pagina per pagina seguendo l'header Link (cursore
+rel="next") fino a un tetto configurabile. Ogni pagina è analizzata in
+streaming e filtro/deduplicazione lavorano sul flusso dei modelli, quindi la
+memoria resta limitata ai soli modelli selezionati.
+La finestra di contesto dei modelli selezionati viene letta dal loro
+config.json (vedi context_enrichment.py).
 """
 
 import os
-import requests
-from pathlib import Path
+import re
+import argparse
+
+import http_transport
+from json_stream import iter_json_array
+from catalog_writer import catalog_entry, report, write_catalog
+from model_dedup import dedup_latest
+from context_enrichment import DEFAULT_WORKERS, enrich_huggingface
+
+API_URL = "https://huggingface.co/api/models"
+DEFAULT_MAX_MODELS = 1000
+DEFAULT_PAGE_SIZE = 100
+
+LINK_NEXT_RE = re.compile(r'<([^>]+)>\s*;\s*rel="?next"?')
+
+# Campi conservati per ogni modello: il resto della risposta viene scartato
+KEPT_FIELDS = ("id", "sha", "pipeline_tag", "downloads", "likes")
+
+# La lista restituisce sha (la revisione, chiave della cache delle finestre)
+# solo se richiesto con expand; con expand vanno elencati tutti i campi
+# oltre a id, che c'è sempre
+EXPAND_FIELDS = [field for field in KEPT_FIELDS if field != "id"]
+
 
 def filter_and_sort_models(models):
     """
     HIGHLIGHT: Filtri di selezione
     1. Solo modelli di tipo 'text-generation'.
-    2. Su HF, consideriamo "free" i modelli pubblici e più popolari 
+    2. Su HF, consideriamo "free" i modelli pubblici e più popolari
        che solitamente sono disponibili via Inference API gratuita.
-    3. Per modelli con lo stesso nome base, mantiene il più scaricato/aggiornato.
+    3. Per modelli con lo stesso nome base, mantiene il più scaricato.
+
+    Accetta qualsiasi iterabile (anche un generatore): una sola passata.
     """
-    filtered = [m for m in models if m.get("pipeline_tag") == "text-generation"]
-    
-    latest_models = {}
-    for m in filtered:
-        model_id = m.get("modelId", m.get("id"))
-        base_name = model_id.split("/")[-1]
-        
-        if base_name not in latest_models:
-            latest_models[base_name] = m
-        else:
-            if m.get("downloads", 0) > latest_models[base_name].get("downloads", 0):
-                latest_models[base_name] = m
-                
-    return list(latest_models.values())
-
-def main():
-    token = os.getenv("HF_TOKEN")
-    
-    url = "https://huggingface.co/api/models"
+    text_models = (m for m in models if m.get("pipeline_tag") == "text-generation")
+    latest_models = dedup_latest(
+        text_models,
+        lambda m: (m.get("modelId", m.get("id")).split("/")[-1], None),
+        rank=lambda m, version: m.get("downloads") or 0)
+    return latest_models
+
+
+def next_page_url(link_header):
+    """Estrae l'URL della pagina successiva dall'header Link."""
+    if not link_header:
+        return None
+    match = LINK_NEXT_RE.search(link_header)
+    url = match.group(1) if match else None
+    return url
+
+
+def iter_catalog(headers, max_models=DEFAULT_MAX_MODELS, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Restituisce i modelli del catalogo uno alla volta, seguendo la
+    paginazione fino a max_models elementi.
+    Ogni modello è ridotto ai soli campi KEPT_FIELDS.
+    """
+    url = API_URL
     params = {
         "filter": "text-generation",
         "sort": "downloads",
         "direction": -1,
-        "limit": 100
+        "limit": min(page_size, max_models),
+        "expand[]": EXPAND_FIELDS
     }
+    seen = 0
+    while url and seen < max_models:
+        with http_transport.stream_get(url, headers=headers, params=params, timeout=30) as resp:
+            if resp.status_code != 200:
+                raise RuntimeError(f"HTTP {resp.status_code} da {url}")
+            link = resp.headers.get("Link")
+            for item in iter_json_array(resp.iter_chunks()):
+                model = {field: item.get(field) for field in KEPT_FIELDS}
+                if not model["id"]:
+                    model["id"] = item.get("modelId")
+                yield model
+                seen += 1
+                if seen >= max_models:
+                    break
+        # L'URL del cursore contiene già tutti i parametri
+        url = next_page_url(link)
+        params = None
+
+
+def refresh(force=False, max_models=DEFAULT_MAX_MODELS, page_size=DEFAULT_PAGE_SIZE,
+            enrich=True, workers=DEFAULT_WORKERS):
+    """
+    Scarica, filtra e salva il catalogo HuggingFace.
+    Solleva un'eccezione in caso di errore.
+    Con la paginazione il GET condizionale non si applica: con force i file
+    vengono riscritti anche se invariati.
+    Con enrich la finestra di contesto viene recuperata in parallelo (workers
+    richieste alla volta); senza, o se sconosciuta, si scrive N/A.
+
+    Returns:
+        dict: count (modelli), changed (file riscritti), not_modified (risposta 304).
+    """
+    if max_models < 1 or page_size < 1:
+        raise ValueError("max_models e page_size devono essere positivi")
+
+    token = os.getenv("HF_TOKEN")
     headers = {"Authorization": f"Bearer {token}"} if token else {}
-    
+
+    filtered_models = filter_and_sort_models(iter_catalog(headers, max_models, page_size))
+
+    # La lista non riporta la finestra di contesto: si legge dai config.json
+    windows = enrich_huggingface(filtered_models, headers, workers) if enrich else {}
+
+    entries = []
+    for m in filtered_models:
+        model_id = m.get("id")
+        window = windows.get(model_id)
+        info = [
+            ("Pipeline", m.get("pipeline_tag")),
+            ("Downloads", m.get("downloads")),
+            ("Likes", m.get("likes")),
+            ("Context", window or "N/A"),
+        ]
+        entries.append(catalog_entry(model_id, window, info, m))
+
+    changed = write_catalog("huggingface", "MODELLI HUGGINGFACE", entries, force=force)
+    result = {"count": len(filtered_models), "changed": changed, "not_modified": False}
+    return result
+
+def main(force=False, max_models=DEFAULT_MAX_MODELS, page_size=DEFAULT_PAGE_SIZE,
+         enrich=True, workers=DEFAULT_WORKERS):
     try:
-        response = requests.get(url, params=params, headers=headers)
-        response.raise_for_status()
-        all_models = response.json()
-        
-        filtered_models = filter_and_sort_models(all_models)
-        
-        Path("data").mkdir(exist_ok=True)
-        
-        # 1. Salva lista nomi
-        with open("data/models_huggingface.txt", "w") as f:
-            for m in sorted(filtered_models, key=lambda x: x.get("id")):
-                model_id = m.get("id")
-                f.write(f"{model_id}\n")
-        
-        # 2. Salva nomi e finestra (wnd)
-        # Nota: HF API non fornisce sempre window_size direttamente nel list
-        with open("data/models_huggingface_wnd.txt", "w") as f:
-            for m in sorted(filtered_models, key=lambda x: x.get("id")):
-                model_id = m.get("id")
-                f.write(f"{model_id}|N/A\n")
-                
-        # 3. Salva info dettagliate
-        with open("data/models_huggingface_info.txt", "w") as f:
-            f.write("MODELLI HUGGINGFACE - INFORMAZIONI DETTAGLIATE\n")
-            f.write("=" * 50 + "\n\n")
-            for m in sorted(filtered_models, key=lambda x: x.get("id")):
-                f.write(f"ID: {m.get('id')}\n")
-                f.write(f"Pipeline: {m.get('pipeline_tag')}\n")
-                f.write(f"Downloads: {m.get('downloads')}\n")
-                f.write(f"Likes: {m.get('likes')}\n")
-                f.write("-" * 30 + "\n")
-
-        print(f"Completato! Salvati {len(filtered_models)} modelli HuggingFace in data/")
-        
+        result = refresh(force, max_models, page_size, enrich, workers)
     except Exception as e:
-        print(f"Errore: {e}")
+        print(f"ERRORE: {e}")
+        return
+    report("HuggingFace", result)
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Aggiorna il catalogo dei modelli HuggingFace.")
+    parser.add_argument("--max-models", type=int, default=DEFAULT_MAX_MODELS,
+                        help=f"Numero massimo di modelli letti dal catalogo (default: {DEFAULT_MAX_MODELS})")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE,
+                        help=f"Modelli per pagina (default: {DEFAULT_PAGE_SIZE})")
+    parser.add_argument("--force", action="store_true",
+                        help="Riscrive i file anche se invariati")
+    parser.add_argument("--no-enrich", action="store_true",
+                        help="Non recupera la finestra di contesto dai config.json")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Richieste parallele per la finestra di contesto (default: {DEFAULT_WORKERS})")
+    args = parser.parse_args()
+    main(args.force, args.max_models, args.page_size, not args.no_enrich, args.workers)
@@ -6,19 +6,35 @@ Selezione Modelli Ottimali - Filtra, testa e ordina i modelli LLM.
 
 Questo script seleziona i modelli migliori da vari provider, filtrandoli in base alla loro idoneità alla chat e alla risposta a query semantiche.
 Successivamente, li ordina per velocità di risposta e dimensione della finestra di input per identificare i più performanti.
+In modalità streaming (--stream) misura anche time-to-first-token, latenza tra token e token/s.
+Con --runs/--warmup/--workload esegue un benchmark ripetuto e ordina su un percentile.
+Con --context-scaling misura ttft a contesti crescenti fino alla finestra di ogni modello.
+Con --load-test cerca il punto di saturazione di ogni modello sotto carico crescente.
+Le pause tra le richieste seguono le quote x-ratelimit-* registrate in
+data_ok/quota_ledger.sqlite, se il provider le comunica (vedi quota_ledger.py).
 """
 
-__date__ = "2026-02-11"
-__version__ = "1.1.0"
+__date__ = "2026-10-16"
+__version__ = "1.6.0"
 __author__ = "Gemini CLI"
 
 import os
 import sys
+import json
 import argparse
-import requests
 import time
+import itertools
 from pathlib import Path
 
+import http_transport
+from http_transport import OPENAI_COMPATIBLE_ENDPOINTS, TIMEOUT_ERRORS
+from bench_stats import PERCENTILES, TRIM_METHODS, combine_series, summarize
+from latency_store import LatencyStore
+from capability_index import CapabilityIndex
+import context_scaling
+import load_test
+from quota_ledger import QuotaExhausted, QuotaLedger, estimate_tokens
+
 
 def get_model_specs(provider: str) -> list:
     """Legge le specifiche dei modelli dai file data."""
@@ -62,65 +78,32 @@ def get_model_specs(provider: str) -> list:
     return model_specs
 
 
-def get_chat_capable_models() -> dict:
-    """Identifica i modelli capaci di gestire conversazioni chat."""
-    chat_models = {}
-    data_path = Path("data")
-
-    info_files = list(data_path.glob("*_info.txt"))
-
-    for info_file in info_files:
-        provider = info_file.name.replace(
-            "models_", "").replace("_info.txt", "")
-        current_models = []
-        content = info_file.read_text(encoding='utf-8')
-
-        model_entries = content.split("------------------------------")
-        for entry in model_entries:
-            entry = entry.strip()
-            if not entry:
-                continue
-
-            model_id = None
-            if "ID:" in entry:
-                model_id_line = next((line for line in entry.split(
-                    '\n') if line.strip().startswith("ID:")), None)
-                if model_id_line:
-                    model_id = model_id_line.split("ID:", 1)[1].strip()
-
-            if not model_id:
-                continue
-
-            if provider == "huggingface":
-                if "Pipeline: text-generation" in entry:
-                    current_models.append(model_id)
-            elif provider == "openrouter":
-                if "Modality: text->text" in entry or "Modality: text+image->text" in entry:
-                    current_models.append(model_id)
-            else:
-                if provider in ["cerebras", "groq"]:
-                    current_models.append(model_id)
-                elif provider == "gemini":
-                    if not any(keyword in model_id.lower() for keyword in ["image", "tts", "robotics"]):
-                        current_models.append(model_id)
-                elif provider == "mistral":
-                    if not any(keyword in model_id.lower() for keyword in ["pixtral", "voxtral"]):
-                        current_models.append(model_id)
+def get_chat_capable_models(provider: str = None, index: CapabilityIndex = None) -> dict:
+    """
+    Identifica i modelli capaci di gestire conversazioni chat.
+    Interroga l'indice delle capacità; con provider carica solo quel catalogo.
+    """
+    if index is None:
+        index = CapabilityIndex()
+    providers = [provider] if provider else index.providers()
 
+    chat_models = {}
+    for name in providers:
+        current_models = index.query(name, ("chat",))
         if current_models:
-            chat_models[provider] = current_models
+            chat_models[name] = current_models
 
     return chat_models
 
 
-def test_model_performance(provider: str, model_id: str, api_key: str, query: str) -> tuple:
-    """Testa le prestazioni di un modello e restituisce esito, tempo, validità, lunghezza e errore."""
-    endpoints = {
-        "groq": "https://api.groq.com/openai/v1/chat/completions",
-        "mistral": "https://api.mistral.ai/v1/chat/completions",
-        "cerebras": "https://api.cerebras.ai/v1/chat/completions",
-        "openrouter": "https://openrouter.ai/api/v1/chat/completions",
-    }
+def test_model_performance(provider: str, model_id: str, api_key: str, query: str,
+                           ledger=None) -> tuple:
+    """
+    Testa le prestazioni di un modello e restituisce esito, tempo, validità, lunghezza e errore.
+    Con ledger registra le quote comunicate negli header della risposta.
+    """
+    endpoints = OPENAI_COMPATIBLE_ENDPOINTS
+    resp = None
 
     success = False
     response_time = 999.0
@@ -132,12 +115,12 @@ def test_model_performance(provider: str, model_id: str, api_key: str, query: st
 
     try:
         if provider == "gemini":
-            base_url = "https://generativelanguage.googleapis.com/v1beta"
+            base_url = http_transport.GEMINI_BASE_URL
             model_url = f"models/{model_id}" if not model_id.startswith(
                 "models/") else model_id
             url = f"{base_url}/{model_url}:generateContent?key={api_key}"
             payload = {"contents": [{"parts": [{"text": query}]}]}
-            resp = requests.post(url, json=payload, timeout=30)
+            resp = http_transport.post(url, json=payload, timeout=30)
             if resp.status_code == 200:
                 data = resp.json()
                 if "candidates" in data and data["candidates"]:
@@ -159,9 +142,9 @@ def test_model_performance(provider: str, model_id: str, api_key: str, query: st
             payload = {
                 "model": model_id,
                 "messages": [{"role": "user", "content": query}],
-                "max_tokens": 500
+                "max_tokens": MAX_OUTPUT_TOKENS
             }
-            resp = requests.post(url, headers=headers,
+            resp = http_transport.post(url, headers=headers,
                                  json=payload, timeout=30)
             if resp.status_code == 200:
                 data = resp.json()
@@ -175,18 +158,21 @@ def test_model_performance(provider: str, model_id: str, api_key: str, query: st
                 else:
                     error_msg = "Nessuna scelta restituita"
             else:
+                # Il codice resta in testa: load_test classifica gli errori da qui
+                error_msg = f"HTTP {resp.status_code}"
                 try:
                     err_json = resp.json()
-                    error_msg = err_json.get("error", {}).get(
-                        "message", f"HTTP {resp.status_code}")
+                    message = err_json.get("error", {}).get("message")
+                    if message:
+                        error_msg = f"HTTP {resp.status_code}: {message}"
                 except:
-                    error_msg = f"HTTP {resp.status_code}"
+                    pass
 
         elif provider == "huggingface":
-            url = f"https://api-inference.huggingface.co/models/{model_id}"
+            url = f"{http_transport.HF_INFERENCE_URL}/{model_id}"
             headers = {"Authorization": f"Bearer {api_key}"}
             payload = {"inputs": query}
-            resp = requests.post(url, headers=headers,
+            resp = http_transport.post(url, headers=headers,
                                  json=payload, timeout=30)
             if resp.status_code == 200:
                 data = resp.json()
@@ -205,12 +191,14 @@ def test_model_performance(provider: str, model_id: str, api_key: str, query: st
             else:
                 error_msg = f"HTTP {resp.status_code}"
 
-    except requests.exceptions.Timeout:
+    except TIMEOUT_ERRORS:
         error_msg = "Timeout"
     except Exception as e:
         error_msg = str(e)[:50]
 
     end_time = time.time()
+    if ledger is not None and resp is not None:
+        ledger.observe(provider, api_key, resp.headers, resp.status_code)
     if success:
         response_time = end_time - start_time
 
@@ -219,17 +207,539 @@ def test_model_performance(provider: str, model_id: str, api_key: str, query: st
     return result
 
 
-def filter_and_sort_models(models_tested: list) -> list:
-    """Filtra i modelli con successo e li ordina per tempo di risposta."""
+# Metriche disponibili per l'ordinamento: nome -> (descrizione, più alto è meglio)
+METRICS = {
+    "total": ("tempo totale (s)", False),
+    "ttft": ("time-to-first-token (s)", False),
+    "itl": ("latenza media tra token (s)", False),
+    "tps": ("token di output al secondo", True),
+}
+
+
+def iter_sse_data(lines):
+    """Estrae i payload 'data:' da un flusso Server-Sent Events."""
+    for line in lines:
+        if not line or not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            break
+        if data:
+            yield data
+
+
+def parse_stream_event(provider: str, data: str) -> tuple:
+    """
+    Interpreta un evento dello stream.
+
+    Returns:
+        tuple: (testo del frammento, token di output riportati dal provider o None).
+    """
+    event = json.loads(data)
+    text = ""
+    tokens = None
+
+    if provider == "gemini":
+        candidates = event.get("candidates") or []
+        if candidates:
+            parts = candidates[0].get("content", {}).get("parts", [])
+            text = "".join(part.get("text", "") for part in parts)
+        usage = event.get("usageMetadata") or {}
+        tokens = usage.get("candidatesTokenCount")
+    elif provider == "huggingface":
+        text = event.get("token", {}).get("text", "")
+        details = event.get("details") or {}
+        tokens = details.get("generated_tokens")
+    else:
+        choices = event.get("choices") or []
+        if choices:
+            text = choices[0].get("delta", {}).get("content") or ""
+        usage = event.get("usage") or {}
+        tokens = usage.get("completion_tokens")
+
+    result = (text, tokens)
+    return result
+
+
+def build_stream_request(provider: str, model_id: str, api_key: str, query: str,
+                         max_tokens: int = None) -> tuple:
+    """
+    Costruisce URL, header e payload della richiesta in streaming.
+    max_tokens limita l'output (default: 500, nessun limite per Gemini).
+    """
+    if provider == "gemini":
+        model_url = f"models/{model_id}" if not model_id.startswith(
+            "models/") else model_id
+        url = f"{http_transport.GEMINI_BASE_URL}/{model_url}:streamGenerateContent?alt=sse&key={api_key}"
+        headers = {"Content-Type": "application/json"}
+        payload = {"contents": [{"parts": [{"text": query}]}]}
+        if max_tokens:
+            payload["generationConfig"] = {"maxOutputTokens": max_tokens}
+    elif provider == "huggingface":
+        url = f"{http_transport.HF_INFERENCE_URL}/{model_id}"
+        headers = {"Authorization": f"Bearer {api_key}"}
+        payload = {"inputs": query, "stream": True,
+                   "parameters": {"max_new_tokens": max_tokens or MAX_OUTPUT_TOKENS, "details": True}}
+    else:
+        url = OPENAI_COMPATIBLE_ENDPOINTS[provider]
+        headers = {"Authorization": f"Bearer {api_key}",
+                   "Content-Type": "application/json"}
+        payload = {
+            "model": model_id,
+            "messages": [{"role": "user", "content": query}],
+            "max_tokens": max_tokens or MAX_OUTPUT_TOKENS,
+            "stream": True,
+            "stream_options": {"include_usage": True},
+        }
+    result = (url, headers, payload)
+    return result
+
+
+def test_model_streaming(provider: str, model_id: str, api_key: str, query: str,
+                         max_tokens: int = None, timeout: float = 30, ledger=None) -> tuple:
+    """
+    Testa un modello in streaming misurando time-to-first-token,
+    latenza media tra frammenti e token di output al secondo.
+    Con ledger registra le quote comunicate negli header della risposta.
+
+    Returns:
+        tuple: (esito, dizionario metriche, lunghezza risposta, errore).
+    """
+    if provider != "gemini" and provider != "huggingface" and provider not in OPENAI_COMPATIBLE_ENDPOINTS:
+        return (False, {}, 0, f"Provider {provider} non supportato")
+
+    url, headers, payload = build_stream_request(
+        provider, model_id, api_key, query, max_tokens)
+
+    success = False
+    metrics = {}
+    response_length = 0
+    error_msg = ""
+    chunk_times = []
+    reported_tokens = None
+
+    start_time = time.perf_counter()
+    try:
+        with http_transport.stream_post(url, headers=headers, json=payload, timeout=timeout) as resp:
+            if ledger is not None:
+                ledger.observe(provider, api_key, resp.headers, resp.status_code)
+            if resp.status_code != 200:
+                error_msg = f"HTTP {resp.status_code}"
+            else:
+                for data in iter_sse_data(resp.iter_lines()):
+                    text, tokens = parse_stream_event(provider, data)
+                    if tokens:
+                        reported_tokens = tokens
+                    if text:
+                        chunk_times.append(time.perf_counter())
+                        response_length += len(text)
+                if not chunk_times:
+                    error_msg = "Stream vuoto"
+    except TIMEOUT_ERRORS:
+        error_msg = "Timeout"
+    except Exception as e:
+        error_msg = str(e)[:50]
+    end_time = time.perf_counter()
+
+    if chunk_times and not error_msg:
+        success = True
+        first_token = chunk_times[0]
+        # Senza conteggio dal provider ogni frammento vale un token
+        output_tokens = reported_tokens or len(chunk_times)
+        generation_time = end_time - first_token
+
+        metrics["total"] = end_time - start_time
+        metrics["ttft"] = first_token - start_time
+        if len(chunk_times) > 1:
+            gaps = [b - a for a, b in zip(chunk_times, chunk_times[1:])]
+            metrics["itl"] = sum(gaps) / len(gaps)
+        else:
+            metrics["itl"] = 0.0
+        if generation_time > 0:
+            metrics["tps"] = output_tokens / generation_time
+        else:
+            metrics["tps"] = 0.0
+        metrics["tokens"] = output_tokens
+
+    result = (success, metrics, response_length, error_msg)
+    return result
+
+
+def format_metrics(metrics: dict) -> str:
+    """Formatta le metriche misurate per la stampa."""
+    parts = [f"tempo={metrics['total']:.2f}s"]
+    if "ttft" in metrics:
+        parts.append(f"ttft={metrics['ttft']:.2f}s")
+        parts.append(f"itl={metrics['itl'] * 1000:.0f}ms")
+        parts.append(f"tps={metrics['tps']:.1f}")
+    text = ", ".join(parts)
+    return text
+
+
+def filter_and_sort_models(models_tested: list, metric: str = "total") -> list:
+    """
+    Filtra i modelli con successo e li ordina secondo la metrica scelta
+    (vedi METRICS). I modelli privi della metrica finiscono in coda.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Metrica sconosciuta: {metric}")
+    higher_is_better = METRICS[metric][1]
+
+    def sort_key(model):
+        value = model[4].get(metric)
+        if value is None:
+            return (1, 0.0)
+        if higher_is_better:
+            return (0, -value)
+        return (0, value)
+
     successful_models = [m for m in models_tested if m[3]]
-    sorted_models = sorted(successful_models, key=lambda x: x[4])
+    sorted_models = sorted(successful_models, key=sort_key)
     return sorted_models
 
 
-def do_main(input_provider: str) -> bool:
-    """Orchestra la logica per la selezione dei modelli."""
+DEFAULT_QUERY = "Spiegami brevemente l'importanza di Dante Alighieri per la lingua italiana e la cultura europea."
+
+# Quota minima di esecuzioni riuscite perché un modello sia considerato valido
+MIN_SUCCESS_RATIO = 0.5
+
+# Nuove misure dopo un 429, ciascuna al ripristino della quota
+RATE_LIMIT_RETRIES = 2
+
+# Output massimo delle misure: conta anche nella stima dei token per le quote
+MAX_OUTPUT_TOKENS = 500
+
+
+def load_workload(workload_file: str) -> list:
+    """
+    Legge il file del carico di lavoro (vedi workloads/default.json).
+    Senza file restituisce il solo prompt di default.
+
+    Returns:
+        list: Coppie (nome, testo del prompt).
+    """
+    if not workload_file:
+        return [("default", DEFAULT_QUERY)]
+
+    path = Path(workload_file)
+    if not path.exists():
+        raise FileNotFoundError(f"File workload {workload_file} non trovato")
+
+    data = json.loads(path.read_text(encoding="utf-8"))
+    prompts = []
+    for i, item in enumerate(data.get("prompts", []), 1):
+        text = item.get("text", "").strip()
+        if text:
+            prompts.append((item.get("name", f"prompt{i}"), text))
+
+    if not prompts:
+        raise ValueError(f"Nessun prompt valido in {workload_file}")
+    return prompts
+
+
+def measure_once(provider: str, model_id: str, api_key: str, query: str, stream: bool,
+                 ledger=None) -> tuple:
+    """
+    Esegue una singola misura, in streaming o meno.
+    Con ledger attende la quota disponibile prima della richiesta e, dopo
+    un 429, ripete la misura al ripristino della quota.
+
+    Returns:
+        tuple: (esito, dizionario metriche, lunghezza risposta, errore).
+    """
+    for _ in range(RATE_LIMIT_RETRIES + 1):
+        if ledger is not None:
+            try:
+                ledger.wait(provider, api_key, estimate_tokens(query, MAX_OUTPUT_TOKENS))
+            except QuotaExhausted as e:
+                return (False, {}, 0, str(e))
+        if stream:
+            success, metrics, resp_len, err = test_model_streaming(
+                provider, model_id, api_key, query, ledger=ledger)
+        else:
+            success, resp_time, valid, resp_len, err = test_model_performance(
+                provider, model_id, api_key, query, ledger)
+            success = success and valid
+            metrics = {"total": resp_time} if success else {}
+        if ledger is None or not err.startswith("HTTP 429"):
+            break
+    result = (success, metrics, resp_len, err)
+    return result
+
+
+def pace(ledger, provider: str, api_key: str, pause: float):
+    """Pausa fissa tra le richieste, superflua se le quote del provider sono note."""
+    if ledger is None or not ledger.knows(provider, api_key):
+        time.sleep(pause)
+
+
+def record_sample(store, provider: str, model_id: str, success: bool,
+                  metrics: dict, resp_len: int, err: str):
+    """Aggiunge una misura allo storico delle latenze (se attivo)."""
+    if store is None:
+        return
+    if success:
+        store.append(provider, model_id, metrics.get("total"), resp_len, "",
+                     metrics.get("ttft"), metrics.get("tps"))
+    else:
+        store.append(provider, model_id, None, 0, err or "errore")
+
+
+def benchmark_model(provider: str, model_id: str, api_key: str, prompts: list,
+                    stream: bool, runs: int, warmup: int, pause: float,
+                    trim: str, store=None, ledger=None) -> dict:
+    """
+    Benchmark ripetuto di un modello: warmup scartati, poi runs ripetizioni
+    di ogni prompt del workload.
+    Outlier e percentili sono calcolati per prompt: mescolando prompt brevi e
+    lunghi il trimming scarterebbe proprio i campioni dei prompt lunghi.
+    Le statistiche complessive (usate per l'ordinamento) riuniscono i
+    campioni dei prompt normalizzati per prompt (vedi combine_series).
+
+    Returns:
+        dict: Campioni e statistiche per prompt, statistiche complessive per
+        metrica, errori e prompt senza alcun campione riuscito.
+    """
+    for i in range(warmup):
+        _, query = prompts[i % len(prompts)]
+        measure_once(provider, model_id, api_key, query, stream, ledger)
+        pace(ledger, provider, api_key, pause)
+
+    samples = {prompt_name: {} for prompt_name, _ in prompts}
+    errors = []
+    attempts = 0
+    for _ in range(runs):
+        for prompt_name, query in prompts:
+            attempts += 1
+            success, metrics, resp_len, err = measure_once(
+                provider, model_id, api_key, query, stream, ledger)
+            record_sample(store, provider, model_id, success, metrics, resp_len, err)
+            if success:
+                for name, value in metrics.items():
+                    if name in METRICS:
+                        samples[prompt_name].setdefault(name, []).append(value)
+            else:
+                errors.append(f"{prompt_name}: {err}")
+            pace(ledger, provider, api_key, pause)
+
+    per_prompt = {}
+    for prompt_name, prompt_samples in samples.items():
+        per_prompt[prompt_name] = {
+            "samples": prompt_samples,
+            "stats": {name: summarize(values, trim) for name, values in prompt_samples.items()},
+        }
+    metric_names = {name for prompt_samples in samples.values() for name in prompt_samples}
+    stats = {name: combine_series([prompt_samples.get(name) for prompt_samples in samples.values()], trim)
+             for name in metric_names}
+    result = {
+        "attempts": attempts,
+        "errors": errors,
+        "missing": [prompt_name for prompt_name, prompt_samples in samples.items() if not prompt_samples],
+        "prompts": per_prompt,
+        "stats": stats,
+    }
+    return result
+
+
+def run_benchmarks(provider: str, api_key: str, models_to_test: list, prompts: list,
+                   stream: bool, multi_run: bool, runs: int, warmup: int,
+                   pause: float, trim: str, rank_percentile: str, store,
+                   ledger=None) -> tuple:
+    """
+    Misura tutti i modelli (campione singolo o benchmark ripetuto).
+
+    Returns:
+        tuple: (risultati per filter_and_sort_models, distribuzione per modello).
+    """
+    tested_results = []
+    distribution = {}
+    for model_id, window, _ in models_to_test:
+        print(f"{model_id:30} ...", end="", flush=True)
+
+        if multi_run:
+            bench = benchmark_model(provider, model_id, api_key, prompts,
+                                    stream, runs, warmup, pause, trim, store, ledger)
+            distribution[model_id] = bench
+            succeeded = bench["attempts"] - len(bench["errors"])
+            # Senza tutti i prompt il modello sembrerebbe più veloce di quanto è
+            success = (succeeded >= bench["attempts"] * MIN_SUCCESS_RATIO and succeeded > 0
+                       and not bench["missing"])
+            # Il valore di ordinamento è il percentile scelto, non un campione
+            metrics = {name: stat[rank_percentile]
+                       for name, stat in bench["stats"].items()}
+            err = bench["errors"][-1] if bench["errors"] else ""
+            if bench["missing"] and succeeded > 0:
+                err = f"nessun campione per {', '.join(bench['missing'])}"
+            if success:
+                total_stats = bench["stats"]["total"]
+                print(f"OK ({rank_percentile}: {format_metrics(metrics)}, "
+                      f"stddev={total_stats['stddev']:.2f}s, {succeeded}/{bench['attempts']})")
+        else:
+            success, metrics, resp_len, err = measure_once(
+                provider, model_id, api_key, prompts[0][1], stream, ledger)
+            record_sample(store, provider, model_id, success, metrics, resp_len, err)
+            if success:
+                print(f"OK ({format_metrics(metrics)}, {resp_len} car.)")
+
+        if success:
+            tested_results.append((model_id, window, 0, True, metrics))
+        else:
+            # Tronca l'errore se troppo lungo
+            err_short = (err[:30] + '..') if len(err) > 30 else err
+            print(f"FAILED ({err_short})")
+            tested_results.append((model_id, window, 0, False, {}))
+
+        pace(ledger, provider, api_key, pause)
+
+    result = (tested_results, distribution)
+    return result
+
+
+def run_context_scaling(provider: str, api_key: str, models_to_test: list, steps: list,
+                        runs: int, pause: float, max_ttft: float, ledger=None) -> dict:
+    """
+    Misura ttft a contesti crescenti per ogni modello (vedi context_scaling.py).
+
+    Returns:
+        dict: {modello: risultato di context_scaling.scale_model}.
+    """
+    results = {}
+    for model_id, window, _ in models_to_test:
+        print(f"{model_id:30} (finestra {window // 1024 if window else 'N/A'}k) ...", end="", flush=True)
+
+        def measure(prompt):
+            if ledger is not None:
+                try:
+                    ledger.wait(provider, api_key,
+                                estimate_tokens(prompt, context_scaling.OUTPUT_TOKENS))
+                except QuotaExhausted as e:
+                    return False, {}, str(e)
+            # Prompt lunghi: il prefill può richiedere ben più dei 30 s abituali
+            success, metrics, _, err = test_model_streaming(
+                provider, model_id, api_key, prompt,
+                max_tokens=context_scaling.OUTPUT_TOKENS, timeout=300, ledger=ledger)
+            return success, metrics, err
+
+        result = context_scaling.scale_model(measure, window, steps, runs, pause, max_ttft)
+        results[model_id] = result
+        print(f" {context_scaling.format_scaling(result)}")
+    return results
+
+
+def run_load_test(provider: str, api_key: str, models_to_test: list, mode: str,
+                  levels: list, duration: float, max_error_rate: float,
+                  pause: float, stream: bool, prompts: list) -> dict:
+    """
+    Rampa di carico su ogni modello (vedi load_test.py).
+    I prompt del workload vengono inviati a rotazione.
+
+    Returns:
+        dict: {modello: risultato di load_test.ramp_model}.
+    """
+    unit = "worker" if mode == "closed" else "rps"
+    results = {}
+    for i, (model_id, _, _) in enumerate(models_to_test):
+        if i:
+            time.sleep(pause)
+        print(f"\n{model_id} ({mode} loop, livelli in {unit}):")
+
+        queries = itertools.cycle([text for _, text in prompts])
+
+        def measure():
+            success, metrics, _, err = measure_once(
+                provider, model_id, api_key, next(queries), stream)
+            return success, metrics, err
+
+        result = load_test.ramp_model(
+            measure, mode, levels, duration, max_error_rate, pause,
+            on_level=lambda entry: print(f"  {load_test.format_level(entry)}"))
+        results[model_id] = result
+        print(f"  => {load_test.format_capacity(result)}")
+    return results
+
+
+def save_stats(provider: str, distribution: dict, options: dict) -> Path:
+    """Salva la distribuzione completa accanto alla lista ordinata."""
+    output_dir = Path("data_ok")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    output_file = output_dir / f"{provider}_stats.json"
+    document = {
+        "provider": provider,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "options": options,
+        "models": distribution,
+    }
+    output_file.write_text(json.dumps(document, indent=2), encoding="utf-8")
+    return output_file
+
+
+def do_main(input_provider: str, http2: bool = False, stream: bool = False,
+            rank_by: str = None, runs: int = 1, warmup: int = 0,
+            workload_file: str = None, rank_percentile: str = "p50",
+            trim: str = "iqr", pause: float = 2.0, history: bool = True,
+            context_steps: str = None, max_ttft: float = context_scaling.DEFAULT_MAX_TTFT,
+            load_mode: str = None, load_levels: str = None,
+            load_duration: float = load_test.DEFAULT_DURATION,
+            max_error_rate: float = load_test.DEFAULT_MAX_ERROR_RATE,
+            use_ledger: bool = True) -> bool:
+    """
+    Orchestra la logica per la selezione dei modelli.
+    Con stream=True misura anche ttft, itl e tps e, se rank_by non è
+    indicato, ordina per time-to-first-token.
+    Con runs > 1, warmup o un workload esegue il benchmark ripetuto e
+    ordina sul percentile rank_percentile invece che su un solo campione.
+    Con history=True ogni campione misurato viene aggiunto a data_ok/latency.sqlite.
+    Con context_steps (es. "1k,8k,32k") esegue invece il benchmark di
+    scalabilità del contesto e salva le curve in data_ok/<provider>_context.json.
+    Con load_mode ("closed" o "open") esegue una rampa di carico per modello
+    e salva la capacità in data_ok/<provider>_load.json.
+    Con use_ledger le richieste seguono le quote comunicate dal provider
+    (non nel test di carico, che deve proprio trovare l'inizio dei 429).
+    """
     provider = input_provider.lower()
 
+    if rank_by is None:
+        rank_by = "ttft" if stream else "total"
+    if rank_by not in METRICS:
+        print(f"Errore: metrica '{rank_by}' sconosciuta. Disponibili: {', '.join(METRICS)}")
+        return False
+    if rank_by != "total" and not stream:
+        print(f"Errore: la metrica '{rank_by}' richiede --stream.")
+        return False
+    if runs < 1 or warmup < 0:
+        print("Errore: runs deve essere >= 1 e warmup >= 0.")
+        return False
+    if rank_percentile not in PERCENTILES:
+        print(f"Errore: percentile '{rank_percentile}' sconosciuto. Disponibili: {', '.join(PERCENTILES)}")
+        return False
+
+    try:
+        prompts = load_workload(workload_file)
+    except (OSError, ValueError) as e:
+        print(f"Errore workload: {e}")
+        return False
+    multi_run = runs > 1 or warmup > 0 or workload_file is not None
+    steps = None
+    if context_steps:
+        try:
+            steps = context_scaling.parse_steps(context_steps)
+        except ValueError as e:
+            print(f"Errore: {e}")
+            return False
+    levels = None
+    if load_mode:
+        if load_mode not in load_test.MODES:
+            print(f"Errore: modalità di carico '{load_mode}' sconosciuta. Disponibili: {', '.join(load_test.MODES)}")
+            return False
+        try:
+            levels = load_test.parse_levels(load_levels or load_test.DEFAULT_LEVELS[load_mode], load_mode)
+        except ValueError as e:
+            print(f"Errore: {e}")
+            return False
+        if load_duration <= 0:
+            print("Errore: la durata di ogni livello deve essere > 0.")
+            return False
+
     env_var = f"{provider.upper()}_API_KEY"
     api_key = os.getenv(env_var)
     if provider == "openrouter" and not api_key:
@@ -242,52 +752,96 @@ def do_main(input_provider: str) -> bool:
         print(f"Errore: Chiave API per {provider} non trovata.")
         return False
 
-    all_chat_models = get_chat_capable_models()
-    chat_models_for_provider = all_chat_models.get(provider, [])
-
-    if not chat_models_for_provider:
+    index = CapabilityIndex()
+    if not index.query(provider, ("chat",)):
         print(f"Nessun modello chat-capable trovato per {provider}")
         return False
 
     all_models_specs = get_model_specs(provider)
     models_to_test = [
-        spec for spec in all_models_specs if spec[0] in chat_models_for_provider]
+        spec for spec in all_models_specs if index.has(provider, spec[0], "chat")]
 
     if not models_to_test:
         print(f"Nessun modello chat-capable trovato in data per {provider}")
         return False
 
-    print(
-        f"Avvio test prestazioni per {len(models_to_test)} modelli di {provider}...")
-    query_italiana = "Spiegami brevemente l'importanza di Dante Alighieri per la lingua italiana e la cultura europea."
-
-    tested_results = []
-    for model_id, window, _ in models_to_test:
-        print(f"{model_id:30} ...", end="", flush=True)
-
-        success, resp_time, valid, resp_len, err = test_model_performance(
-            provider, model_id, api_key, query_italiana)
+    # Handshake TCP/TLS fuori dalla misura: la connessione resta nel pool
+    if http2:
+        http_transport.enable_http2(True)
+    if levels is not None:
+        # Il pool deve reggere tutte le richieste in volo del livello più alto
+        http_transport.POOL_SIZE = max(http_transport.POOL_SIZE,
+                                       load_test.connections_needed(load_mode, levels))
+    http_transport.preconnect(http_transport.provider_hosts([provider]))
+
+    if steps is not None:
+        print(f"Scalabilità del contesto per {len(models_to_test)} modelli di {provider} "
+              f"(passi: {', '.join(f'{s // 1024}k' for s in steps)}, fino alla finestra)...")
+        ledger = QuotaLedger() if use_ledger else None
+        try:
+            results = run_context_scaling(
+                provider, api_key, models_to_test, steps, runs, pause, max_ttft, ledger)
+        finally:
+            if ledger is not None:
+                ledger.close()
+        options = {"steps": steps, "runs": runs, "max_ttft": max_ttft}
+        output_file = context_scaling.save_context_results(provider, results, options)
+        print(f"\nCurve salvate in {output_file}")
+        return True
 
-        if success and valid:
-            print(f"OK ({resp_time:.2f}s, {resp_len} car.)")
-            tested_results.append((model_id, window, 0, True, resp_time))
-        else:
-            # Tronca l'errore se troppo lungo
-            err_short = (err[:30] + '..') if len(err) > 30 else err
-            print(f"FAILED ({err_short})")
-            tested_results.append((model_id, window, 0, False, 999.0))
+    if levels is not None:
+        print(f"Test di carico per {len(models_to_test)} modelli di {provider} "
+              f"({load_duration:g}s per livello, saturo oltre {max_error_rate:.0%} di 429/5xx/timeout)...")
+        results = run_load_test(
+            provider, api_key, models_to_test, load_mode, levels, load_duration,
+            max_error_rate, pause, stream, prompts)
+        options = {"mode": load_mode, "levels": levels, "duration": load_duration,
+                   "max_error_rate": max_error_rate, "stream": stream}
+        output_file = load_test.save_load_results(provider, results, options)
+        print(f"\nRisultati salvati in {output_file}")
+        return True
 
-        time.sleep(2.0)
+    print(
+        f"Avvio test prestazioni per {len(models_to_test)} modelli di {provider}...")
+    if multi_run:
+        print(f"Benchmark ripetuto: warmup={warmup}, runs={runs}, prompt={len(prompts)}, "
+              f"ordinamento su {rank_percentile}, trimming={trim}")
 
-    best_models = filter_and_sort_models(tested_results)
+    store = LatencyStore() if history else None
+    ledger = QuotaLedger() if use_ledger else None
+    try:
+        tested_results, distribution = run_benchmarks(
+            provider, api_key, models_to_test, prompts, stream, multi_run,
+            runs, warmup, pause, trim, rank_percentile, store, ledger)
+    finally:
+        if store is not None:
+            store.close()
+        if ledger is not None:
+            ledger.close()
+
+    best_models = filter_and_sort_models(tested_results, rank_by)
+
+    if multi_run:
+        options = {
+            "runs": runs,
+            "warmup": warmup,
+            "stream": stream,
+            "workload": workload_file,
+            "prompts": [name for name, _ in prompts],
+            "rank_by": rank_by,
+            "rank_percentile": rank_percentile,
+            "trim": trim,
+        }
+        stats_file = save_stats(provider, distribution, options)
+        print(f"Distribuzione completa salvata in {stats_file}")
 
     if not best_models:
         print(f"\nNessun modello ha superato il test per {provider}.")
         return False
 
-    print(f"\nMigliori modelli per {provider} (ordinati per velocità):")
-    for i, (model_id, window, _, _, resp_time) in enumerate(best_models, 1):
-        print(f"{i}. {model_id}: tempo={resp_time:.2f}s, finestra={window}")
+    print(f"\nMigliori modelli per {provider} (ordinati per {METRICS[rank_by][0]}):")
+    for i, (model_id, window, _, _, metrics) in enumerate(best_models, 1):
+        print(f"{i}. {model_id}: {format_metrics(metrics)}, finestra={window}")
 
     output_dir = Path("data_ok")
     output_dir.mkdir(parents=True, exist_ok=True)
@@ -308,8 +862,49 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description="Seleziona i modelli migliori di un provider.")
     parser.add_argument("provider", help="Nome del provider")
+    parser.add_argument("--http2", action="store_true",
+                        help="Usa HTTP/2 se httpx[http2] è installato")
+    parser.add_argument("--stream", action="store_true",
+                        help="Benchmark in streaming: misura ttft, itl e token/s")
+    parser.add_argument("--rank-by", choices=list(METRICS), default=None,
+                        help="Metrica di ordinamento (default: ttft con --stream, altrimenti total)")
+    parser.add_argument("--runs", type=int, default=1,
+                        help="Ripetizioni misurate per ogni prompt (default: 1)")
+    parser.add_argument("--warmup", type=int, default=0,
+                        help="Richieste di warmup scartate per modello (default: 0)")
+    parser.add_argument("--workload", default=None,
+                        help="File JSON con i prompt del benchmark (es. workloads/default.json)")
+    parser.add_argument("--percentile", choices=list(PERCENTILES), default="p50",
+                        help="Percentile usato per l'ordinamento (default: p50)")
+    parser.add_argument("--trim", choices=list(TRIM_METHODS), default="iqr",
+                        help="Rimozione outlier prima delle statistiche (default: iqr)")
+    parser.add_argument("--pause", type=float, default=2.0,
+                        help="Pausa in secondi tra le richieste (default: 2.0)")
+    parser.add_argument("--no-history", action="store_true",
+                        help="Non aggiungere i campioni allo storico data_ok/latency.sqlite")
+    parser.add_argument("--context-scaling", nargs="?", const="1k,8k,32k,64k,128k", default=None,
+                        metavar="PASSI",
+                        help="Misura ttft a contesti crescenti fino alla finestra (default passi: 1k,8k,32k,64k,128k)")
+    parser.add_argument("--max-ttft", type=float, default=context_scaling.DEFAULT_MAX_TTFT,
+                        help=f"Soglia di ttft per il contesto massimo 'veloce' (default: {context_scaling.DEFAULT_MAX_TTFT})")
+    parser.add_argument("--load-test", choices=load_test.MODES, default=None,
+                        help="Rampa di carico per modello: closed (N worker) o open (RPS obiettivo)")
+    parser.add_argument("--levels", default=None,
+                        help="Livelli della rampa: worker o RPS (default: "
+                             f"{load_test.DEFAULT_LEVELS['closed']} worker, {load_test.DEFAULT_LEVELS['open']} rps)")
+    parser.add_argument("--duration", type=float, default=load_test.DEFAULT_DURATION,
+                        help=f"Secondi per livello (default: {load_test.DEFAULT_DURATION:g})")
+    parser.add_argument("--max-error-rate", type=float, default=load_test.DEFAULT_MAX_ERROR_RATE,
+                        help=f"Quota di 429/5xx/timeout oltre cui un livello è saturo (default: {load_test.DEFAULT_MAX_ERROR_RATE})")
+    parser.add_argument("--no-ledger", action="store_true",
+                        help="Ignora le quote x-ratelimit-* e usa solo la pausa fissa")
     args = parser.parse_args()
-    if do_main(args.provider):
+    if do_main(args.provider, args.http2, args.stream, args.rank_by,
+               args.runs, args.warmup, args.workload, args.percentile,
+               args.trim, args.pause, not args.no_history,
+               args.context_scaling, args.max_ttft,
+               args.load_test, args.levels, args.duration, args.max_error_rate,
+               not args.no_ledger):
         sys.exit(0)
     else:
         sys.exit(1)
@@ -4,93 +4,82 @@ Script per ottenere i modelli OpenRouter filtrati (Free & Text) e salvarli in fi
 """
 
 import os
-import requests
-from pathlib import Path
+import argparse
+
+from http_cache import cached_get_json
+from catalog_writer import catalog_entry, catalog_exists, count_models, report, write_catalog
+from model_dedup import dedup_latest, split_colon_tag
 
 def filter_and_sort_models(models):
     """
     HIGHLIGHT: Filtri di selezione
     1. Solo modelli che supportano la generazione di testo.
     2. Solo modelli con piano di prezzo FREE.
-    3. Per modelli con lo stesso nome, mantiene il più aggiornato.
+    3. Per modelli con lo stesso nome, mantiene il più aggiornato
+       (tag dopo ':' confrontato con model_dedup.version_key).
     """
-    filtered = []
-    for model in models:
+    def is_selected(model):
         architecture = model.get("architecture", {})
         modality = architecture.get("modality", "")
         is_text = "text" in modality and modality.endswith("text")
-        
+
         pricing = model.get("pricing", {})
         is_free = float(pricing.get("prompt", 1)) == 0 and float(pricing.get("completion", 1)) == 0
-        
-        if is_text and is_free:
-            filtered.append(model)
-            
-    latest_models = {}
-    for m in filtered:
-        model_id = m.get("id")
-        name_parts = model_id.split("/")
-        provider = name_parts[0]
-        model_name = name_parts[1] if len(name_parts) > 1 else model_id
-        
-        parts = model_name.split(":")
-        base_name = f"{provider}/{parts[0]}"
-        version = parts[1] if len(parts) > 1 else "000"
-        
-        if base_name not in latest_models:
-            latest_models[base_name] = (version, m)
-        else:
-            current_version, _ = latest_models[base_name]
-            if version > current_version:
-                latest_models[base_name] = (version, m)
-                
-    return [item[1] for item in latest_models.values()]
+        return is_text and is_free
 
-def main():
+    filtered = (model for model in models if is_selected(model))
+    latest_models = dedup_latest(filtered, lambda m: split_colon_tag(m.get("id")))
+    return latest_models
+
+def refresh(force=False):
+    """
+    Scarica, filtra e salva il catalogo OpenRouter FREE.
+    Solleva un'eccezione in caso di errore.
+    Con force ignora la cache HTTP e riscrive i file anche se invariati.
+
+    Returns:
+        dict: count (modelli), changed (file riscritti), not_modified (risposta 304).
+    """
     api_key = os.getenv("OPENROUTER_API_KEY")
     if not api_key:
-        print("ERRORE: Imposta la variabile d'ambiente OPENROUTER_API_KEY")
-        return
+        raise RuntimeError("Imposta la variabile d'ambiente OPENROUTER_API_KEY")
     
     url = "https://openrouter.ai/api/v1/models"
     headers = {"Authorization": f"Bearer {api_key}"}
     
-    try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        all_models = response.json().get("data", [])
-        
-        filtered_models = filter_and_sort_models(all_models)
-        
-        Path("data").mkdir(exist_ok=True)
-        
-        # 1. Salva lista nomi
-        with open("data/models_openrouter.txt", "w") as f:
-            for m in sorted(filtered_models, key=lambda x: x.get("id")):
-                f.write(f"{m.get('id')}\n")
-        
-        # 2. Salva nomi e finestra (wnd)
-        with open("data/models_openrouter_wnd.txt", "w") as f:
-            for m in sorted(filtered_models, key=lambda x: x.get("id")):
-                limit = m.get("context_length", 0)
-                k_limit = f"{limit // 1024}k" if limit >= 1024 else f"{limit}"
-                f.write(f"{m.get('id')}|{k_limit}\n")
-                
-        # 3. Salva info dettagliate
-        with open("data/models_openrouter_info.txt", "w") as f:
-            f.write("MODELLI OPENROUTER (FREE) - INFORMAZIONI DETTAGLIATE\n")
-            f.write("=" * 50 + "\n\n")
-            for m in sorted(filtered_models, key=lambda x: x.get("id")):
-                f.write(f"ID: {m.get('id')}\n")
-                f.write(f"Nome: {m.get('name')}\n")
-                f.write(f"Context: {m.get('context_length')}\n")
-                f.write(f"Modality: {m.get('architecture', {}).get('modality')}\n")
-                f.write("-" * 30 + "\n")
+    # GET condizionale: con 304 il catalogo non è cambiato
+    data, not_modified = cached_get_json(url, headers=headers, force=force)
+    if not_modified and catalog_exists("openrouter"):
+        result = {"count": count_models("openrouter"), "changed": 0, "not_modified": True}
+        return result
+    all_models = data.get("data", [])
+    
+    filtered_models = filter_and_sort_models(all_models)
+
+    entries = []
+    for m in filtered_models:
+        info = [
+            ("Nome", m.get("name")),
+            ("Context", m.get("context_length")),
+            ("Modality", m.get("architecture", {}).get("modality")),
+        ]
+        entries.append(catalog_entry(m.get("id"), m.get("context_length", 0), info, m))
 
-        print(f"Completato! Salvati {len(filtered_models)} modelli OpenRouter FREE in data/")
-        
+    changed = write_catalog("openrouter", "MODELLI OPENROUTER (FREE)", entries, force=force)
+    result = {"count": len(filtered_models), "changed": changed, "not_modified": False}
+    return result
+
+def main(force=False):
+    try:
+        result = refresh(force)
     except Exception as e:
-        print(f"Errore: {e}")
+        print(f"ERRORE: {e}")
+        return
+    report("OpenRouter FREE", result)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Aggiorna il catalogo dei modelli OpenRouter.")
+    parser.add_argument("--force", action="store_true",
+                        help="Ignora la cache HTTP, riscarica il catalogo e riscrive i file")
+    args = parser.parse_args()
+    main(args.force)
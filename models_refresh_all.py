@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Refresh All - Aggiorna in parallelo i cataloghi di tutti i provider.
+
+Esegue in un solo processo la pipeline refresh() di ogni script
+models_<provider>.py (filtro + scrittura dei file in data/), ciascuna in un
+thread separato. Ogni provider ha il proprio timeout e gli errori restano
+isolati: un provider che fallisce non interrompe gli altri. Un provider
+oltre il timeout può continuare a scaricare, ma le sue scritture in data/
+vengono annullate: il suo catalogo resta quello precedente.
+Al termine stampa una tabella con esito, numero di modelli e durata.
+"""
+
+__date__ = "2026-10-16"
+__version__ = "1.0.0"
+__author__ = "Gemini CLI"
+
+import sys
+import time
+import argparse
+import importlib
+import threading
+
+from catalog_writer import WriteCancelled, cancel_writes
+
+
+# Provider -> modulo che espone refresh(force)
+PROVIDER_MODULES = {
+    "gemini": "models_gemini",
+    "groq": "models_groq",
+    "mistral": "models_mistral",
+    "cerebras": "models_cerebras",
+    "openrouter": "models_openrouter",
+    "huggingface": "models_huggingface",
+}
+
+DEFAULT_TIMEOUT = 120.0
+
+
+def run_provider(provider: str, force: bool, outcome: dict):
+    """
+    Importa il modulo del provider ed esegue refresh().
+    Anche l'import è isolato: un SDK mancante fallisce solo questo provider.
+    """
+    started = time.perf_counter()
+    try:
+        module = importlib.import_module(PROVIDER_MODULES[provider])
+        result = module.refresh(force)
+        outcome["status"] = "INVARIATO" if result.get("not_modified") else "OK"
+        outcome["count"] = result.get("count", 0)
+        outcome["changed"] = result.get("changed", 0)
+    except WriteCancelled:
+        # Oltre il timeout: l'esito TIMEOUT è già stato registrato
+        return
+    except Exception as e:
+        outcome["status"] = "ERRORE"
+        outcome["error"] = str(e)[:80]
+    outcome["duration"] = time.perf_counter() - started
+
+
+def parse_timeouts(specs: list) -> dict:
+    """Interpreta gli override provider=secondi."""
+    timeouts = {}
+    for spec in specs:
+        if "=" not in spec:
+            raise ValueError(f"Timeout non valido '{spec}': atteso provider=secondi")
+        provider, value = spec.split("=", 1)
+        provider = provider.strip().lower()
+        if provider not in PROVIDER_MODULES:
+            raise ValueError(f"Provider '{provider}' non riconosciuto")
+        timeouts[provider] = float(value)
+    return timeouts
+
+
+def print_summary(outcomes: dict, elapsed: float):
+    """Stampa la tabella riepilogativa."""
+    print()
+    print(f"{'PROVIDER':12} {'ESITO':10} {'MODELLI':>8} {'FILE':>5} {'DURATA':>9}  NOTE")
+    print("-" * 70)
+    for provider, outcome in outcomes.items():
+        count = outcome.get("count")
+        changed = outcome.get("changed")
+        count_str = str(count) if count is not None else "-"
+        changed_str = str(changed) if changed is not None else "-"
+        duration = outcome.get("duration")
+        duration_str = f"{duration:.2f}s" if duration is not None else "-"
+        note = outcome.get("error", "")
+        print(f"{provider:12} {outcome['status']:10} {count_str:>8} {changed_str:>5} {duration_str:>9}  {note}")
+    print("-" * 70)
+    print(f"Tempo totale: {elapsed:.2f}s")
+
+
+def do_main(providers: list, default_timeout: float, timeouts: dict, force: bool) -> bool:
+    """
+    Avvia tutti i refresh in parallelo e attende ciascuno fino al proprio timeout.
+
+    Returns:
+        bool: True se tutti i provider sono terminati senza errori.
+    """
+    if not providers:
+        print("Errore: nessun provider selezionato")
+        return False
+
+    started = time.perf_counter()
+    outcomes = {}
+    threads = {}
+    for provider in providers:
+        outcome = {"status": "IN CORSO"}
+        outcomes[provider] = outcome
+        # Thread daemon: un provider bloccato oltre il timeout non impedisce l'uscita
+        thread = threading.Thread(target=run_provider, args=(provider, force, outcome),
+                                  name=f"refresh-{provider}", daemon=True)
+        threads[provider] = thread
+        thread.start()
+
+    for provider, thread in threads.items():
+        timeout = timeouts.get(provider, default_timeout)
+        remaining = timeout - (time.perf_counter() - started)
+        thread.join(max(0.0, remaining))
+        if thread.is_alive():
+            # Il thread non si può interrompere: si impedisce almeno che scriva
+            cancel_writes(provider)
+            outcomes[provider]["status"] = "TIMEOUT"
+            outcomes[provider]["error"] = f"oltre {timeout:.0f}s"
+
+    elapsed = time.perf_counter() - started
+    print_summary(outcomes, elapsed)
+
+    success = all(o["status"] in ("OK", "INVARIATO") for o in outcomes.values())
+    return success
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Aggiorna in parallelo i cataloghi dei provider.")
+    parser.add_argument("providers", nargs="*",
+                        help=f"Provider da aggiornare (default: tutti). Disponibili: {', '.join(PROVIDER_MODULES)}")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help=f"Timeout di default per provider in secondi (default: {DEFAULT_TIMEOUT:.0f})")
+    parser.add_argument("--timeout-for", action="append", default=[],
+                        help="Timeout specifico, es. huggingface=60 (ripetibile)")
+    parser.add_argument("--force", action="store_true",
+                        help="Ignora la cache HTTP, riscarica i cataloghi e riscrive i file")
+    args = parser.parse_args()
+
+    selected = [p.lower() for p in args.providers] or list(PROVIDER_MODULES)
+    unknown = [p for p in selected if p not in PROVIDER_MODULES]
+    if unknown:
+        print(f"Provider non riconosciuti: {', '.join(unknown)}")
+        sys.exit(1)
+    try:
+        provider_timeouts = parse_timeouts(args.timeout_for)
+    except ValueError as e:
+        print(f"Errore: {e}")
+        sys.exit(1)
+
+    if do_main(selected, args.timeout, provider_timeouts, args.force):
+        sys.exit(0)
+    else:
+        sys.exit(1)
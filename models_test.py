@@ -2,14 +2,44 @@
 """
 Script models_test.py per testare i modelli di vari provider.
 Legge i modelli da data/<provider>.txt e salva quelli funzionanti in data/<provider>_ok.txt.
+
+Con --concurrent i provider vengono testati in parallelo: al posto della pausa
+fissa di 5 secondi ogni provider usa un token bucket configurabile
+(richieste al secondo/minuto e richieste contemporanee), vedi rate_limiter.py.
+
+Gli esiti sono salvati in data_ok/probe_cache.sqlite (vedi probe_cache.py):
+vengono ritestati solo i modelli nuovi o con esito scaduto, salvo --force.
+
+Le quote comunicate dai provider (x-ratelimit-*, Retry-After) sono registrate
+per chiave in data_ok/quota_ledger.sqlite (vedi quota_ledger.py): le richieste
+attendono solo quando la quota è esaurita e un 429 non segna il modello come
+FAILED, ma viene ritentato al ripristino della quota.
 """
 
 import os
-import requests
 import time
-import sys
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import http_transport
+from http_transport import OPENAI_COMPATIBLE_ENDPOINTS as ENDPOINTS
+from rate_limiter import FALLBACK_LIMIT, build_limiter, load_limits
+from probe_cache import DEFAULT_RETRY_BASE, DEFAULT_RETRY_MAX, DEFAULT_TTL, ProbeCache
+from quota_ledger import QuotaExhausted, QuotaLedger
+
+
+# Pausa tra richieste reali dello stesso provider in modalità sequenziale,
+# usata solo finché il provider non ha comunicato le proprie quote
+SEQUENTIAL_PAUSE = 5.0
+
+# Nuovi tentativi dopo un 429, ciascuno al ripristino della quota
+RATE_LIMIT_RETRIES = 2
+
+# Token di una sonda per le quote: prompt "hi" e al massimo 5 token di output
+PROBE_TOKENS = 6
+
 
 def get_wnd_map(provider):
     """Legge il file _wnd.txt per ottenere la mappatura id|wnd."""
@@ -27,8 +57,9 @@ def get_wnd_map(provider):
 
 
 def test_gemini(model_id, api_key):
+    """Restituisce la risposta (None se la richiesta non è partita)."""
     # Prova diverse varianti di URL per Gemini
-    base_url = "https://generativelanguage.googleapis.com/v1beta"
+    base_url = http_transport.GEMINI_BASE_URL
 
     # Assicurati che l'ID sia nel formato corretto per l'URL
     if not model_id.startswith("models/"):
@@ -39,18 +70,19 @@ def test_gemini(model_id, api_key):
     url = f"{base_url}/{model_id_for_url}:generateContent?key={api_key}"
     payload = {"contents": [{"parts": [{"text": "hi"}]}]}
     try:
-        response = requests.post(url, json=payload, timeout=10)
-        if response.status_code == 200:
-            return True
+        response = http_transport.post(url, json=payload, timeout=10)
+        if response.status_code in (200, 429):
+            return response
         # Fallback a v1
         url_v1 = url.replace("/v1beta/", "/v1/")
-        response = requests.post(url_v1, json=payload, timeout=10)
-        return response.status_code == 200
+        response = http_transport.post(url_v1, json=payload, timeout=10)
+        return response
     except:
-        return False
+        return None
 
 
 def test_openai_compatible(url, model_id, api_key):
+    """Restituisce la risposta (None se la richiesta non è partita)."""
     headers = {"Authorization": f"Bearer {api_key}",
                "Content-Type": "application/json"}
     payload = {
@@ -59,14 +91,244 @@ def test_openai_compatible(url, model_id, api_key):
         "max_tokens": 5
     }
     try:
-        response = requests.post(url, headers=headers,
+        response = http_transport.post(url, headers=headers,
                                  json=payload, timeout=10)
-        return response.status_code == 200
+        return response
+    except:
+        return None
+
+
+def get_api_key(provider):
+    """Legge la chiave API del provider dalle variabili d'ambiente."""
+    env_var = f"{provider.upper()}_API_KEY"
+    api_key = os.getenv(env_var)
+    if provider == "openrouter" and not api_key:
+        api_key = os.getenv("OPENROUTER_API_KEY") or os.getenv(
+            "OPENAI_API_KEY")
+    if provider == "huggingface" and not api_key:
+        api_key = os.getenv("HF_TOKEN")
+    return api_key
+
+
+def load_models(provider):
+    """Legge la lista dei modelli da data/models_<provider>.txt."""
+    model_file = Path("data") / f"models_{provider}.txt"
+    if not model_file.exists():
+        return None
+    try:
+        with open(model_file, "r") as f:
+            models = [line.strip() for line in f if line.strip()]
     except:
-        return False
+        print(f"  Errore nella lettura di {model_file}")
+        return None
+    return models
+
+
+def send_probe(provider, model_id, api_key):
+    """Esegue una singola richiesta di test e restituisce la risposta (o None)."""
+    response = None
+    if provider == "gemini":
+        response = test_gemini(model_id, api_key)
+    elif provider in ENDPOINTS:
+        response = test_openai_compatible(
+            ENDPOINTS[provider], model_id, api_key)
+    elif provider == "huggingface":
+        url = f"{http_transport.HF_INFERENCE_URL}/{model_id}"
+        headers = {"Authorization": f"Bearer {api_key}"}
+        try:
+            response = http_transport.post(url, headers=headers, json={
+                                "inputs": "hi"}, timeout=10)
+        except:
+            response = None
+    return response
+
+
+def probe_model(provider, model_id, api_key, ledger=None):
+    """
+    Testa un modello e restituisce l'esito.
+    Con il registro delle quote attende la quota disponibile prima di ogni
+    richiesta e ritenta dopo un 429; se la quota non torna in tempo
+    restituisce None (esito sconosciuto, da non memorizzare).
+    """
+    for _ in range(RATE_LIMIT_RETRIES + 1):
+        if ledger is not None:
+            try:
+                ledger.wait(provider, api_key, PROBE_TOKENS)
+            except QuotaExhausted:
+                return None
+        response = send_probe(provider, model_id, api_key)
+        if response is None:
+            return False
+        if ledger is None:
+            return response.status_code == 200
+        if not ledger.observe(provider, api_key, response.headers, response.status_code):
+            return response.status_code == 200
+    return None
+
+
+def format_status(success):
+    """Etichetta dell'esito di un test."""
+    if success is None:
+        return "RATE LIMITED"
+    status = "OK" if success else "FAILED"
+    return status
+
+
+def save_ok_models(provider, ok_models):
+    """Salva i modelli funzionanti in data_ok/<provider>_wnd.txt."""
+    if ok_models:
+        output_dir = Path("data_ok")
+        output_dir.mkdir(parents=True, exist_ok=True)
+        output_file = output_dir / f"{provider}_wnd.txt"
+        with open(output_file, "w") as f:
+            for line in ok_models:
+                f.write(f"{line}\n")
+        print(
+            f"  Completato! Salvati {len(ok_models)} modelli in {output_file}")
+    else:
+        print(f"  Nessun modello funzionante trovato per {provider}.")
+
+
+def prepare_provider(provider):
+    """
+    Prepara il test di un provider.
+    Restituisce (api_key, models) oppure None se il provider va saltato.
+    """
+    models = load_models(provider)
+    if models is None:
+        return None
+
+    api_key = get_api_key(provider)
+    if not api_key:
+        env_var = f"{provider.upper()}_API_KEY"
+        print(f"  Skipping {provider}: API key ({env_var}) not found.")
+        return None
+
+    result = (api_key, models)
+    return result
+
+
+def cached_result(cache, provider, model_id, force):
+    """Esito in cache ancora valido, oppure None se il modello va testato."""
+    if cache is None or force:
+        return None
+    cached = cache.lookup(provider, model_id)
+    return cached
+
+
+def record_result(cache, provider, model_id, success):
+    """Registra l'esito di un test reale nella cache (se attiva e se l'esito è noto)."""
+    if cache is not None and success is not None:
+        cache.record(provider, model_id, success)
+
+
+def run_sequential(providers, cache=None, force=False, ledger=None):
+    """
+    Testa i modelli uno alla volta con pausa fissa tra le richieste,
+    sostituita dal registro delle quote appena il provider le comunica.
+    I modelli con esito in cache ancora valido non vengono ritestati.
+    """
+    for provider in sorted(providers):
+        prepared = prepare_provider(provider)
+        if prepared is None:
+            continue
+        api_key, models = prepared
+
+        print(f"Testing provider: {provider}")
+        wnd_map = get_wnd_map(provider)
+        ok_models = []
 
+        for model_id in models:
+            print(f" Testing {model_id}... ", end="", flush=True)
+            cached = cached_result(cache, provider, model_id, force)
+            if cached is None:
+                success = probe_model(provider, model_id, api_key, ledger)
+                record_result(cache, provider, model_id, success)
+                suffix = ""
+            else:
+                success = cached
+                suffix = " (cache)"
 
-def main():
+            print(f"{format_status(success)}{suffix}")
+            if success:
+                wnd = wnd_map.get(model_id, "N/A")
+                ok_models.append(f"{model_id}|{wnd}")
+
+            # Pausa tra richieste reali dello stesso provider, se le quote non sono note
+            if cached is None and (ledger is None or not ledger.knows(provider, api_key)):
+                time.sleep(SEQUENTIAL_PAUSE)
+
+        save_ok_models(provider, ok_models)
+
+
+async def probe_provider_async(provider, api_key, models, limiter, cache=None, force=False,
+                               ledger=None):
+    """
+    Testa tutti i modelli di un provider rispettando il suo limitatore.
+    L'ordine dei risultati segue l'ordine del file dei modelli.
+    """
+    async def probe_one(model_id):
+        # La cache viene letta e scritta solo dal thread del loop
+        cached = cached_result(cache, provider, model_id, force)
+        if cached is None:
+            async with limiter:
+                success = await asyncio.to_thread(
+                    probe_model, provider, model_id, api_key, ledger)
+            record_result(cache, provider, model_id, success)
+            suffix = ""
+        else:
+            success = cached
+            suffix = " (cache)"
+        print(f" [{provider}] {model_id}... {format_status(success)}{suffix}", flush=True)
+        return success
+
+    results = await asyncio.gather(*(probe_one(m) for m in models))
+
+    wnd_map = get_wnd_map(provider)
+    ok_models = []
+    for model_id, success in zip(models, results):
+        if success:
+            wnd = wnd_map.get(model_id, "N/A")
+            ok_models.append(f"{model_id}|{wnd}")
+    return ok_models
+
+
+async def run_concurrent_async(providers, limits, cache=None, force=False, ledger=None):
+    """Testa tutti i provider in parallelo, ognuno col proprio limitatore."""
+    jobs = []
+    for provider in sorted(providers):
+        prepared = prepare_provider(provider)
+        if prepared is None:
+            continue
+        api_key, models = prepared
+        limiter = build_limiter(provider, limits)
+        jobs.append((provider, api_key, models, limiter))
+
+    if not jobs:
+        return
+
+    # Un thread per ogni richiesta in volo ammessa dai limiti
+    max_workers = 0
+    for provider, _, _, _ in jobs:
+        values = limits.get(provider, FALLBACK_LIMIT)
+        max_workers += int(values.get("max_in_flight", 1))
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=max(1, max_workers)))
+
+    for provider, _, models, _ in jobs:
+        print(f"Testing provider: {provider} ({len(models)} modelli)")
+
+    results = await asyncio.gather(
+        *(probe_provider_async(p, k, m, lim, cache, force, ledger) for p, k, m, lim in jobs))
+
+    for (provider, _, _, _), ok_models in zip(jobs, results):
+        print(f"Risultati provider: {provider}")
+        save_ok_models(provider, ok_models)
+
+
+def main(target_provider=None, concurrent=False, limits_file=None, limit_overrides=None,
+         http2=False, use_cache=True, force=False, ttl_hours=None, retry_hours=None,
+         use_ledger=True):
     data_path = Path("data")
     if not data_path.exists():
         print("Cartella data non trovata.")
@@ -77,9 +339,8 @@ def main():
     all_providers = ["gemini", "groq", "mistral",
                      "cerebras", "openrouter", "huggingface"]
 
-    target_provider = sys.argv[1].lower() if len(sys.argv) > 1 else None
-
     if target_provider:
+        target_provider = target_provider.lower()
         if target_provider not in all_providers:
             print(
                 f"Provider '{target_provider}' non riconosciuto. Disponibili: {', '.join(all_providers)}")
@@ -88,85 +349,65 @@ def main():
     else:
         providers = all_providers
 
-    endpoints = {
-        "groq": "https://api.groq.com/openai/v1/chat/completions",
-        "mistral": "https://api.mistral.ai/v1/chat/completions",
-        "cerebras": "https://api.cerebras.ai/v1/chat/completions",
-        "openrouter": "https://openrouter.ai/api/v1/chat/completions",
-    }
-
-    for provider in sorted(providers):
-        model_file = data_path / f"models_{provider}.txt"
-        if not model_file.exists():
-            continue
-
-        print(f"Testing provider: {provider}")
-
-        env_var = f"{provider.upper()}_API_KEY"
-        api_key = os.getenv(env_var)
-        if provider == "openrouter" and not api_key:
-            api_key = os.getenv("OPENROUTER_API_KEY") or os.getenv(
-                "OPENAI_API_KEY")
-        if provider == "huggingface" and not api_key:
-            api_key = os.getenv("HF_TOKEN")
-
-        if not api_key:
-            print(f"  Skipping {provider}: API key ({env_var}) not found.")
-            continue
+    # Connessioni aperte in anticipo e riutilizzate da tutte le richieste
+    if http2:
+        http_transport.enable_http2(True)
+    http_transport.preconnect(http_transport.provider_hosts(providers))
 
+    cache = None
+    if use_cache:
+        ttl = DEFAULT_TTL if ttl_hours is None else ttl_hours * 3600.0
+        retry_base = DEFAULT_RETRY_BASE if retry_hours is None else retry_hours * 3600.0
         try:
-            with open(model_file, "r") as f:
-                models = [line.strip() for line in f if line.strip()]
-        except:
-            print(f"  Errore nella lettura di {model_file}")
-            continue
+            cache = ProbeCache(ttl=ttl, retry_base=retry_base,
+                               retry_max=max(DEFAULT_RETRY_MAX, retry_base))
+        except ValueError as e:
+            print(f"Errore nella cache dei test: {e}")
+            return
 
-        wnd_map = get_wnd_map(provider)
-        ok_models = []
+    ledger = QuotaLedger() if use_ledger else None
 
-        for model_id in models:
-            print(f" Testing {model_id}... ", end="", flush=True)
-            success = False
-
-            if provider == "gemini":
-                success = test_gemini(model_id, api_key)
-            elif provider in endpoints:
-                success = test_openai_compatible(
-                    endpoints[provider], model_id, api_key)
-            elif provider == "huggingface":
-                url = f"https://api-inference.huggingface.co/models/{model_id}"
-                headers = {"Authorization": f"Bearer {api_key}"}
-                try:
-                    res = requests.post(url, headers=headers, json={
-                                        "inputs": "hi"}, timeout=10)
-                    success = (res.status_code == 200)
-                except:
-                    success = False
-            else:
-                success = False
+    try:
+        if not concurrent:
+            run_sequential(providers, cache, force, ledger)
+            return
 
-            if success:
-                print("OK")
-                wnd = wnd_map.get(model_id, "N/A")
-                ok_models.append(f"{model_id}|{wnd}")
-            else:
-                print("FAILED")
-
-            # Delay di 5 secondi tra richieste dello stesso provider
-            time.sleep(5.0)
-
-        if ok_models:
-            output_dir = Path("data_ok")
-            output_dir.mkdir(parents=True, exist_ok=True)
-            output_file = output_dir / f"{provider}_wnd.txt"
-            with open(output_file, "w") as f:
-                for line in ok_models:
-                    f.write(f"{line}\n")
-            print(
-                f"  Completato! Salvati {len(ok_models)} modelli in {output_file}")
-        else:
-            print(f"  Nessun modello funzionante trovato per {provider}.")
+        try:
+            limits = load_limits(limits_file, limit_overrides)
+        except (OSError, ValueError) as e:
+            print(f"Errore nei limiti: {e}")
+            return
+        asyncio.run(run_concurrent_async(providers, limits, cache, force, ledger))
+    finally:
+        if cache is not None:
+            cache.close()
+        if ledger is not None:
+            ledger.close()
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(
+        description="Testa la disponibilità dei modelli dei provider.")
+    parser.add_argument("provider", nargs="?", default=None,
+                        help="Provider da testare (default: tutti)")
+    parser.add_argument("--concurrent", action="store_true",
+                        help="Testa i provider in parallelo con rate limit per provider")
+    parser.add_argument("--limits", default=None,
+                        help="File JSON con i limiti per provider (rps, rpm, max_in_flight)")
+    parser.add_argument("--limit", action="append", default=[],
+                        help="Override dei limiti, es. groq:rps=1,rpm=30,inflight=2 (ripetibile)")
+    parser.add_argument("--http2", action="store_true",
+                        help="Usa HTTP/2 se httpx[http2] è installato")
+    parser.add_argument("--force", action="store_true",
+                        help="Ritesta tutti i modelli ignorando gli esiti in cache")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Non leggere né scrivere la cache degli esiti")
+    parser.add_argument("--ttl", type=float, default=None,
+                        help="Validità in ore di un esito positivo (default: 6)")
+    parser.add_argument("--retry", type=float, default=None,
+                        help="Attesa base in ore prima di ritestare un modello fallito, raddoppiata a ogni fallimento (default: 1)")
+    parser.add_argument("--no-ledger", action="store_true",
+                        help="Ignora le quote x-ratelimit-* e usa solo pause e limiti fissi")
+    args = parser.parse_args()
+    main(args.provider, args.concurrent, args.limits, args.limit, args.http2,
+         not args.no_cache, args.force, args.ttl, args.retry, not args.no_ledger)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Probe Cache - Archivio persistente degli esiti dei test dei modelli.
+
+Salva in SQLite (data_ok/probe_cache.sqlite) l'ultimo esito di ogni modello.
+Un esito positivo resta valido per un TTL configurabile; un esito negativo
+viene ritestato con backoff esponenziale (base, 2*base, 4*base, ... fino al
+massimo), così i modelli che rispondono 404 da settimane non consumano
+richieste a ogni esecuzione.
+"""
+
+__date__ = "2026-10-16"
+__version__ = "1.0.0"
+__author__ = "Gemini CLI"
+
+import time
+import sqlite3
+from pathlib import Path
+
+
+DEFAULT_DB = Path("data_ok") / "probe_cache.sqlite"
+DEFAULT_TTL = 6 * 3600.0
+DEFAULT_RETRY_BASE = 3600.0
+DEFAULT_RETRY_MAX = 7 * 24 * 3600.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS probes (
+    provider   TEXT NOT NULL,
+    model      TEXT NOT NULL,
+    ok         INTEGER NOT NULL,
+    checked_at REAL NOT NULL,
+    failures   INTEGER NOT NULL DEFAULT 0,
+    next_check REAL NOT NULL,
+    PRIMARY KEY (provider, model)
+)
+"""
+
+
+class ProbeCache:
+    """Cache degli esiti con TTL positivo e backoff esponenziale sui fallimenti."""
+
+    def __init__(self, db_path=DEFAULT_DB, ttl: float = DEFAULT_TTL,
+                 retry_base: float = DEFAULT_RETRY_BASE,
+                 retry_max: float = DEFAULT_RETRY_MAX):
+        if ttl < 0 or retry_base < 0 or retry_max < retry_base:
+            raise ValueError("TTL e backoff devono essere positivi e retry_max >= retry_base")
+        self.ttl = ttl
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        db_path = Path(db_path)
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute(SCHEMA)
+        self.conn.commit()
+
+    def lookup(self, provider: str, model: str, now: float = None):
+        """
+        Restituisce l'esito in cache se ancora valido, altrimenti None
+        (modello sconosciuto o scaduto: va ritestato).
+        """
+        if now is None:
+            now = time.time()
+        row = self.conn.execute(
+            "SELECT ok, next_check FROM probes WHERE provider = ? AND model = ?",
+            (provider, model)).fetchone()
+        if row is None:
+            return None
+        ok, next_check = row
+        if now >= next_check:
+            return None
+        cached = bool(ok)
+        return cached
+
+    def retry_delay(self, failures: int) -> float:
+        """Attesa prima del prossimo test dopo failures fallimenti consecutivi."""
+        if failures <= 0:
+            return self.ttl
+        delay = min(self.retry_max, self.retry_base * (2 ** (failures - 1)))
+        return delay
+
+    def record(self, provider: str, model: str, ok: bool, now: float = None):
+        """Registra l'esito di un test reale."""
+        if now is None:
+            now = time.time()
+        row = self.conn.execute(
+            "SELECT failures FROM probes WHERE provider = ? AND model = ?",
+            (provider, model)).fetchone()
+        if ok:
+            failures = 0
+        else:
+            failures = (row[0] if row else 0) + 1
+        next_check = now + self.retry_delay(failures)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO probes (provider, model, ok, checked_at, failures, next_check) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (provider, model, int(ok), now, failures, next_check))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
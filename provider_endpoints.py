@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Provider Endpoints - Endpoint chat dei provider.
+
+Tabella degli endpoint usati da probe, benchmark (via http_transport) e
+dall'API async di LlmProvider (async_client.py). Non dipende da librerie
+HTTP, così chi parla solo httpx non deve installare requests.
+Con la variabile d'ambiente LLM_ENDPOINT_BASE_URL tutti gli endpoint
+puntano a un server locale (es. mock_provider.py).
+"""
+
+__date__ = "2026-10-16"
+__version__ = "1.0.0"
+__author__ = "Gemini CLI"
+
+import os
+
+
+OPENAI_COMPATIBLE_ENDPOINTS = {
+    "groq": "https://api.groq.com/openai/v1/chat/completions",
+    "mistral": "https://api.mistral.ai/v1/chat/completions",
+    "cerebras": "https://api.cerebras.ai/v1/chat/completions",
+    "openrouter": "https://openrouter.ai/api/v1/chat/completions",
+}
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+HF_INFERENCE_URL = "https://api-inference.huggingface.co/models"
+
+# Provider con un endpoint proprio oltre a quelli OpenAI-compatibili
+NATIVE_PROVIDERS = ("gemini", "huggingface")
+
+# Dimensione del pool di connessioni per host
+POOL_SIZE = int(os.getenv("LLM_HTTP_POOL_SIZE", "16"))
+
+
+def has_chat_endpoint(provider: str) -> bool:
+    """True se il provider ha un endpoint chat in questa tabella."""
+    known = provider in NATIVE_PROVIDERS or provider in OPENAI_COMPATIBLE_ENDPOINTS
+    return known
+
+
+def redirect_endpoints(base_url: str):
+    """
+    Punta gli endpoint di tutti i provider verso base_url, ad esempio il
+    server locale di mock_provider.py. Il dizionario degli endpoint viene
+    aggiornato sul posto, così lo vede anche chi lo ha già importato.
+    """
+    global GEMINI_BASE_URL, HF_INFERENCE_URL
+    base = base_url.rstrip("/")
+    for provider in OPENAI_COMPATIBLE_ENDPOINTS:
+        OPENAI_COMPATIBLE_ENDPOINTS[provider] = f"{base}/{provider}/v1/chat/completions"
+    GEMINI_BASE_URL = f"{base}/v1beta"
+    HF_INFERENCE_URL = f"{base}/models"
+
+
+if os.getenv("LLM_ENDPOINT_BASE_URL"):
+    redirect_endpoints(os.environ["LLM_ENDPOINT_BASE_URL"])
@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Quota Ledger - Registro delle quote dei provider per chiave API.
+
+Legge dalle risposte gli header x-ratelimit-* (limit, remaining, reset per
+richieste e token, anche con suffisso -minute/-day come Cerebras) e
+Retry-After, e tiene per ogni coppia provider + chiave le quote rimaste e
+l'istante di ripristino. Prima di ogni chiamata wait() prenota una richiesta
+e attende solo se la quota è esaurita, fino al reset indicato dal provider:
+niente pause fisse e niente 429 sprecati.
+Lo stato è salvato in data_ok/quota_ledger.sqlite (le chiavi sono
+memorizzate solo come impronta SHA-256), così anche le esecuzioni successive
+rispettano le quote già consumate.
+Usato da models_test.py, models_ok.py e dai client di LlmProvider.
+Da riga di comando mostra lo stato del registro.
+"""
+
+__date__ = "2026-10-16"
+__version__ = "1.0.0"
+__author__ = "Gemini CLI"
+
+import re
+import sys
+import json
+import time
+import argparse
+import threading
+from pathlib import Path
+
+# hashlib, sqlite3 ed email.utils sono importati al primo uso: questo modulo
+# è caricato da llm_provider e non deve rallentarne l'import
+
+
+DEFAULT_DB = Path("data_ok") / "quota_ledger.sqlite"
+
+# Attesa dopo un 429 senza Retry-After né reset utilizzabili
+DEFAULT_BACKOFF = 5.0
+
+# Oltre questa attesa (es. quota giornaliera esaurita) wait() rinuncia
+MAX_WAIT = 120.0
+
+# Intervallo minimo tra due salvataggi su disco
+SAVE_INTERVAL = 1.0
+
+# Stima grossolana usata anche dai provider per i limiti: 4 caratteri per token
+CHARS_PER_TOKEN = 4
+
+HEADER_RE = re.compile(
+    r"^x-ratelimit-(limit|remaining|reset)(?:-(requests?|req|tokens?))?(?:-(second|minute|hour|day))?$")
+DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quotas (
+    provider      TEXT NOT NULL,
+    key_id        TEXT NOT NULL,
+    buckets       TEXT NOT NULL,
+    blocked_until REAL NOT NULL,
+    updated_at    REAL NOT NULL,
+    PRIMARY KEY (provider, key_id)
+)
+"""
+
+
+class QuotaExhausted(RuntimeError):
+    """La quota torna disponibile oltre l'attesa massima consentita."""
+
+    def __init__(self, provider: str, retry_at: float):
+        self.provider = provider
+        self.retry_at = retry_at
+        wait = max(0.0, retry_at - time.time())
+        super().__init__(f"Quota {provider} esaurita, disponibile tra {wait:.0f}s")
+
+
+def key_id(api_key: str) -> str:
+    """Impronta della chiave: la chiave stessa non viene mai salvata."""
+    import hashlib
+
+    digest = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+    return digest
+
+
+def estimate_tokens(text: str, max_tokens: int = 0) -> int:
+    """Token di una richiesta: prompt stimato dalla lunghezza più l'output massimo."""
+    tokens = max(1, len(text or "") // CHARS_PER_TOKEN) + (max_tokens or 0)
+    return tokens
+
+
+def parse_reset(value: str, now: float) -> float:
+    """
+    Istante assoluto di reset da '1m30.5s', '500ms', '7.66s', secondi
+    relativi o epoch (in secondi o millisecondi, come OpenRouter).
+    """
+    text = str(value).strip().lower()
+    parts = DURATION_RE.findall(text)
+    if parts and "".join(n + u for n, u in parts) == text:
+        seconds = sum(float(n) * DURATION_UNITS[u] for n, u in parts)
+        return now + seconds
+    number = float(text)
+    if number > 1e12:
+        return number / 1000.0
+    if number > 1e9:
+        return number
+    reset = now + number
+    return reset
+
+
+def parse_retry_after(value: str, now: float) -> float:
+    """Istante assoluto da Retry-After (secondi o data HTTP)."""
+    text = str(value).strip()
+    try:
+        retry_at = now + float(text)
+    except ValueError:
+        from email.utils import parsedate_to_datetime
+        retry_at = parsedate_to_datetime(text).timestamp()
+    return retry_at
+
+
+def parse_rate_headers(headers, now: float = None) -> dict:
+    """
+    Estrae le quote dagli header di una risposta.
+
+    Returns:
+        dict: buckets {"requests-minute": {limit, remaining, reset}, ...}
+              e retry_at (istante assoluto o None).
+    """
+    if now is None:
+        now = time.time()
+    buckets = {}
+    retry_at = None
+    for name, value in (headers or {}).items():
+        lname = name.lower()
+        try:
+            if lname == "retry-after":
+                retry_at = parse_retry_after(value, now)
+                continue
+            match = HEADER_RE.match(lname)
+            if not match:
+                continue
+            field, kind, period = match.groups()
+            kind = "tokens" if kind and kind.startswith("token") else "requests"
+            bucket = buckets.setdefault(f"{kind}-{period}" if period else kind, {})
+            if field == "reset":
+                bucket["reset"] = parse_reset(value, now)
+            else:
+                bucket[field] = float(value)
+        except (TypeError, ValueError):
+            # Header malformato: si ignora, le altre quote restano valide
+            continue
+    parsed = {"buckets": buckets, "retry_at": retry_at}
+    return parsed
+
+
+def error_response(error) -> tuple:
+    """
+    Header e codice HTTP di un'eccezione degli SDK (openai, groq, httpx,
+    requests espongono .response; altri SDK .raw_response o .status_code).
+
+    Returns:
+        tuple: (header o None, codice o None).
+    """
+    # Una Response di requests con codice di errore è falsa: niente "or"
+    response = getattr(error, "response", None)
+    if response is None:
+        response = getattr(error, "raw_response", None)
+    headers = getattr(response, "headers", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    result = (headers, status)
+    return result
+
+
+def is_rate_limited(error) -> bool:
+    """True per un 429 o una quota esaurita: un limite del provider, non un guasto."""
+    if isinstance(error, QuotaExhausted):
+        return True
+    _, status = error_response(error)
+    limited = status == 429
+    return limited
+
+
+class QuotaLedger:
+    """
+    Quote per provider e chiave, condivise tra thread.
+    Con db_path=None lo stato resta solo in memoria.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB, max_wait: float = MAX_WAIT):
+        self.max_wait = max_wait
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.dirty = set()
+        self.saved_at = 0.0
+        self.conn = None
+        if db_path is not None:
+            import sqlite3
+
+            db_path = Path(db_path)
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(db_path, check_same_thread=False)
+            self.conn.execute(SCHEMA)
+            self.conn.commit()
+            self._load()
+
+    def _load(self):
+        rows = self.conn.execute(
+            "SELECT provider, key_id, buckets, blocked_until, updated_at FROM quotas").fetchall()
+        for provider, kid, buckets, blocked_until, updated_at in rows:
+            self.entries[(provider, kid)] = {
+                "buckets": json.loads(buckets),
+                "blocked_until": blocked_until,
+                "updated_at": updated_at,
+            }
+
+    def _entry(self, provider: str, api_key: str) -> dict:
+        entry = self.entries.setdefault(
+            (provider, key_id(api_key)), {"buckets": {}, "blocked_until": 0.0, "updated_at": 0.0})
+        return entry
+
+    def observe(self, provider: str, api_key: str, headers, status: int = None,
+                now: float = None) -> bool:
+        """
+        Aggiorna le quote con gli header di una risposta.
+
+        Returns:
+            bool: True se la risposta era un 429.
+        """
+        if now is None:
+            now = time.time()
+        parsed = parse_rate_headers(headers, now)
+        limited = status == 429
+        with self.lock:
+            entry = self._entry(provider, api_key)
+            for name, values in parsed["buckets"].items():
+                entry["buckets"].setdefault(name, {}).update(values)
+            if parsed["retry_at"] is not None:
+                entry["blocked_until"] = max(entry["blocked_until"], parsed["retry_at"])
+            elif limited:
+                # Senza Retry-After si attende il reset delle quote esaurite
+                resets = [b["reset"] for b in entry["buckets"].values()
+                          if b.get("remaining", 1) <= 0 and b.get("reset", 0) > now]
+                entry["blocked_until"] = max(
+                    entry["blocked_until"], max(resets) if resets else now + DEFAULT_BACKOFF)
+            if parsed["buckets"] or limited or parsed["retry_at"] is not None:
+                entry["updated_at"] = now
+                self.dirty.add((provider, key_id(api_key)))
+        self._maybe_save(now)
+        return limited
+
+    @staticmethod
+    def _delay(entry: dict, tokens: int, now: float) -> float:
+        wait_until = entry["blocked_until"]
+        for name, bucket in entry["buckets"].items():
+            reset = bucket.get("reset")
+            if reset is None or reset <= now:
+                continue
+            remaining = bucket.get("remaining")
+            if remaining is None:
+                continue
+            # Quota a zero: esaurita anche se il chiamante non stima i token
+            need = tokens if name.startswith("tokens") else 1
+            if remaining <= 0 or remaining < need:
+                wait_until = max(wait_until, reset)
+        delay = max(0.0, wait_until - now)
+        return delay
+
+    def delay(self, provider: str, api_key: str, tokens: int = 0, now: float = None) -> float:
+        """Secondi da attendere prima della prossima chiamata (senza prenotarla)."""
+        if now is None:
+            now = time.time()
+        with self.lock:
+            entry = self.entries.get((provider, key_id(api_key)))
+            delay = self._delay(entry, tokens, now) if entry else 0.0
+        return delay
+
+    def reserve(self, provider: str, api_key: str, tokens: int = 0, now: float = None) -> float:
+        """
+        Prenota una chiamata se la quota lo consente.
+
+        Returns:
+            float: 0 se prenotata, altrimenti i secondi da attendere.
+        """
+        if now is None:
+            now = time.time()
+        with self.lock:
+            entry = self.entries.get((provider, key_id(api_key)))
+            if entry is None:
+                return 0.0
+            delay = self._delay(entry, tokens, now)
+            if delay > 0:
+                return delay
+            for name, bucket in entry["buckets"].items():
+                if bucket.get("reset") is not None and bucket["reset"] <= now:
+                    # Finestra scaduta: la quota è di nuovo piena fino ai prossimi header
+                    if "limit" in bucket:
+                        bucket["remaining"] = bucket["limit"]
+                    bucket["reset"] = None
+                need = tokens if name.startswith("tokens") else 1
+                if "remaining" in bucket:
+                    bucket["remaining"] -= need
+        return 0.0
+
+    def _check_wait(self, provider: str, delay: float, waited: float):
+        if waited + delay > self.max_wait:
+            raise QuotaExhausted(provider, time.time() + delay)
+
+    def wait(self, provider: str, api_key: str, tokens: int = 0) -> float:
+        """
+        Attende finché la quota è disponibile e prenota la chiamata.
+
+        Returns:
+            float: Secondi attesi.
+        Raises:
+            QuotaExhausted: se servirebbe attendere più di max_wait.
+        """
+        waited = 0.0
+        while True:
+            delay = self.reserve(provider, api_key, tokens)
+            if delay <= 0:
+                return waited
+            self._check_wait(provider, delay, waited)
+            time.sleep(delay)
+            waited += delay
+
+    def knows(self, provider: str, api_key: str) -> bool:
+        """True se il provider ha già comunicato le quote di questa chiave."""
+        with self.lock:
+            entry = self.entries.get((provider, key_id(api_key)))
+            known = bool(entry and entry["buckets"])
+        return known
+
+    def snapshot(self) -> list:
+        """Copia dello stato: (provider, impronta della chiave, stato)."""
+        with self.lock:
+            rows = [(provider, kid, json.loads(json.dumps(entry)))
+                    for (provider, kid), entry in sorted(self.entries.items())]
+        return rows
+
+    def _maybe_save(self, now: float):
+        if self.conn is not None and now - self.saved_at >= SAVE_INTERVAL:
+            self.save()
+
+    def save(self):
+        """Scrive su disco le voci modificate."""
+        if self.conn is None:
+            return
+        with self.lock:
+            rows = [(provider, kid, json.dumps(self.entries[(provider, kid)]["buckets"]),
+                     self.entries[(provider, kid)]["blocked_until"],
+                     self.entries[(provider, kid)]["updated_at"])
+                    for provider, kid in self.dirty]
+            self.dirty.clear()
+            self.saved_at = time.time()
+            if rows:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO quotas (provider, key_id, buckets, blocked_until, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?)", rows)
+                self.conn.commit()
+
+    def clear(self):
+        """Dimentica tutte le quote registrate."""
+        with self.lock:
+            self.entries.clear()
+            self.dirty.clear()
+            if self.conn is not None:
+                self.conn.execute("DELETE FROM quotas")
+                self.conn.commit()
+
+    def close(self):
+        if self.conn is not None:
+            self.save()
+            self.conn.close()
+            self.conn = None
+
+
+def format_entry(entry: dict, now: float) -> str:
+    """Riga leggibile con le quote di una chiave."""
+    parts = []
+    for name, bucket in sorted(entry["buckets"].items()):
+        remaining = bucket.get("remaining")
+        limit = bucket.get("limit")
+        text = f"{name}={'?' if remaining is None else f'{remaining:g}'}/{'?' if limit is None else f'{limit:g}'}"
+        reset = bucket.get("reset")
+        if reset is not None and reset > now:
+            text += f" (reset {reset - now:.0f}s)"
+        parts.append(text)
+    if entry["blocked_until"] > now:
+        parts.append(f"BLOCCATA per {entry['blocked_until'] - now:.0f}s")
+    text = ", ".join(parts) or "nessuna quota nota"
+    return text
+
+
+def do_main(db_path: str, provider: str = None, clear: bool = False) -> bool:
+    """Mostra (o azzera) il registro delle quote."""
+    path = Path(db_path)
+    if not path.exists():
+        print(f"Registro {path} non trovato.")
+        return False
+    ledger = QuotaLedger(path)
+    try:
+        if clear:
+            ledger.clear()
+            print(f"Registro {path} azzerato.")
+            return True
+        now = time.time()
+        rows = [row for row in ledger.snapshot() if provider is None or row[0] == provider]
+        if not rows:
+            print("Nessuna quota registrata.")
+            return True
+        for name, kid, entry in rows:
+            age = now - entry["updated_at"]
+            print(f"{name:12} {kid}  {format_entry(entry, now)}  (aggiornato {age:.0f}s fa)")
+        return True
+    finally:
+        ledger.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Mostra le quote dei provider apprese dagli header x-ratelimit-*.")
+    parser.add_argument("provider", nargs="?", default=None, help="Filtra per provider")
+    parser.add_argument("--db", default=str(DEFAULT_DB), help=f"Registro (default: {DEFAULT_DB})")
+    parser.add_argument("--clear", action="store_true", help="Azzera il registro")
+    args = parser.parse_args()
+
+    if do_main(args.db, args.provider, args.clear):
+        sys.exit(0)
+    else:
+        sys.exit(1)
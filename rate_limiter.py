@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Rate Limiter - Limitazione delle richieste per provider.
+
+Fornisce un token bucket asincrono e un limitatore per provider che combina
+un limite di richieste al secondo, un limite di richieste al minuto e un
+numero massimo di richieste contemporanee (in-flight).
+I limiti possono essere letti da un file JSON e sovrascritti da riga di comando.
+"""
+
+__date__ = "2026-10-16"
+__version__ = "1.0.0"
+__author__ = "Gemini CLI"
+
+import json
+import time
+import asyncio
+from pathlib import Path
+
+
+# Limiti di default per provider (prudenti, pensati per i piani gratuiti)
+DEFAULT_LIMITS = {
+    "gemini": {"rps": 0.5, "rpm": 15, "max_in_flight": 2},
+    "groq": {"rps": 0.5, "rpm": 30, "max_in_flight": 2},
+    "mistral": {"rps": 1.0, "rpm": 60, "max_in_flight": 2},
+    "cerebras": {"rps": 0.5, "rpm": 30, "max_in_flight": 2},
+    "openrouter": {"rps": 0.3, "rpm": 20, "max_in_flight": 2},
+    "huggingface": {"rps": 1.0, "rpm": 60, "max_in_flight": 4},
+}
+
+# Limite usato per provider non presenti in DEFAULT_LIMITS
+FALLBACK_LIMIT = {"rps": 0.2, "rpm": 12, "max_in_flight": 1}
+
+# Alias accettati da riga di comando
+LIMIT_ALIASES = {
+    "rps": "rps",
+    "rpm": "rpm",
+    "inflight": "max_in_flight",
+    "max_in_flight": "max_in_flight",
+}
+
+
+class TokenBucket:
+    """
+    Token bucket asincrono.
+    I token si ricaricano a velocità costante (rate token/s) fino a capacity.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        if rate <= 0:
+            raise ValueError("rate deve essere maggiore di zero")
+        if capacity < 1:
+            capacity = 1
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+    async def acquire(self):
+        """Attende finché un token è disponibile e lo consuma."""
+        async with self.lock:
+            self._refill()
+            while self.tokens < 1:
+                wait_time = (1 - self.tokens) / self.rate
+                await asyncio.sleep(wait_time)
+                self._refill()
+            self.tokens -= 1
+
+
+class ProviderLimiter:
+    """
+    Limitatore di un singolo provider.
+    Usato come context manager asincrono attorno a ogni richiesta.
+    """
+
+    def __init__(self, provider: str, rps: float, rpm: float, max_in_flight: int):
+        self.provider = provider
+        self.buckets = []
+        # Il bucket al secondo ha capacità 1: nessun burst oltre il rate
+        if rps and rps > 0:
+            self.buckets.append(TokenBucket(rps, 1))
+        # Il bucket al minuto ammette burst fino a rpm, ricaricati in 60s
+        if rpm and rpm > 0:
+            self.buckets.append(TokenBucket(rpm / 60.0, rpm))
+        self.semaphore = asyncio.Semaphore(max(1, int(max_in_flight)))
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        try:
+            for bucket in self.buckets:
+                await bucket.acquire()
+        except BaseException:
+            self.semaphore.release()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.semaphore.release()
+        return False
+
+
+def parse_limit_override(spec: str) -> tuple:
+    """
+    Interpreta un override da riga di comando.
+    Formato: provider:rps=1,rpm=30,inflight=2
+
+    Returns:
+        tuple: (provider, dict dei limiti).
+    """
+    if ":" not in spec:
+        raise ValueError(f"Override non valido '{spec}': atteso provider:chiave=valore,...")
+
+    provider, values = spec.split(":", 1)
+    provider = provider.strip().lower()
+    limits = {}
+    for item in values.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        if "=" not in item:
+            raise ValueError(f"Override non valido '{item}': atteso chiave=valore")
+        key, value = item.split("=", 1)
+        key = key.strip().lower()
+        if key not in LIMIT_ALIASES:
+            raise ValueError(f"Limite sconosciuto '{key}'. Disponibili: {', '.join(LIMIT_ALIASES)}")
+        limits[LIMIT_ALIASES[key]] = float(value)
+
+    result = (provider, limits)
+    return result
+
+
+def load_limits(config_file: str = None, overrides: list = None) -> dict:
+    """
+    Costruisce la tabella dei limiti per provider.
+    Ordine di precedenza: default < file JSON < override da riga di comando.
+
+    Il file JSON ha la forma {"groq": {"rps": 1, "rpm": 30, "max_in_flight": 2}, ...}.
+    """
+    limits = {name: dict(values) for name, values in DEFAULT_LIMITS.items()}
+
+    if config_file:
+        path = Path(config_file)
+        if not path.exists():
+            raise FileNotFoundError(f"File dei limiti {config_file} non trovato")
+        data = json.loads(path.read_text(encoding="utf-8"))
+        for provider, values in data.items():
+            provider = provider.lower()
+            entry = limits.setdefault(provider, dict(FALLBACK_LIMIT))
+            for key, value in values.items():
+                if key not in LIMIT_ALIASES:
+                    raise ValueError(f"Limite sconosciuto '{key}' per {provider}")
+                entry[LIMIT_ALIASES[key]] = float(value)
+
+    for spec in overrides or []:
+        provider, values = parse_limit_override(spec)
+        entry = limits.setdefault(provider, dict(FALLBACK_LIMIT))
+        entry.update(values)
+
+    return limits
+
+
+def build_limiter(provider: str, limits: dict) -> ProviderLimiter:
+    """Crea il limitatore di un provider a partire dalla tabella dei limiti."""
+    values = limits.get(provider, FALLBACK_LIMIT)
+    limiter = ProviderLimiter(
+        provider,
+        values.get("rps", 0),
+        values.get("rpm", 0),
+        int(values.get("max_in_flight", 1)),
+    )
+    return limiter